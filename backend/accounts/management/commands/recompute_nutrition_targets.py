@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.services import TARGETS_BATCH_SIZE, refresh_nutrition_targets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute auto-calculated nutrition targets from user metrics, e.g. "
+        "after changing the activity multipliers or default macro split"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=TARGETS_BATCH_SIZE,
+            help=f"Targets computed and written per batch (default: {TARGETS_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Summarize the changes without writing",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        started = time.perf_counter()
+        scanned, changed, summary = refresh_nutrition_targets(
+            batch_size=options["chunk_size"], dry_run=dry_run
+        )
+
+        prefix = "DRY RUN: would have updated" if dry_run else "Updated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {changed} of {scanned} nutrition targets "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
+        if changed:
+            for field, change in summary.items():
+                self.stdout.write(
+                    f"  {field}: average change {change['total'] / changed:+.2f}, "
+                    f"largest {change['max']:.2f}"
+                )
@@ -1,3 +1,11 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from project.utils.nutrition_calculator import calculate_targets_batch
+
+from .models import NutritionTargets
 from .repositories import get_all_users, create_user, update_user as repo_update_user
 
 """
@@ -83,3 +91,100 @@ def reject_user_tag_certificate(user_tag):
     user_tag.verified = False
     user_tag.save()
     return user_tag
+
+
+# Nutrition Target Services
+
+TARGETS_BATCH_SIZE = 1000
+TARGET_FIELDS = {
+    "calories": "calories",
+    "protein": "protein_g",
+    "carbohydrates": "carbohydrates_g",
+    "fat": "fat_g",
+}
+
+
+def refresh_nutrition_targets(batch_size=TARGETS_BATCH_SIZE, dry_run=False):
+    """
+    Recompute every auto-calculated NutritionTargets from its user's metrics.
+
+    Run after changing the activity multipliers or the default macro split.
+    Targets the user set by hand (is_custom) and users without metrics are
+    left alone. Rows are walked by user id, batch_size at a time, computed
+    with calculate_targets_batch and written back with bulk_update.
+
+    Args:
+        batch_size (int): Targets read per query
+        dry_run (bool): Report the changes without writing
+
+    Returns:
+        tuple: (scanned, changed, summary) - rows read, rows whose targets
+            changed, and per field {'total': sum, 'max': largest absolute
+            value} of the changes
+    """
+    targets = NutritionTargets.objects.filter(
+        is_custom=False, user__metrics__isnull=False
+    )
+    summary = {
+        field: {"total": Decimal("0"), "max": Decimal("0")} for field in TARGET_FIELDS
+    }
+    scanned = changed = last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = targets.filter(user_id__gt=last_id).order_by("user_id")
+            if not dry_run:
+                # A user switching to custom targets mid-run must win
+                batch = batch.select_for_update()
+            rows = list(
+                batch.values(
+                    "user_id",
+                    *TARGET_FIELDS,
+                    "user__metrics__weight",
+                    "user__metrics__height",
+                    "user__metrics__age",
+                    "user__metrics__gender",
+                    "user__metrics__activity_level",
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]["user_id"]
+            scanned += len(rows)
+
+            computed = calculate_targets_batch(
+                [row["user__metrics__weight"] for row in rows],
+                [row["user__metrics__height"] for row in rows],
+                [row["user__metrics__age"] for row in rows],
+                [row["user__metrics__gender"] for row in rows],
+                [row["user__metrics__activity_level"] for row in rows],
+            )
+            computed = {
+                field: computed[key].tolist() for field, key in TARGET_FIELDS.items()
+            }
+
+            now = timezone.now()
+            updates = []
+            for index, row in enumerate(rows):
+                values = {
+                    field: Decimal(str(computed[field][index])).quantize(
+                        Decimal("0.01")
+                    )
+                    for field in TARGET_FIELDS
+                }
+                if all(values[field] == row[field] for field in TARGET_FIELDS):
+                    continue
+                for field, value in values.items():
+                    change = value - row[field]
+                    summary[field]["total"] += change
+                    summary[field]["max"] = max(summary[field]["max"], abs(change))
+                updates.append(
+                    NutritionTargets(user_id=row["user_id"], updated_at=now, **values)
+                )
+
+            changed += len(updates)
+            if updates and not dry_run:
+                NutritionTargets.objects.bulk_update(
+                    updates, [*TARGET_FIELDS, "updated_at"]
+                )
+
+    return scanned, changed, summary
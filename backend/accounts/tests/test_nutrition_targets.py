@@ -0,0 +1,108 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounts.models import NutritionTargets, UserMetrics
+from project.utils.nutrition_calculator import (
+    calculate_bmr,
+    calculate_macro_targets,
+    calculate_targets_batch,
+    calculate_tdee,
+)
+
+User = get_user_model()
+
+
+class CalculateTargetsBatchTests(TestCase):
+    """calculate_targets_batch must match the scalar calculator chain"""
+
+    def test_matches_scalar_functions(self):
+        people = [
+            (70, 175, 30, "M", "moderate"),
+            (58.3, 162.5, 41, "F", "sedentary"),
+            (92.45, 188.1, 19, "M", "very_active"),
+            (49.9, 150, 67, "F", "light"),
+            (81.2, 170.3, 55, "F", "active"),
+        ]
+        batch = calculate_targets_batch(*zip(*people))
+        for index, (weight, height, age, gender, level) in enumerate(people):
+            expected = calculate_macro_targets(
+                calculate_tdee(calculate_bmr(weight, height, age, gender), level)
+            )
+            for key, value in expected.items():
+                self.assertEqual(batch[key][index], value, key)
+
+    def test_rejects_unknown_values(self):
+        with self.assertRaises(ValueError):
+            calculate_targets_batch([70], [175], [30], ["X"], ["moderate"])
+        with self.assertRaises(ValueError):
+            calculate_targets_batch([70], [175], [30], ["M"], ["couch"])
+
+    def test_empty_batch(self):
+        self.assertEqual(
+            len(calculate_targets_batch([], [], [], [], [])["calories"]), 0
+        )
+
+
+class RecomputeNutritionTargetsCommandTests(TestCase):
+    """Tests for the recompute_nutrition_targets command"""
+
+    def create_user(self, username, activity_level="moderate", is_custom=False):
+        user = User.objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password="testpass123",
+            name="Test",
+            surname="User",
+        )
+        metrics = UserMetrics.objects.create(
+            user=user,
+            height=175,
+            weight=70,
+            age=30,
+            gender="M",
+            activity_level=activity_level,
+        )
+        targets = NutritionTargets.create_from_metrics(metrics)
+        if is_custom:
+            targets.calories = 1800
+            targets.is_custom = True
+            targets.save()
+        return user
+
+    def test_updates_only_auto_calculated_targets(self):
+        users = [self.create_user(f"auto{i}") for i in range(3)]
+        custom = self.create_user("custom", is_custom=True)
+        before = NutritionTargets.objects.get(user=users[0])
+
+        with patch.dict(
+            "project.utils.nutrition_calculator.ACTIVITY_MULTIPLIERS", {"moderate": 1.6}
+        ):
+            out = StringIO()
+            call_command("recompute_nutrition_targets", "--dry-run", stdout=out)
+            self.assertIn("would have updated 3 of 3", out.getvalue())
+            self.assertIn("calories: average change +82.44", out.getvalue())
+            self.assertEqual(
+                NutritionTargets.objects.get(user=users[0]).calories, before.calories
+            )
+
+            out = StringIO()
+            call_command("recompute_nutrition_targets", "--chunk-size", "2", stdout=out)
+            self.assertIn("Updated 3 of 3", out.getvalue())
+
+        for user in users:
+            targets = NutritionTargets.objects.get(user=user)
+            expected = calculate_macro_targets(round(1648.75 * 1.6, 2))
+            self.assertEqual(float(targets.calories), expected["calories"])
+            self.assertEqual(float(targets.fat), expected["fat_g"])
+        self.assertEqual(NutritionTargets.objects.get(user=custom).calories, 1800)
+
+        out = StringIO()
+        call_command("recompute_nutrition_targets", stdout=out)
+        self.assertIn("Updated 3 of 3", out.getvalue())
+        out = StringIO()
+        call_command("recompute_nutrition_targets", stdout=out)
+        self.assertIn("Updated 0 of 3", out.getvalue())
@@ -5,35 +5,24 @@ import django
 
 """
 For loading food data manualy into the database, but we need to run this script in the Django context.
+Rows are upserted by normalized name, so the script can be re-run safely.
+For large NDJSON/CSV files use `python manage.py import_foods <path>` instead.
 """
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 django.setup()
 
-from foods.models import FoodEntry
+from foods.importer import import_foods
 
 json_path = os.path.join(os.path.dirname(__file__), "foods.json")
 with open(json_path, "r", encoding="utf-8") as f:
     data = json.load(f)
 
-try:
-    for item in data:
-        """Create a FoodEntry object for each item in the JSON file and save it to the database."""
-        FoodEntry.objects.create(
-            name=item["name"],
-            category=item["category"],
-            servingSize=item["servingSize"],
-            caloriesPerServing=item["caloriesPerServing"],
-            proteinContent=item["proteinContent"],
-            fatContent=item["fatContent"],
-            carbohydrateContent=item["carbohydrateContent"],
-            allergens=item.get("allergens", []),
-            dietaryOptions=item.get("dietaryOptions", []),
-            nutritionScore=item["nutritionScore"],
-            imageUrl=item["imageUrl"],
-        )
-except Exception as e:
-    print(f"An error occurred: {e}")
-finally:
-    print("Food data loading completed.")
+result = import_foods(enumerate(data, start=1))
+for error in result.errors:
+    print(f"Item {error['line']}: {error['error']}")
+print(
+    f"Food data loading completed. Created: {result.created}, "
+    f"updated: {result.updated}, skipped: {result.error_count}"
+)
@@ -1,6 +1,41 @@
 import json
 from pathlib import Path
 
+import numpy as np
+
+# Stored next to every score; bump it whenever the formula below changes so
+# the recompute_nutrition_scores maintainer picks up the outdated rows
+NUTRITION_SCORE_VERSION = 1
+
+
+def carb_quality_points(food_item):
+    """
+    Estimate carbohydrate quality (0-3 points) from the food's category.
+
+    We don't have direct data on complex vs. simple carbs, so the food
+    category is used as a proxy.
+    """
+    category = food_item.get("category", "").lower()
+
+    if "vegetable" in category or "fruit" in category:
+        # Vegetables and fruits tend to have higher quality carbs
+        return 3  # Max score
+    elif "whole" in food_item.get("name", "").lower() and "grain" in category:
+        # Whole grains have high quality carbs
+        return 2.5
+    elif "grain" in category:
+        # Regular grains have moderate quality carbs
+        return 2
+    elif "dairy" in category:
+        # Dairy has moderate to low carb quality (lactose is a simple sugar)
+        return 1.5
+    elif "sweets" in category or "snacks" in category:
+        # Sweets and snacks generally have low quality carbs
+        return 0.5
+    else:
+        # Default moderate score
+        return 1.5
+
 
 def calculate_nutrition_score(food_item):
     """
@@ -43,30 +78,7 @@ def calculate_nutrition_score(food_item):
     )  # Scale to 30% of total 10 points
 
     # 2. Carbohydrate quality (30% of score)
-    # We need to estimate carb quality since we don't have direct data on complex vs. simple carbs
-    carb_quality_score = 0
-
-    # Using food category as proxy for carb quality
-    category = food_item.get("category", "").lower()
-
-    if "vegetable" in category or "fruit" in category:
-        # Vegetables and fruits tend to have higher quality carbs
-        carb_quality_score = 3  # Max score
-    elif "whole" in food_item.get("name", "").lower() and "grain" in category:
-        # Whole grains have high quality carbs
-        carb_quality_score = 2.5
-    elif "grain" in category:
-        # Regular grains have moderate quality carbs
-        carb_quality_score = 2
-    elif "dairy" in category:
-        # Dairy has moderate to low carb quality (lactose is a simple sugar)
-        carb_quality_score = 1.5
-    elif "sweets" in category or "snacks" in category:
-        # Sweets and snacks generally have low quality carbs
-        carb_quality_score = 0.5
-    else:
-        # Default moderate score
-        carb_quality_score = 1.5
+    carb_quality_score = carb_quality_points(food_item)
 
     # Scale carb quality to 30% of total score
     carb_quality_score = carb_quality_score * (0.3 * 10 / 3)
@@ -122,6 +134,87 @@ def calculate_nutrition_score(food_item):
     return round(min(final_score, 10.0), 2)
 
 
+def calculate_nutrition_scores(food_items):
+    """
+    Vectorized calculate_nutrition_score() for a batch of foods.
+
+    Follows the same arithmetic step by step on float64 arrays, so each
+    result is identical to the scalar version. Only the category lookup runs
+    per item, and it is cached per (category, name) pair.
+
+    Args:
+        food_items (list[dict]): Food items with nutritional information
+
+    Returns:
+        list[float]: Nutrition scores in input order
+    """
+    if not food_items:
+        return []
+
+    values = np.array(
+        [
+            (
+                item.get("caloriesPerServing", 0),
+                item.get("proteinContent", 0),
+                item.get("fatContent", 0),
+                item.get("carbohydrateContent", 0),
+                item.get("servingSize", 100),
+            )
+            for item in food_items
+        ],
+        dtype=float,
+    )
+    calories, protein, fat, carbs, serving_size = values.T
+
+    # Avoid division by zero, then normalize to per 100g
+    serving_size[serving_size == 0] = 100
+    multiplier = 100 / serving_size
+    calories *= multiplier
+    protein *= multiplier
+    fat *= multiplier
+    carbs *= multiplier
+
+    # 1. Protein content (30% of score)
+    protein_score = np.minimum(protein / 10, 3) * (0.3 * 10 / 3)
+
+    # 2. Carbohydrate quality (30% of score)
+    points = {}
+    carb_quality_score = np.empty(len(food_items))
+    for i, item in enumerate(food_items):
+        key = (item.get("category", ""), item.get("name", ""))
+        if key not in points:
+            points[key] = carb_quality_points(item)
+        carb_quality_score[i] = points[key]
+    carb_quality_score = carb_quality_score * (0.3 * 10 / 3)
+
+    # 3. Nutrient balance (40% of score)
+    total_macros = protein * 4 + carbs * 4 + fat * 9
+    has_macros = total_macros != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        protein_pct = (protein * 4) / total_macros
+        carbs_pct = (carbs * 4) / total_macros
+        fat_pct = (fat * 9) / total_macros
+
+    protein_balance = np.select(
+        [protein_pct < 0.1, protein_pct <= 0.35], [0.5, 1.0], default=0.7
+    )
+    carbs_balance = np.select(
+        [carbs_pct < 0.45, carbs_pct <= 0.65], [0.7, 1.0], default=0.7
+    )
+    fat_balance = np.select([fat_pct < 0.2, fat_pct <= 0.35], [0.7, 1.0], default=0.5)
+    nutrient_balance_score = np.where(
+        has_macros,
+        (protein_balance + carbs_balance + fat_balance) * (0.4 * 10 / 3),
+        0,
+    )
+
+    final_score = protein_score + carb_quality_score + nutrient_balance_score
+
+    # Python's round() rather than np.round(), which rounds some halves
+    # differently
+    return [round(min(score, 10.0), 2) for score in final_score.tolist()]
+
+
 if __name__ == "__main__":
     # Load the foods.json file
     json_path = Path("foods.json")
@@ -131,8 +224,8 @@ if __name__ == "__main__":
         foods = json.load(f)
 
     # Update all nutrition scores
-    for food in foods:
-        food["nutritionScore"] = calculate_nutrition_score(food)
+    for food, score in zip(foods, calculate_nutrition_scores(foods)):
+        food["nutritionScore"] = score
 
     # Save updated data
     with open(json_path, "w", encoding="utf-8") as f:
@@ -4,19 +4,31 @@ import hmac
 import hashlib
 import base64
 import urllib.parse
-import requests
 import json
 import re
+import sys
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 import os
 
+# Make the backend package importable when run as a standalone script
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from project.utils import http_client, resilience
+
 
 # FatSecret API credentials
 CONSUMER_KEY = os.environ.get("FATSECRET_CONSUMER_KEY", "")
 CONSUMER_SECRET = os.environ.get("FATSECRET_CONSUMER_SECRET", "")
 INPUT_FILE = "500_common_foods.json"
 OUTPUT_FILE = "foods.json"
-RATE_LIMIT_DELAY = 1.2  # seconds between calls
+CHECKPOINT_FILE = "foods.checkpoint.ndjson"  # append-only, one result per line
+WORKERS = 8
+REQUESTS_PER_SECOND = 4.0  # per host, shared by all workers
 
 
 def get_oauth_params():
@@ -61,7 +73,8 @@ def make_request(method_name, extra_params):
     signature = sign_request(base_url, all_params)
     all_params["oauth_signature"] = signature
 
-    response = requests.get(base_url, params=all_params)
+    # The OAuth nonce is single-use, so failed calls are not retried here
+    response = http_client.get("fatsecret", base_url, params=all_params, retries=0)
     if response.status_code != 200:
         raise Exception(f"API Error: {response.status_code} - {response.text}")
     return response.json()
@@ -69,7 +82,7 @@ def make_request(method_name, extra_params):
 
 def get_fatsecret_image_url(food_url: str) -> str:
     headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-    response = requests.get(food_url, headers=headers)
+    response = http_client.get("fatsecret.web", food_url, headers=headers)
 
     if response.status_code != 200:
         print(f"Failed to fetch page: {response.status_code}")
@@ -154,70 +167,238 @@ def extract_food_info(details):
     }
 
 
-# ------------------- Main Processing ------------------- #
+# ------------------- Rate Limiting ------------------- #
 
 
-def enrich_food_list():
+class TokenBucket:
     """
-    Sends API requests to FatSecret for each food in the input file.
-    Input file is 500_common_foods.json with food names and categories, since categories are not available in the API.
-    Output file is enriched_foods.json with detailed food information. This file will be used to populate the database with food entries.
-    Input file is not guaranteed to contain all foods, and currently it only has ~250 foods.
+    Thread-safe token bucket. Tokens refill continuously at ``rate`` per
+    second up to ``capacity``; acquire() blocks until a token is available.
     """
-    enriched_data = []
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        food_list = json.load(f)
-    for entry in food_list:
-        food_name = entry["food_name"]
-        category = entry["food_category"]
-        print(f"Searching: {food_name}")
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-        try:
-            search = make_request("foods.search", {"search_expression": food_name})
-            foods = search.get("foods", {}).get("food", [])
-            if not foods:
-                print(f"Not found: {food_name}")
-                continue
 
-            food_id = foods[0]["food_id"]
-            details = make_request("food.get", {"food_id": food_id})
-            image_url = get_fatsecret_image_url(details["food"]["food_url"])
-            parsed = extract_food_info(details)
+# ------------------- Checkpointing ------------------- #
 
-            if not parsed:
-                print(f"No valid data: {food_name}")
+
+def load_checkpoint(path):
+    """
+    Read the append-only checkpoint file.
+
+    Returns:
+        dict: Latest record per input food name. A torn last line (from a
+        crash mid-write) is ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
                 continue
+            records[record["input"]] = record
+    return records
+
+
+def is_stale(record, max_age_days):
+    if max_age_days is None:
+        return False
+    return time.time() - record["enrichedAt"] > max_age_days * 24 * 60 * 60
 
-            enriched_data.append(
-                {
-                    "name": parsed["food_name"],
-                    "category": category,
-                    "servingSize": parsed.get("serving_amount", 100.0),
-                    "caloriesPerServing": parsed.get("calories", 0.0),
-                    "proteinContent": parsed.get("protein", 0.0),
-                    "fatContent": parsed.get("fat", 0.0),
-                    "carbohydrateContent": parsed.get("carbohydrates", 0.0),
-                    "allergens": [],
-                    "dietaryOptions": [],
-                    "nutritionScore": 0.0,
-                    "imageUrl": image_url,
-                }
-            )
-
-            print(f"Added: {food_name}")
-        except Exception as e:
-            print(f"Error for {food_name}: {e}")
-
-        time.sleep(RATE_LIMIT_DELAY)
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+
+def write_output(food_list, records, output_file):
+    """Rebuild the output file from the checkpoint, in input order."""
+    enriched_data = []
+    seen = set()
+    for entry in food_list:
+        record = records.get(entry["food_name"])
+        if not record or record["status"] != "ok":
+            continue
+        food = record["food"]
+        if food["name"].lower() in seen:
+            continue
+        seen.add(food["name"].lower())
+        enriched_data.append(food)
+
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
         json.dump(enriched_data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+    return enriched_data
+
+
+# ------------------- Main Processing ------------------- #
+
+
+def enrich_food(entry, api_bucket, web_bucket):
+    """
+    Look up one input entry on FatSecret.
+
+    Returns:
+        dict: Checkpoint record with status "ok", "not_found" or "invalid".
+        Transient errors are raised so the entry is retried on the next run.
+    """
+    food_name = entry["food_name"]
+    record = {"input": food_name, "enrichedAt": time.time()}
+
+    api_bucket.acquire()
+    search = make_request("foods.search", {"search_expression": food_name})
+    foods = search.get("foods", {}).get("food", [])
+    if not foods:
+        return {**record, "status": "not_found"}
+    if isinstance(foods, dict):
+        foods = [foods]
+
+    api_bucket.acquire()
+    details = make_request("food.get", {"food_id": foods[0]["food_id"]})
+    parsed = extract_food_info(details)
+    if not parsed:
+        return {**record, "status": "invalid"}
+
+    web_bucket.acquire()
+    image_url = get_fatsecret_image_url(details["food"]["food_url"])
+
+    return {
+        **record,
+        "status": "ok",
+        "food": {
+            "name": parsed["food_name"],
+            "category": entry["food_category"],
+            "servingSize": parsed.get("serving_amount", 100.0),
+            "caloriesPerServing": parsed.get("calories", 0.0),
+            "proteinContent": parsed.get("protein", 0.0),
+            "fatContent": parsed.get("fat", 0.0),
+            "carbohydrateContent": parsed.get("carbohydrates", 0.0),
+            "allergens": [],
+            "dietaryOptions": [],
+            "nutritionScore": 0.0,
+            "imageUrl": image_url,
+        },
+    }
+
+
+def enrich_food_list(
+    input_file=INPUT_FILE,
+    output_file=OUTPUT_FILE,
+    checkpoint_file=CHECKPOINT_FILE,
+    workers=WORKERS,
+    rate=REQUESTS_PER_SECOND,
+    max_age_days=None,
+):
+    """
+    Sends API requests to FatSecret for each food in the input file.
+    Input file is 500_common_foods.json with food names and categories, since categories are not available in the API.
+    Output file is foods.json with detailed food information. This file will be used to populate the database with food entries.
+
+    Foods are enriched by a pool of workers sharing one token bucket per
+    host, and every result is appended to the checkpoint file as soon as it
+    is known. Re-running resumes where the last run stopped: entries already
+    in the checkpoint are skipped unless they are older than max_age_days.
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        food_list = json.load(f)
+
+    records = load_checkpoint(checkpoint_file)
+    todo = [
+        entry
+        for entry in food_list
+        if entry["food_name"] not in records
+        or is_stale(records[entry["food_name"]], max_age_days)
+    ]
+    print(
+        f"{len(food_list)} foods, {len(food_list) - len(todo)} already enriched, "
+        f"{len(todo)} to fetch"
+    )
+
+    # This script is the only FatSecret client on the machine it runs on,
+    # so let every worker hold a concurrent call slot
+    for integration in ("fatsecret", "fatsecret.web"):
+        resilience.BULKHEAD_LIMITS[integration] = max(
+            workers, resilience.BULKHEAD_LIMITS.get(integration, 0)
+        )
+
+    api_bucket = TokenBucket(rate)
+    web_bucket = TokenBucket(rate)
+    write_lock = threading.Lock()
+    failed = 0
+
+    with open(checkpoint_file, "a", encoding="utf-8") as checkpoint, ThreadPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        futures = {
+            executor.submit(enrich_food, entry, api_bucket, web_bucket): entry
+            for entry in todo
+        }
+        for future in as_completed(futures):
+            food_name = futures[future]["food_name"]
+            try:
+                record = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error for {food_name}: {e}")
+                continue
+
+            with write_lock:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+            records[food_name] = record
+            print(f"{record['status']}: {food_name}")
 
-    print(f"\n Done. {len(enriched_data)} foods saved to {OUTPUT_FILE}")
+    enriched_data = write_output(food_list, records, output_file)
+    print(
+        f"\n Done. {len(enriched_data)} foods saved to {output_file}"
+        + (f", {failed} failed (re-run to retry)" if failed else "")
+    )
+    return enriched_data
 
 
 # ------------------- Run ------------------- #
 
 if __name__ == "__main__":
-    enrich_food_list()
+    parser = argparse.ArgumentParser(description="Enrich the food list from FatSecret")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=REQUESTS_PER_SECOND,
+        help="FatSecret requests per second, shared by all workers",
+    )
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        help="Re-enrich entries whose checkpoint is older than this",
+    )
+    args = parser.parse_args()
+    enrich_food_list(
+        input_file=args.input,
+        output_file=args.output,
+        checkpoint_file=args.checkpoint,
+        workers=args.workers,
+        rate=args.rate,
+        max_age_days=args.max_age_days,
+    )
@@ -5,8 +5,26 @@ from rest_framework.test import APIClient
 from rest_framework import status
 from unittest.mock import patch, Mock
 from django.urls import reverse
-from api.views import TranslationService  # Add this import
+from api.views import TranslationService, source_hash  # Add this import
 from django.urls import reverse
+import json
+import os
+import random
+import requests
+import tempfile
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from api.db_initialization import scraper
+from api.db_initialization.nutrition_score import (
+    calculate_nutrition_score,
+    calculate_nutrition_scores,
+)
+from forum.models import Translation
+from project.utils import http_client, resilience
+from project.utils.nutrients import NutrientVector, macro_percentages
+from project.utils.nutrition_calculator import aggregate_micronutrients
 
 
 class GetTimeTest(TestCase):
@@ -33,7 +51,7 @@ class TranslationViewTest(TestCase):
             ]
         }
 
-    @patch("requests.post")
+    @patch("requests.Session.request")
     def test_successful_translation(self, mock_post):
         # Mock the DeepL API response
         mock_post.return_value.status_code = 200
@@ -55,7 +73,7 @@ class TranslationViewTest(TestCase):
         response = self.client.post(self.url, {"text": "Hello"}, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    @patch("requests.post")
+    @patch("requests.Session.request")
     def test_translation_service_error(self, mock_post):
         # Mock a failed API response
         mock_post.return_value.status_code = 503
@@ -79,9 +97,7 @@ class TranslationServiceTest(TestCase):
             ]
         }
 
-    @patch(
-        "api.views.requests.post"
-    )  # Update this path to match your actual implementation
+    @patch("requests.Session.request")
     def test_translate_text(self, mock_post):
         # Mock the DeepL API response
         mock_response = Mock()
@@ -121,7 +137,7 @@ class TranslationServiceTest(TestCase):
                 text=self.test_text, target_lang="", source_lang=self.source_lang
             )
 
-    @patch("api.views.requests.post")
+    @patch("requests.Session.request")
     def test_translation_service_error(self, mock_post):
         # Mock a failed API response
         mock_response = Mock()
@@ -138,3 +154,529 @@ class TranslationServiceTest(TestCase):
             )
 
         self.assertIn("Translation service error", str(context.exception))
+
+    @patch("requests.Session.request")
+    def test_translate_texts_batches_and_caches(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+        mock_post.return_value.json.return_value = {
+            "translations": [
+                {"text": "Merhaba", "detected_source_language": "EN"},
+                {"text": "Dünya", "detected_source_language": "EN"},
+            ]
+        }
+
+        texts = ["Hello", "World", "Hello"]
+        first = self.translation_service.translate_texts(texts, "tr")
+        second = self.translation_service.translate_texts(texts, "TR")
+
+        # Duplicates are sent once, and the second call is served from the DB
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_post.call_args.kwargs["json"]["text"], ["Hello", "World"])
+        self.assertEqual(
+            [r["translated_text"] for r in first], ["Merhaba", "Dünya", "Merhaba"]
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(Translation.objects.count(), 2)
+
+    @patch("requests.Session.request")
+    def test_translate_texts_only_requests_missing(self, mock_post):
+        Translation.objects.create(
+            source_hash=source_hash("Hello"),
+            target_lang="TR",
+            source_text="Hello",
+            translated_text="Merhaba",
+            detected_source_lang="EN",
+        )
+        mock_post.return_value = Mock(status_code=200)
+        mock_post.return_value.json.return_value = {
+            "translations": [{"text": "Dünya", "detected_source_language": "EN"}]
+        }
+
+        results = self.translation_service.translate_texts(["Hello", "World"], "TR")
+
+        self.assertEqual(mock_post.call_args.kwargs["json"]["text"], ["World"])
+        self.assertEqual([r["translated_text"] for r in results], ["Merhaba", "Dünya"])
+
+    @patch("requests.Session.request")
+    def test_translate_texts_splits_large_batches(self, mock_post):
+        def respond(method, url, json=None, **kwargs):
+            response = Mock(status_code=200)
+            response.json.return_value = {
+                "translations": [
+                    {"text": text.upper(), "detected_source_language": "EN"}
+                    for text in json["text"]
+                ]
+            }
+            return response
+
+        mock_post.side_effect = respond
+        texts = [f"text {i}" for i in range(120)]
+
+        results = self.translation_service.translate_texts(texts, "DE")
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(results[119]["translated_text"], "TEXT 119")
+
+
+class BatchTranslationViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("translate")
+
+    @patch("requests.Session.request")
+    def test_translates_multiple_texts_in_one_call(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+        mock_post.return_value.json.return_value = {
+            "translations": [
+                {"text": "Merhaba", "detected_source_language": "EN"},
+                {"text": "Dünya", "detected_source_language": "EN"},
+            ]
+        }
+
+        response = self.client.post(
+            self.url, {"texts": ["Hello", "World"], "target_lang": "TR"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["target_lang"], "TR")
+        self.assertEqual(
+            response.data["translations"],
+            [
+                {"translated_text": "Merhaba", "source_lang": "EN"},
+                {"translated_text": "Dünya", "source_lang": "EN"},
+            ],
+        )
+        self.assertEqual(mock_post.call_count, 1)
+
+        # Same page again: no upstream call
+        response = self.client.post(
+            self.url, {"texts": ["World", "Hello"], "target_lang": "TR"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_post.call_count, 1)
+
+    def test_rejects_invalid_texts(self):
+        for texts in ([], "Hello", ["Hello", ""]):
+            response = self.client.post(
+                self.url, {"texts": texts, "target_lang": "TR"}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("requests.Session.request")
+    def test_rejects_oversized_texts(self, mock_post):
+        from api.views import TranslationView
+
+        too_many = ["Hello"] * (TranslationView.MAX_TEXTS + 1)
+        too_long = ["a" * (TranslationView.MAX_TOTAL_CHARS // 2 + 1)] * 2
+        for texts in (too_many, too_long):
+            response = self.client.post(
+                self.url, {"texts": texts, "target_lang": "TR"}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_post.assert_not_called()
+
+
+class HttpClientTest(TestCase):
+    def setUp(self):
+        http_client.reset_metrics()
+        resilience.reset()
+
+    @patch("project.utils.http_client._backoff")
+    @patch("requests.Session.request")
+    def test_retries_idempotent_request_on_retryable_status(self, mock_request, _):
+        unavailable = Mock(status_code=503)
+        ok = Mock(status_code=200)
+        mock_request.side_effect = [unavailable, ok]
+
+        response = http_client.get("wikidata", "https://www.wikidata.org/w/api.php")
+
+        self.assertIs(response, ok)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(
+            mock_request.call_args.kwargs["timeout"], http_client.DEFAULT_TIMEOUT
+        )
+        metrics = http_client.get_metrics()["wikidata"]
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["retries"], 1)
+
+    @patch("project.utils.http_client._backoff")
+    @patch("requests.Session.request")
+    def test_retries_are_bounded(self, mock_request, _):
+        mock_request.side_effect = requests.ConnectionError("refused")
+
+        with self.assertRaises(requests.ConnectionError):
+            http_client.get("foodish", "https://foodish-api.com/api/")
+
+        self.assertEqual(mock_request.call_count, http_client.DEFAULT_RETRIES + 1)
+        self.assertEqual(
+            http_client.get_metrics()["foodish"]["errors"],
+            http_client.DEFAULT_RETRIES + 1,
+        )
+
+    @patch("requests.Session.request")
+    def test_post_is_not_retried(self, mock_request):
+        mock_request.return_value = Mock(status_code=503)
+
+        response = http_client.post("deepl", "https://api-free.deepl.com/v2/translate")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_request.call_count, 1)
+
+    def test_sessions_are_pooled_per_host(self):
+        first = http_client._get_session("https://www.themealdb.com/api/a")
+        second = http_client._get_session("https://www.themealdb.com/api/b")
+        other = http_client._get_session("https://world.openfoodfacts.org/x")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+
+class ResilienceTest(TestCase):
+    def setUp(self):
+        resilience.reset()
+        http_client.reset_metrics()
+        cache.clear()
+
+    def _trip(self, integration):
+        breaker = resilience.get_breaker(integration)
+        for _ in range(resilience.BREAKER_MIN_CALLS):
+            breaker.record(True, 10)
+        return breaker
+
+    def test_breaker_opens_on_error_rate_and_fails_fast(self):
+        breaker = self._trip("wikidata")
+        self.assertEqual(breaker.state, resilience.OPEN)
+
+        with patch("requests.Session.request") as mock_request:
+            with self.assertRaises(resilience.CircuitOpenError):
+                http_client.get("wikidata", "https://www.wikidata.org/w/api.php")
+            mock_request.assert_not_called()
+
+    def test_breaker_opens_on_slow_calls(self):
+        breaker = resilience.get_breaker("deepl")
+        for _ in range(resilience.BREAKER_MIN_CALLS):
+            breaker.record(False, resilience.BREAKER_SLOW_CALL_MS + 1)
+        self.assertEqual(breaker.state, resilience.OPEN)
+
+    @patch("requests.Session.request")
+    def test_half_open_probe_closes_breaker(self, mock_request):
+        breaker = self._trip("foodish")
+        breaker.opened_at -= resilience.BREAKER_OPEN_SECONDS
+        mock_request.return_value = Mock(status_code=200)
+
+        http_client.get("foodish", "https://foodish-api.com/api/")
+
+        self.assertEqual(breaker.state, resilience.CLOSED)
+
+    def test_bulkhead_rejects_when_slots_are_busy(self):
+        bulkhead = resilience.Bulkhead("test", 1, lock_dir=tempfile.mkdtemp())
+        with bulkhead.slot():
+            self.assertEqual(bulkhead.busy_slots(), 1)
+            with self.assertRaises(resilience.BulkheadFullError):
+                with bulkhead.slot():
+                    pass
+        self.assertEqual(bulkhead.busy_slots(), 0)
+        self.assertEqual(bulkhead.rejected, 1)
+
+    def test_bulkhead_waits_briefly_for_a_slot(self):
+        import threading
+
+        bulkhead = resilience.Bulkhead(
+            "test", 1, lock_dir=tempfile.mkdtemp(), timeout=1.0
+        )
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with bulkhead.slot():
+                held.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait()
+        # Freed well within the timeout, so the second call gets the slot
+        threading.Timer(0.05, release.set).start()
+        with bulkhead.slot():
+            pass
+        holder.join()
+        self.assertEqual(bulkhead.rejected, 0)
+
+    def test_busy_slots_does_not_take_slots(self):
+        bulkhead = resilience.Bulkhead("test", 2, lock_dir=tempfile.mkdtemp())
+        with bulkhead.slot():
+            with patch.object(
+                resilience.fcntl, "flock", side_effect=AssertionError("probed")
+            ):
+                self.assertEqual(bulkhead.busy_slots(), 1)
+
+    def test_open_circuit_returns_service_unavailable(self):
+        self._trip("wikidata")
+        url = reverse("get-wikidata-entity", kwargs={"entity_id": "Q89"})
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_diagnostics_endpoint_is_staff_only(self):
+        User = get_user_model()
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass12345"
+        )
+        staff = User.objects.create_user(
+            username="staff",
+            email="staff@example.com",
+            password="pass12345",
+            is_staff=True,
+        )
+        self._trip("wikidata")
+        client = APIClient()
+        url = reverse("integration-diagnostics")
+
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(user=staff)
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["circuit_breakers"]["wikidata"]["state"], resilience.OPEN
+        )
+        self.assertIn("http", response.data)
+        self.assertIn("response_cache", response.data)
+
+
+class CatalogEnrichmentTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.dir, "input.json")
+        self.output_file = os.path.join(self.dir, "foods.json")
+        self.checkpoint_file = os.path.join(self.dir, "foods.checkpoint.ndjson")
+        with open(self.input_file, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"food_name": "Apple", "food_category": "Fruit"},
+                    {"food_name": "Unobtainium", "food_category": "Other"},
+                    {"food_name": "Bread", "food_category": "Grain"},
+                ],
+                f,
+            )
+
+        def fake_request(method_name, params):
+            if method_name == "foods.search":
+                name = params["search_expression"]
+                if name == "Unobtainium":
+                    return {"foods": {}}
+                return {"foods": {"food": [{"food_id": name}]}}
+            return {"food": {"food_name": params["food_id"], "food_url": "url"}}
+
+        patchers = [
+            patch.object(scraper, "make_request", side_effect=fake_request),
+            patch.object(
+                scraper,
+                "extract_food_info",
+                side_effect=lambda details: {
+                    "food_name": details["food"]["food_name"],
+                    "calories": 50.0,
+                },
+            ),
+            patch.object(scraper, "get_fatsecret_image_url", return_value=""),
+            patch.dict(resilience.BULKHEAD_LIMITS),
+        ]
+        self.mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.make_request = self.mocks[0]
+
+    def enrich(self, **kwargs):
+        return scraper.enrich_food_list(
+            input_file=self.input_file,
+            output_file=self.output_file,
+            checkpoint_file=self.checkpoint_file,
+            workers=4,
+            rate=1000,
+            **kwargs,
+        )
+
+    def test_writes_checkpoint_and_output_in_input_order(self):
+        foods = self.enrich()
+
+        self.assertEqual([food["name"] for food in foods], ["Apple", "Bread"])
+        with open(self.output_file, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), foods)
+        records = scraper.load_checkpoint(self.checkpoint_file)
+        self.assertEqual(records["Unobtainium"]["status"], "not_found")
+        self.assertEqual(records["Apple"]["food"]["category"], "Fruit")
+
+    def test_resume_skips_checkpointed_entries(self):
+        with open(self.checkpoint_file, "w", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "input": "Apple",
+                        "enrichedAt": time.time(),
+                        "status": "ok",
+                        "food": {"name": "Apple", "category": "Fruit"},
+                    }
+                )
+                + "\n"
+            )
+            f.write('{"input": "Bre')  # torn write from a crash
+
+        foods = self.enrich()
+
+        searched = [
+            call.args[1]["search_expression"]
+            for call in self.make_request.call_args_list
+            if call.args[0] == "foods.search"
+        ]
+        self.assertCountEqual(searched, ["Unobtainium", "Bread"])
+        self.assertEqual([food["name"] for food in foods], ["Apple", "Bread"])
+
+    def test_failed_entries_are_retried_on_next_run(self):
+        self.make_request.side_effect = requests.ConnectionError("down")
+        self.assertEqual(self.enrich(), [])
+        self.assertEqual(scraper.load_checkpoint(self.checkpoint_file), {})
+
+    def test_only_stale_entries_are_re_enriched(self):
+        self.enrich()
+        records = scraper.load_checkpoint(self.checkpoint_file)
+        with open(self.checkpoint_file, "a", encoding="utf-8") as f:
+            old = {**records["Bread"], "enrichedAt": time.time() - 10 * 86400}
+            f.write(json.dumps(old) + "\n")
+        self.make_request.reset_mock()
+
+        self.enrich(max_age_days=7)
+
+        searched = [
+            call.args[1]["search_expression"]
+            for call in self.make_request.call_args_list
+            if call.args[0] == "foods.search"
+        ]
+        self.assertEqual(searched, ["Bread"])
+
+    def test_token_bucket_limits_rate(self):
+        bucket = scraper.TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # First token is free, the next five are spaced 20ms apart
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class NutritionScoreBatchTest(TestCase):
+    CATEGORIES = [
+        "Vegetable",
+        "Fruit",
+        "Whole Grain",
+        "Grain",
+        "Dairy",
+        "Sweets",
+        "Snacks",
+        "Meat",
+        "",
+    ]
+    NAMES = ["Whole Wheat Bread", "White Rice", "Apple", ""]
+
+    def random_food(self, rng):
+        def amount():
+            return rng.choice(
+                [0, rng.randint(0, 100), round(rng.uniform(0, 100), rng.randint(0, 3))]
+            )
+
+        food = {
+            "name": rng.choice(self.NAMES),
+            "category": rng.choice(self.CATEGORIES),
+            "caloriesPerServing": amount(),
+            "proteinContent": amount(),
+            "fatContent": amount(),
+            "carbohydrateContent": amount(),
+            "servingSize": rng.choice(
+                [0, 100, rng.randint(1, 500), round(rng.uniform(0.1, 500), 1)]
+            ),
+        }
+        if rng.random() < 0.1:
+            del food["servingSize"]
+        return food
+
+    def test_matches_scalar_version(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            foods = [self.random_food(rng) for _ in range(500)]
+            expected = [calculate_nutrition_score(food) for food in foods]
+            self.assertEqual(calculate_nutrition_scores(foods), expected, seed)
+
+    def test_edge_cases(self):
+        foods = [
+            {},
+            {"servingSize": 0, "proteinContent": 10},
+            {"proteinContent": 1000, "category": "Vegetable"},
+            # Exactly on the balance thresholds
+            {"proteinContent": 10, "carbohydrateContent": 55, "fatContent": 35 / 9},
+        ]
+        self.assertEqual(
+            calculate_nutrition_scores(foods),
+            [calculate_nutrition_score(food) for food in foods],
+        )
+        self.assertEqual(calculate_nutrition_scores([]), [])
+
+
+class NutrientVectorTest(TestCase):
+    def test_aggregate_matches_key_by_key_merge(self):
+        rng = random.Random(0)
+        names = ["Iron", "Vitamin C", "Calcium", "Sodium", "Omega-3"]
+        dicts = [
+            {name: round(rng.uniform(0, 50), 2) for name in rng.sample(names, 3)}
+            for _ in range(200)
+        ] + [{}, None]
+
+        expected = {}
+        for micronutrients in dicts:
+            for name, value in (micronutrients or {}).items():
+                expected[name] = expected.get(name, 0) + value
+        aggregated = aggregate_micronutrients(dicts)
+
+        self.assertEqual(set(aggregated), set(expected))
+        for name, value in expected.items():
+            self.assertAlmostEqual(aggregated[name], value, places=2)
+
+    def test_aliases_share_an_index(self):
+        self.assertEqual(
+            aggregate_micronutrients([{"vitamin_c": 10}, {"Vitamin C": 5.5}]),
+            {"Vitamin C": 15.5},
+        )
+
+    def test_aggregate_skips_non_numeric_values(self):
+        self.assertEqual(
+            aggregate_micronutrients(
+                [{"Iron": 1.234, "Omega-3": "trace"}, {"Iron": None, "Omega-3": 2}]
+            ),
+            {"Iron": 1.23, "Omega-3": 2.0},
+        )
+
+    def test_arithmetic_and_adherence(self):
+        food = NutrientVector.from_values(
+            calories=200, protein=10, micronutrients={"Iron": 2, "Omega-3": 1}
+        )
+        totals = NutrientVector.sum([food * 1.5, food]) - food * 0.5
+        self.assertEqual(totals["calories"], 400.0)
+        self.assertEqual(totals.to_micronutrients(), {"Iron": 4.0, "Omega-3": 2.0})
+
+        targets = NutrientVector.from_values(
+            calories=2000, protein=0, micronutrients={"Iron": 8}
+        )
+        self.assertEqual(
+            totals.percent_of(targets).macros(),
+            {"calories": 20.0, "protein": 0.0, "carbohydrates": 0.0, "fat": 0.0},
+        )
+        self.assertTrue(totals.isclose(totals + NutrientVector.from_values(fat=0.01), 0.05))
+        self.assertFalse(totals.isclose(food, 0.05))
+
+    def test_macro_percentages_match_percent_of(self):
+        targets = NutrientVector.from_values(calories=2000, protein=150, fat=0)
+        rows = [(500, 30, 40, 10), (1234.5, 0, 0, 0)]
+        self.assertEqual(
+            macro_percentages(rows, targets),
+            [NutrientVector.from_values(*row).percent_of(targets).macros() for row in rows],
+        )
+        self.assertEqual(macro_percentages([], targets), [])
@@ -1,5 +1,11 @@
 from django.urls import path
-from .views import TimeView, WikidataEntityView, random_food_image, TranslationView
+from .views import (
+    TimeView,
+    WikidataEntityView,
+    random_food_image,
+    TranslationView,
+    IntegrationDiagnosticsView,
+)
 
 urlpatterns = [
     path("time", TimeView.as_view(), name="get-time"),
@@ -10,4 +16,9 @@ urlpatterns = [
         name="get-wikidata-entity",
     ),
     path("random-food-image/", random_food_image, name="random_food_image"),
+    path(
+        "diagnostics/integrations/",
+        IntegrationDiagnosticsView.as_view(),
+        name="integration-diagnostics",
+    ),
 ]
@@ -1,7 +1,7 @@
 from django.http import JsonResponse, HttpRequest
 from datetime import datetime
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 
 
 from rest_framework.views import APIView
@@ -9,12 +9,39 @@ from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework import status
 from datetime import datetime
+import hashlib
+import os
+import random
 import requests
 
 from django.conf import settings
 
+from forum.models import Translation
+from project.utils import http_client, resilience, response_cache
+from project.utils.resilience import UpstreamUnavailable
+
+
+class TranslationError(Exception):
+    """Raised when DeepL rejects or fails a translation request."""
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
 class TranslationService:
+    """
+    DeepL client with a DB-backed cache.
+
+    Translations are stored in forum.Translation keyed by (source hash,
+    target_lang); only texts missing from the cache are sent upstream, using
+    DeepL's multi-text payload so a whole page costs at most a few calls.
+    """
+
+    # DeepL accepts up to 50 texts and 128 KiB per request
+    MAX_TEXTS_PER_REQUEST = 50
+    MAX_CHARS_PER_REQUEST = 100_000
+
     def __init__(self):
         self.api_key = settings.DEEPL_API_KEY
         self.api_url = "https://api-free.deepl.com/v2/translate"
@@ -30,49 +57,140 @@ class TranslationService:
         self, text: str, target_lang: str, source_lang: str = None
     ) -> dict:
         self.validate_params(text, target_lang, source_lang)
+        return self.translate_texts([text], target_lang, source_lang)[0]
+
+    def translate_texts(
+        self, texts: list, target_lang: str, source_lang: str = None
+    ) -> list:
+        """
+        Translate a list of texts, serving what it can from the cache.
+
+        Returns:
+            list: One {"translated_text", "source_lang", "target_lang"} dict
+                per input text, in input order
+        """
+        for text in texts:
+            self.validate_params(text, target_lang, source_lang)
+        target_lang = target_lang.upper()
+
+        hashes = [source_hash(text) for text in texts]
+        cached = {
+            translation.source_hash: translation
+            for translation in Translation.objects.filter(
+                target_lang=target_lang, source_hash__in=set(hashes)
+            )
+        }
+
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached:
+                missing.setdefault(text_hash, text)
+
+        for batch in self._batches(list(missing.items())):
+            translated = self._request_deepl(
+                [text for _, text in batch], target_lang, source_lang
+            )
+            new_rows = [
+                Translation(
+                    source_hash=text_hash,
+                    target_lang=target_lang,
+                    source_text=text,
+                    translated_text=result["text"],
+                    detected_source_lang=result.get(
+                        "detected_source_language", source_lang or ""
+                    ),
+                )
+                for (text_hash, text), result in zip(batch, translated)
+            ]
+            # A concurrent request may have stored the same texts meanwhile
+            Translation.objects.bulk_create(new_rows, ignore_conflicts=True)
+            cached.update({row.source_hash: row for row in new_rows})
 
+        return [
+            {
+                "translated_text": cached[text_hash].translated_text,
+                "source_lang": cached[text_hash].detected_source_lang,
+                "target_lang": target_lang,
+            }
+            for text_hash in hashes
+        ]
+
+    def _batches(self, items):
+        batch, chars = [], 0
+        for item in items:
+            size = len(item[1])
+            if batch and (
+                len(batch) >= self.MAX_TEXTS_PER_REQUEST
+                or chars + size > self.MAX_CHARS_PER_REQUEST
+            ):
+                yield batch
+                batch, chars = [], 0
+            batch.append(item)
+            chars += size
+        if batch:
+            yield batch
+
+    def _request_deepl(self, texts, target_lang, source_lang):
         headers = {
             "Authorization": f"DeepL-Auth-Key {self.api_key}",
             "Content-Type": "application/json",
         }
 
         payload = {
-            "text": [text],
+            "text": texts,
             "target_lang": target_lang,
         }
         if source_lang:
             payload["source_lang"] = source_lang
 
-        response = requests.post(self.api_url, headers=headers, json=payload)
+        response = http_client.post(
+            "deepl", self.api_url, headers=headers, json=payload
+        )
 
         if response.status_code != 200:
-            raise Exception(f"Translation service error: {response.text}")
+            raise TranslationError(f"Translation service error: {response.text}")
 
-        data = response.json()
-        return {
-            "translated_text": data["translations"][0]["text"],
-            "source_lang": data["translations"][0]["detected_source_language"],
-            "target_lang": target_lang,
-        }
+        translations = response.json()["translations"]
+        if len(translations) != len(texts):
+            raise TranslationError(
+                "Translation service error: expected "
+                f"{len(texts)} translations, got {len(translations)}"
+            )
+        return translations
 
 
 class TranslationView(APIView):
     permission_classes = []
 
+    # Per request, so one call costs at most a few DeepL requests
+    MAX_TEXTS = 200
+    MAX_TOTAL_CHARS = 200_000
+
     def post(self, request: Request) -> Response:
         """
         POST /api/translate
 
-        Translates text using DeepL API.
+        Translates text using DeepL API. Translations are cached, so
+        repeated texts don't reach DeepL. "texts" takes at most MAX_TEXTS
+        texts of MAX_TOTAL_CHARS characters in total.
 
         Request body:
         {
-            "text": "Text to translate",
+            "texts": ["First text", "Second text"],  # or "text": "Text to translate"
             "target_lang": "TR",  # Language code (e.g., EN, TR, DE, FR)
             "source_lang": "EN"   # Optional: source language
         }
 
-        Response:
+        Response for "texts":
+        {
+            "translations": [
+                {"translated_text": "...", "source_lang": "EN"},
+                ...
+            ],
+            "target_lang": "TR"
+        }
+
+        Response for "text":
         {
             "translated_text": "Translated content",
             "source_lang": "EN",
@@ -82,50 +200,68 @@ class TranslationView(APIView):
         try:
             # Get request data
             text = request.data.get("text")
+            texts = request.data.get("texts")
             target_lang = request.data.get("target_lang")
             source_lang = request.data.get("source_lang")
 
             # Validate input
-            if not text or not target_lang:
+            if texts is not None:
+                if (
+                    not isinstance(texts, list)
+                    or not texts
+                    or not all(isinstance(t, str) and t for t in texts)
+                ):
+                    return Response(
+                        {"error": "texts must be a non-empty list of strings"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                if len(texts) > self.MAX_TEXTS:
+                    return Response(
+                        {"error": f"At most {self.MAX_TEXTS} texts per request"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                if sum(len(t) for t in texts) > self.MAX_TOTAL_CHARS:
+                    return Response(
+                        {
+                            "error": f"At most {self.MAX_TOTAL_CHARS} characters "
+                            "per request"
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+            elif not text:
                 return Response(
                     {"error": "text and target_lang are required"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            # DeepL API configuration
-            api_key = settings.DEEPL_API_KEY
-            url = "https://api-free.deepl.com/v2/translate"
-
-            # Prepare request data
-            params = {
-                "text": text,
-                "target_lang": target_lang,
-                "auth_key": api_key,
-            }
-
-            if source_lang:
-                params["source_lang"] = source_lang
-
-            # Make API request
-            response = requests.post(url, data=params)
-
-            if response.status_code == 200:
-                result = response.json()
+            if not target_lang:
                 return Response(
-                    {
-                        "translated_text": result["translations"][0]["text"],
-                        "source_lang": result["translations"][0].get(
-                            "detected_source_language", source_lang
-                        ),
-                        "target_lang": target_lang,
-                    }
-                )
-            else:
-                return Response(
-                    {"error": "Translation service error", "details": response.text},
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    {"error": "text and target_lang are required"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            service = TranslationService()
+            if texts is None:
+                return Response(service.translate_text(text, target_lang, source_lang))
+
+            results = service.translate_texts(texts, target_lang, source_lang)
+            return Response(
+                {
+                    "translations": [
+                        {
+                            "translated_text": result["translated_text"],
+                            "source_lang": result["source_lang"],
+                        }
+                        for result in results
+                    ],
+                    "target_lang": target_lang.upper(),
+                }
+            )
+
+        except (TranslationError, UpstreamUnavailable) as e:
+            return Response(
+                {"error": "Translation service error", "details": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -169,7 +305,12 @@ class WikidataEntityView(APIView):
             )
 
         try:
-            entity_data = self.get_wikidata_entity(entity_id)
+            entity_data = response_cache.get_or_fetch(
+                "wikidata.entity",
+                entity_id,
+                lambda: self.get_wikidata_entity(entity_id),
+                is_empty=lambda value: value is None,
+            )
             if not entity_data:
                 return Response(
                     {"error": f"Entity {entity_id} not found"},
@@ -177,6 +318,11 @@ class WikidataEntityView(APIView):
                 )
 
             return Response(entity_data)
+        except UpstreamUnavailable as e:
+            return Response(
+                {"error": f"Wikidata is temporarily unavailable: {str(e)}"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         except requests.exceptions.RequestException as e:
             return Response(
                 {"error": f"Failed to retrieve entity: {str(e)}"},
@@ -198,8 +344,11 @@ class WikidataEntityView(APIView):
             "props": "labels|descriptions|claims|sitelinks",
         }
 
-        response = requests.get(
-            api_url, params=params, headers={"User-Agent": "WikidataFoodApp/1.0"}
+        response = http_client.get(
+            "wikidata",
+            api_url,
+            params=params,
+            headers={"User-Agent": "WikidataFoodApp/1.0"},
         )
         response.raise_for_status()
         data = response.json()
@@ -281,8 +430,17 @@ class WikidataFoodView(APIView):
             )
 
         try:
-            results = self.search_wikidata_entities(query, limit)
+            results = response_cache.get_or_fetch(
+                "wikidata.search",
+                response_cache.normalize_query(query, limit),
+                lambda: self.search_wikidata_entities(query, limit),
+            )
             return Response({"results": results, "count": len(results), "query": query})
+        except UpstreamUnavailable as e:
+            return Response(
+                {"error": f"Wikidata is temporarily unavailable: {str(e)}"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         except Exception as e:
             return Response(
                 {"error": f"Failed to query Wikidata: {str(e)}"},
@@ -305,8 +463,11 @@ class WikidataFoodView(APIView):
             "type": "item",
         }
 
-        response = requests.get(
-            api_url, params=params, headers={"User-Agent": "WikidataFoodApp/1.0"}
+        response = http_client.get(
+            "wikidata",
+            api_url,
+            params=params,
+            headers={"User-Agent": "WikidataFoodApp/1.0"},
         )
         response.raise_for_status()
         data = response.json()
@@ -325,6 +486,17 @@ class WikidataFoodView(APIView):
         return results
 
 
+def _fetch_foodish_image(category):
+    if category:
+        url = f"https://foodish-api.com/api/images/{category}"
+    else:
+        url = "https://foodish-api.com/api/"
+
+    resp = http_client.get("foodish", url, timeout=5)
+    resp.raise_for_status()
+    return resp.json()
+
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def random_food_image(request):
@@ -342,16 +514,19 @@ def random_food_image(request):
     category = request.query_params.get("category")
 
     try:
-        if category:
-            url = f"https://foodish-api.com/api/images/{category}"
-        else:
-            url = "https://foodish-api.com/api/"
-
-        resp = requests.get(url, timeout=5)
-        resp.raise_for_status()
-
-        data = resp.json()
+        # Serve from a small pool of cached random images per category
+        slot = random.randrange(response_cache.RANDOM_POOL_SIZE)
+        data = response_cache.get_or_fetch(
+            "foodish.random",
+            response_cache.normalize_query(category or "", slot),
+            lambda: _fetch_foodish_image(category),
+        )
         return Response(data)
+    except UpstreamUnavailable as e:
+        return Response(
+            {"error": f"Foodish API is temporarily unavailable: {str(e)}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except requests.exceptions.HTTPError as http_err:
         return Response(
             {"error": f"HTTP error from Foodish API: {str(http_err)}"},
@@ -362,3 +537,25 @@ def random_food_image(request):
             {"error": f"Failed to fetch image: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+class IntegrationDiagnosticsView(APIView):
+    """
+    GET /api/diagnostics/integrations/
+    Staff-only view of third-party integration health: circuit breaker and
+    bulkhead state, request metrics and response cache counters.
+    Breakers and metrics are per worker process, so the responding
+    worker's pid is included.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request) -> Response:
+        return Response(
+            {
+                "pid": os.getpid(),
+                **resilience.snapshot(),
+                "http": http_client.get_metrics(),
+                "response_cache": response_cache.get_stats(),
+            }
+        )
@@ -1,9 +1,17 @@
 from django.contrib import admin
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets, status, serializers
 from rest_framework.permissions import BasePermission
 from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import FoodEntry, FoodProposal
-from .services import approve_food_proposal, reject_food_proposal
+from .services import (
+    approve_food_proposal,
+    reject_food_proposal,
+    bulk_approve_food_proposals,
+    bulk_reject_food_proposals,
+)
 
 
 @admin.register(FoodEntry)
@@ -39,11 +47,32 @@ class AdminFoodProposal(admin.ModelAdmin):
         "isApproved",
         "createdAt",
         "proposedBy",
+        "duplicateOfEntry",
+        "duplicateOfProposal",
     )
     list_editable = ("isApproved",)
     search_fields = ("name",)
     list_filter = ("isApproved",)
-    readonly_fields = ("createdAt", "proposedBy")
+    readonly_fields = (
+        "createdAt",
+        "proposedBy",
+        "normalizedName",
+        "duplicateOfEntry",
+        "duplicateOfProposal",
+    )
+    actions = ("approve_selected", "reject_selected")
+
+    @admin.action(description="Approve selected food proposals")
+    def approve_selected(self, request, queryset):
+        entries = bulk_approve_food_proposals(queryset)
+        self.message_user(
+            request, f"{len(entries)} food proposals approved and added to catalog."
+        )
+
+    @admin.action(description="Reject selected food proposals")
+    def reject_selected(self, request, queryset):
+        count = bulk_reject_food_proposals(queryset)
+        self.message_user(request, f"{count} food proposals rejected.")
 
     def has_add_permission(self, request):
         return False
@@ -116,6 +145,8 @@ class FoodProposalModerationSerializer(serializers.ModelSerializer):
             "createdAt",
             "allergens",
             "dietaryOptions",
+            "duplicateOfEntry",
+            "duplicateOfProposal",
         ]
 
     def get_proposedBy(self, obj):
@@ -131,6 +162,80 @@ class FoodProposalActionSerializer(serializers.Serializer):
     approved = serializers.BooleanField(required=True)
 
 
+class FoodProposalBulkActionSerializer(serializers.Serializer):
+    """
+    Serializer for bulk approval/rejection.
+    Proposals are selected either by id or by a filter.
+    """
+
+    approved = serializers.BooleanField(required=True)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = serializers.DictField(required=False)
+
+    FILTER_KEYS = {"isApproved", "category", "name", "proposedBy", "createdBefore"}
+    # isApproved may also be given as in the list endpoint's query string
+    APPROVAL_STRINGS = {"null": None, "true": True, "false": False}
+
+    def validate_filter(self, value):
+        if not value:
+            # An empty filter would select every proposal in the table
+            raise serializers.ValidationError("Provide at least one filter key.")
+        unknown = set(value) - self.FILTER_KEYS
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown filter keys: {', '.join(sorted(unknown))}"
+            )
+        if "isApproved" in value:
+            approval = value["isApproved"]
+            if isinstance(approval, str):
+                approval = self.APPROVAL_STRINGS.get(approval.lower(), approval)
+            # Identity checks, so 0 and 1 aren't taken for booleans
+            if not (approval is None or approval is True or approval is False):
+                raise serializers.ValidationError(
+                    "isApproved must be null, true or false."
+                )
+            value = {**value, "isApproved": approval}
+        return value
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError(
+                "Provide exactly one of 'ids' or 'filter'."
+            )
+        return attrs
+
+    def get_queryset(self):
+        """Build the FoodProposal queryset selected by the validated data."""
+        if "ids" in self.validated_data:
+            return FoodProposal.objects.filter(id__in=self.validated_data["ids"])
+
+        filters = self.validated_data["filter"]
+        query = Q()
+        if "isApproved" in filters:
+            if filters["isApproved"] is None:
+                query &= Q(isApproved__isnull=True)
+            else:
+                query &= Q(isApproved=filters["isApproved"])
+        if "category" in filters:
+            query &= Q(category__iexact=filters["category"])
+        if "name" in filters:
+            query &= Q(name__icontains=filters["name"])
+        if "proposedBy" in filters:
+            query &= Q(proposedBy_id=filters["proposedBy"])
+        if "createdBefore" in filters:
+            created_before = parse_datetime(str(filters["createdBefore"])) or (
+                parse_date(str(filters["createdBefore"]))
+            )
+            if created_before is None:
+                raise serializers.ValidationError(
+                    {"filter": "createdBefore must be an ISO date or datetime."}
+                )
+            query &= Q(createdAt__lt=created_before)
+        return FoodProposal.objects.filter(query)
+
+
 class FoodProposalModerationViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for food proposal moderation.
@@ -162,6 +267,15 @@ class FoodProposalModerationViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(isApproved=False)
         # If is_approved not specified, return all
 
+        duplicates = self.request.query_params.get("duplicates")
+        is_duplicate = Q(duplicateOfEntry__isnull=False) | Q(
+            duplicateOfProposal__isnull=False
+        )
+        if duplicates == "true":
+            queryset = queryset.filter(is_duplicate)
+        elif duplicates == "false":
+            queryset = queryset.exclude(is_duplicate)
+
         return queryset.order_by("-createdAt")
 
     @action(detail=True, methods=["post"])
@@ -187,3 +301,32 @@ class FoodProposalModerationViewSet(viewsets.ReadOnlyModelViewSet):
             message = f"Food proposal '{proposal.name}' rejected."
 
         return Response({"message": message}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Approve or reject many food proposals in one transaction.
+        POST /api/foods/moderation/food-proposals/bulk/
+        Body: {"approved": true/false, "ids": [1, 2, 3]}
+           or {"approved": true/false, "filter": {"isApproved": null, "category": "Fruit"}}
+        The filter needs at least one key; isApproved is null (pending),
+        true or false.
+        """
+        serializer = FoodProposalBulkActionSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            proposals = serializer.get_queryset()
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        if serializer.validated_data["approved"]:
+            count = len(bulk_approve_food_proposals(proposals))
+            message = f"{count} food proposals approved and added to catalog."
+        else:
+            count = bulk_reject_food_proposals(proposals)
+            message = f"{count} food proposals rejected."
+
+        return Response({"message": message, "count": count}, status=status.HTTP_200_OK)
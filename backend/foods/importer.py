@@ -0,0 +1,491 @@
+"""
+Bulk food import from NDJSON or CSV.
+
+Rows are read lazily and processed in fixed-size chunks, so memory stays
+bounded regardless of the input size. Each chunk is validated, scored and
+upserted into the catalog with a constant number of queries:
+
+- existing entries are matched by the indexed normalizedName,
+- matches are updated with bulk_update, new foods inserted with bulk_create,
+- allergens are resolved by name in one query and linked with bulk_create.
+
+Invalid rows are reported with their line number and skipped; they never
+abort the import. Uploaded files are stored with store_upload() and
+queued as an ImportJob; the run_import_jobs command claims and runs them
+with run_import_job(), which decodes and parses the whole file before the
+first write, so a file that can't be read never leaves a partial import
+behind.
+"""
+
+import csv
+import io
+import json
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.db_initialization.nutrition_score import (
+    NUTRITION_SCORE_VERSION,
+    calculate_nutrition_scores,
+)
+
+from .models import Allergen, FoodEntry, ImportJob, normalize_food_name
+
+DEFAULT_CHUNK_SIZE = 1000
+# Errors kept in the result; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+# Where uploads wait for the import runner, in the bucket or MEDIA_ROOT
+UPLOAD_PREFIX = "imports"
+# Running jobs save progress every chunk; one silent this long has died
+STALE_AFTER = timedelta(minutes=30)
+# Pending jobs looked at per claim attempt
+CLAIM_CANDIDATES = 10
+
+NUMERIC_FIELDS = (
+    "servingSize",
+    "caloriesPerServing",
+    "proteinContent",
+    "fatContent",
+    "carbohydrateContent",
+)
+UPDATE_FIELDS = (
+    "name",
+    "category",
+    *NUMERIC_FIELDS,
+    "dietaryOptions",
+    "nutritionScore",
+    "nutritionScoreVersion",
+    "imageUrl",
+    "micronutrients",
+)
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # [{"line": n, "error": str}]
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "errorCount": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _split_list(value):
+    """Lists arrive as JSON arrays (NDJSON) or ';'-separated strings (CSV)."""
+    if value in (None, ""):
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(";") if item.strip()]
+
+
+def clean_row(row):
+    """
+    Validate one input row and convert it to FoodEntry field values.
+
+    Raises:
+        ImportRowError: If the row is invalid
+    """
+    if not isinstance(row, dict):
+        raise ImportRowError("row must be an object")
+
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ImportRowError("name is required")
+    if len(name) > 100:
+        raise ImportRowError("name must be at most 100 characters")
+    category = str(row.get("category") or "").strip()
+    if not category:
+        raise ImportRowError("category is required")
+
+    cleaned = {"name": name, "category": category[:100]}
+    for field_name in NUMERIC_FIELDS:
+        value = row.get(field_name)
+        if value in (None, ""):
+            if field_name == "servingSize":
+                value = 100.0
+            else:
+                raise ImportRowError(f"{field_name} is required")
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ImportRowError(f"{field_name} must be a number")
+        if value < 0 or not math.isfinite(value):
+            raise ImportRowError(f"{field_name} must be a non-negative number")
+        cleaned[field_name] = value
+    if cleaned["servingSize"] == 0:
+        raise ImportRowError("servingSize must be greater than 0")
+
+    micronutrients = row.get("micronutrients") or {}
+    if isinstance(micronutrients, str):
+        try:
+            micronutrients = json.loads(micronutrients)
+        except json.JSONDecodeError:
+            raise ImportRowError("micronutrients must be a JSON object")
+    if not isinstance(micronutrients, dict):
+        raise ImportRowError("micronutrients must be a JSON object")
+
+    cleaned.update(
+        {
+            "dietaryOptions": _split_list(row.get("dietaryOptions")),
+            "imageUrl": str(row.get("imageUrl") or "").strip(),
+            "micronutrients": micronutrients,
+            "allergens": _split_list(row.get("allergens")),
+        }
+    )
+    return cleaned
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line_number, row) pairs from a text stream.
+
+    NDJSON lines that aren't valid JSON are yielded as ImportRowError
+    instances so the caller can report them.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ImportRowError(f"invalid JSON: {e.msg}")
+
+
+def text_stream(binary_file, encoding="utf-8"):
+    """Wrap an uploaded (binary) file for read_rows without loading it."""
+    return io.TextIOWrapper(binary_file, encoding=encoding, newline="")
+
+
+def _resolve_allergens(names):
+    """Map allergen names to ids, creating the missing ones."""
+    if not names:
+        return {}
+    found = dict(Allergen.objects.filter(name__in=names).values_list("name", "id"))
+    missing = [name for name in names if name not in found]
+    if missing:
+        Allergen.objects.bulk_create([Allergen(name=name) for name in missing])
+        found.update(
+            Allergen.objects.filter(name__in=missing).values_list("name", "id")
+        )
+    return found
+
+
+@transaction.atomic
+def _upsert_chunk(rows):
+    """
+    Upsert cleaned rows (already de-duplicated by normalized name).
+
+    Returns:
+        tuple: (created, updated)
+    """
+    keys = list(rows)
+    existing = {}
+    for key, entry_id in (
+        FoodEntry.objects.filter(normalizedName__in=keys)
+        .order_by("-id")
+        .values_list("normalizedName", "id")
+    ):
+        existing[key] = entry_id  # ordered newest first, so the oldest wins
+
+    to_update, to_create = [], []
+    for key, row in rows.items():
+        values = {name: row[name] for name in UPDATE_FIELDS}
+        if key in existing:
+            to_update.append(FoodEntry(id=existing[key], normalizedName=key, **values))
+        else:
+            to_create.append(FoodEntry(normalizedName=key, **values))
+
+    if to_update:
+        FoodEntry.objects.bulk_update(to_update, UPDATE_FIELDS)
+    if to_create:
+        FoodEntry.objects.bulk_create(to_create)
+        # MySQL doesn't return primary keys from bulk inserts
+        existing.update(
+            FoodEntry.objects.filter(
+                normalizedName__in=[entry.normalizedName for entry in to_create]
+            ).values_list("normalizedName", "id")
+        )
+
+    allergen_ids = _resolve_allergens(
+        sorted({name for row in rows.values() for name in row["allergens"]})
+    )
+    Through = FoodEntry.allergens.through
+    Through.objects.filter(foodentry_id__in=[e.id for e in to_update]).delete()
+    Through.objects.bulk_create(
+        [
+            Through(foodentry_id=existing[key], allergen_id=allergen_ids[name])
+            for key, row in rows.items()
+            for name in set(row["allergens"])
+        ]
+    )
+    return len(to_create), len(to_update)
+
+
+def _process_chunk(chunk, result, dry_run):
+    rows = {}
+    lines = {}
+    for line_number, cleaned in chunk:
+        key = normalize_food_name(cleaned["name"])
+        rows[key] = cleaned  # later rows win within a chunk
+        lines.setdefault(key, []).append(line_number)
+
+    scores = calculate_nutrition_scores(list(rows.values()))
+    for cleaned, score in zip(rows.values(), scores):
+        cleaned["nutritionScore"] = score
+        cleaned["nutritionScoreVersion"] = NUTRITION_SCORE_VERSION
+
+    if dry_run:
+        existing = set(
+            FoodEntry.objects.filter(normalizedName__in=list(rows)).values_list(
+                "normalizedName", flat=True
+            )
+        )
+        result.updated += len(existing)
+        result.created += len(rows) - len(existing)
+        return
+
+    try:
+        created, updated = _upsert_chunk(rows)
+    except Exception as e:
+        for line_numbers in lines.values():
+            for line_number in line_numbers:
+                result.add_error(line_number, f"chunk failed: {e}")
+        return
+    result.created += created
+    result.updated += updated
+
+
+def import_foods(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Import foods from an iterable of (line_number, row) pairs.
+
+    Args:
+        rows: Iterable as produced by read_rows()
+        chunk_size (int): Rows validated and written per transaction
+        dry_run (bool): Validate and count without writing
+        progress: Optional callable(result, rows_read), called after each chunk
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    chunk = []
+    rows_read = 0
+    for line_number, row in rows:
+        rows_read += 1
+        try:
+            if isinstance(row, ImportRowError):
+                raise row
+            chunk.append((line_number, clean_row(row)))
+        except ImportRowError as e:
+            result.add_error(line_number, str(e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            _process_chunk(chunk, result, dry_run)
+            chunk = []
+            if progress:
+                progress(result, rows_read)
+
+    if chunk:
+        _process_chunk(chunk, result, dry_run)
+    if progress:
+        progress(result, rows_read)
+    return result
+
+
+def count_rows(path, fmt):
+    """
+    Decode and parse a whole file without touching the database.
+
+    Returns:
+        int: Number of rows
+
+    Raises:
+        ImportRowError: If the file isn't UTF-8 or isn't valid CSV
+    """
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return sum(1 for _ in read_rows(f, fmt))
+    except UnicodeDecodeError:
+        raise ImportRowError("File must be UTF-8 encoded")
+    except csv.Error as e:
+        raise ImportRowError(f"Malformed CSV: {e}")
+
+
+def _save_progress(job, result, rows_read):
+    job.processed_rows = rows_read
+    job.created = result.created
+    job.updated = result.updated
+    job.error_count = result.error_count
+    job.errors = result.errors
+    job.save(
+        update_fields=[
+            "processed_rows",
+            "created",
+            "updated",
+            "error_count",
+            "errors",
+            "updated_at",
+        ]
+    )
+
+
+def store_upload(name, chunks):
+    """
+    Save an uploaded file where any pod can read it: FOOD_IMPORT_BUCKET on
+    GCS when one is configured, MEDIA_ROOT/imports otherwise.
+
+    Returns:
+        str: Location to pass to fetch_upload() and delete_upload()
+    """
+    bucket_name = settings.FOOD_IMPORT_BUCKET
+    if bucket_name:
+        from google.cloud import storage
+
+        with tempfile.TemporaryFile() as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.seek(0)
+            blob = storage.Client().bucket(bucket_name).blob(f"{UPLOAD_PREFIX}/{name}")
+            blob.upload_from_file(f)
+        return f"gs://{bucket_name}/{UPLOAD_PREFIX}/{name}"
+
+    path = os.path.join(settings.MEDIA_ROOT, UPLOAD_PREFIX, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return path
+
+
+def _gcs_blob(location):
+    from google.cloud import storage
+
+    bucket_name, blob_name = location[len("gs://") :].split("/", 1)
+    return storage.Client().bucket(bucket_name).blob(blob_name)
+
+
+@contextmanager
+def fetch_upload(location):
+    """Yield a local path holding the stored upload."""
+    if not location.startswith("gs://"):
+        yield location
+        return
+    with tempfile.NamedTemporaryFile() as f:
+        _gcs_blob(location).download_to_file(f)
+        f.flush()
+        yield f.name
+
+
+def delete_upload(location):
+    try:
+        if location.startswith("gs://"):
+            _gcs_blob(location).delete()
+        else:
+            os.remove(location)
+    except Exception as e:
+        print(f"Could not delete import upload {location}: {e}")
+
+
+def claim_import_job():
+    """
+    Take the oldest pending ImportJob for this runner, or None.
+
+    Claiming is a conditional update, so concurrent runners never get the
+    same job.
+    """
+    pending = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING)
+    for job in pending.order_by("id")[:CLAIM_CANDIDATES]:
+        claimed = ImportJob.objects.filter(
+            id=job.id, status=ImportJob.STATUS_PENDING
+        ).update(status=ImportJob.STATUS_RUNNING, updated_at=timezone.now())
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def fail_stale_import_jobs(stale_after=STALE_AFTER):
+    """
+    Fail running jobs that saved no progress for stale_after, e.g. because
+    their runner was killed.
+
+    Returns:
+        int: Jobs marked failed
+    """
+    stale = ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - stale_after,
+    )
+    locations = list(stale.values_list("upload", flat=True))
+    failed = stale.update(
+        status=ImportJob.STATUS_FAILED,
+        failure="Import stopped without finishing; upload the file again",
+        updated_at=timezone.now(),
+    )
+    for location in locations:
+        if location:
+            delete_upload(location)
+    return failed
+
+
+def run_import_job(job, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Import the upload of a claimed ImportJob, saving progress per chunk.
+
+    The whole file is decoded and parsed first; if that fails the job is
+    marked failed before anything is written. The upload is deleted once
+    the job ends.
+    """
+    try:
+        with fetch_upload(job.upload) as path:
+            job.total_rows = count_rows(path, job.format)
+            job.save(update_fields=["total_rows", "updated_at"])
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                import_foods(
+                    read_rows(f, job.format),
+                    chunk_size=chunk_size,
+                    dry_run=job.dry_run,
+                    progress=lambda result, rows_read: _save_progress(
+                        job, result, rows_read
+                    ),
+                )
+    except Exception as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.failure = str(e)
+    else:
+        job.status = ImportJob.STATUS_DONE
+    job.save(update_fields=["status", "failure", "updated_at"])
+    delete_upload(job.upload)
+    return job
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foods import importer
+
+
+class Command(BaseCommand):
+    help = "Bulk-import foods from an NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=importer.DEFAULT_CHUNK_SIZE,
+            help=f"Rows written per transaction (default: {importer.DEFAULT_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and count rows without writing",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "ndjson"
+        )
+        started = time.perf_counter()
+
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                result = importer.import_foods(
+                    importer.read_rows(f, fmt),
+                    chunk_size=options["chunk_size"],
+                    dry_run=options["dry_run"],
+                )
+        except OSError as e:
+            raise CommandError(str(e)) from e
+
+        for error in result.errors:
+            self.stdout.write(
+                self.style.WARNING(f"line {error['line']}: {error['error']}")
+            )
+        if result.error_count > len(result.errors):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"... and {result.error_count - len(result.errors)} more errors"
+                )
+            )
+
+        prefix = "DRY RUN: would have " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}created {result.created}, updated {result.updated}, "
+                f"skipped {result.error_count} invalid rows "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foods.models import FoodEntry, FoodProposal
+from foods.services import SCORE_BATCH_SIZE, refresh_nutrition_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute nutritionScore for food entries and proposals scored by an "
+        "older version of the formula"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=SCORE_BATCH_SIZE,
+            help=f"Rows scored and written per batch (default: {SCORE_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches per model, to spread the work "
+            "over several runs (default: no limit)",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rescore every row, not just the outdated ones",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the rows whose score would change without writing",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        prefix = "DRY RUN: would have updated" if dry_run else "Updated"
+
+        for model in (FoodEntry, FoodProposal):
+            started = time.perf_counter()
+            scanned, changed = refresh_nutrition_scores(
+                model,
+                batch_size=options["chunk_size"],
+                max_batches=options["max_batches"],
+                force=options["all"],
+                dry_run=dry_run,
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model.__name__}: {prefix} {changed} scores of {scanned} "
+                    f"rows checked in {time.perf_counter() - started:.1f}s"
+                )
+            )
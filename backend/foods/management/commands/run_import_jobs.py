@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from foods import importer
+
+
+class Command(BaseCommand):
+    help = "Run queued food imports, failing ones whose runner died"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-jobs",
+            type=int,
+            default=10,
+            help="Stop after this many imports (default: 10)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=importer.DEFAULT_CHUNK_SIZE,
+            help=(
+                "Rows written per transaction "
+                f"(default: {importer.DEFAULT_CHUNK_SIZE})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        stale = importer.fail_stale_import_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"Failed {stale} stale imports"))
+
+        ran = 0
+        while ran < options["max_jobs"]:
+            job = importer.claim_import_job()
+            if job is None:
+                break
+            job = importer.run_import_job(job, chunk_size=options["chunk_size"])
+            ran += 1
+            summary = (
+                f"created {job.created}, updated {job.updated}, "
+                f"skipped {job.error_count} invalid rows"
+            )
+            if job.status == job.STATUS_FAILED:
+                self.stdout.write(
+                    self.style.ERROR(f"Import {job.id} failed: {job.failure}")
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Import {job.id}: {summary}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} imports"))
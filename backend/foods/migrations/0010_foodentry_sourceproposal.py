@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0009_imagecache_gcs_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodentry',
+            name='sourceProposal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approvedEntries', to='foods.foodproposal'),
+        ),
+    ]
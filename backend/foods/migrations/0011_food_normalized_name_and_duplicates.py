@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def normalize_food_name(name):
+    """foods.models.normalize_food_name as of this migration."""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    words = re.sub(r"[^\w]+|_", " ", stripped.lower()).split()
+    return " ".join(words)[:150]
+
+
+def backfill_normalized_names(apps, schema_editor):
+    for model_name in ("FoodEntry", "FoodProposal"):
+        model = apps.get_model("foods", model_name)
+        rows = model.objects.only("id", "name").order_by("id")
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for row in batch:
+                row.normalizedName = normalize_food_name(row.name)
+            model.objects.bulk_update(batch, ["normalizedName"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0010_foodentry_sourceproposal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodentry',
+            name='normalizedName',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='foodproposal',
+            name='duplicateOfEntry',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicateProposals', to='foods.foodentry'),
+        ),
+        migrations.AddField(
+            model_name='foodproposal',
+            name='duplicateOfProposal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicateProposals', to='foods.foodproposal'),
+        ),
+        migrations.AddField(
+            model_name='foodproposal',
+            name='normalizedName',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=150),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0011_food_normalized_name_and_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodentry',
+            name='nutritionScoreVersion',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='foodproposal',
+            name='nutritionScoreVersion',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name='foodentry',
+            index=models.Index(fields=['nutritionScore'], name='foods_foode_nutriti_97e1c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodentry',
+            index=models.Index(fields=['category', 'nutritionScore'], name='foods_foode_categor_f0308c_idx'),
+        ),
+    ]
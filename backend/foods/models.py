@@ -1,6 +1,22 @@
 from django.db import models
 import django.utils.timezone
 from django.conf import settings
+import re
+import unicodedata
+
+
+NORMALIZED_NAME_MAX_LENGTH = 150
+
+
+def normalize_food_name(name):
+    """
+    Key used to match foods that differ only in case, accents, punctuation
+    or spacing: "Crème Brûlée!" and "creme  brulee" both become "creme brulee".
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    words = re.sub(r"[^\w]+|_", " ", stripped.lower()).split()
+    return " ".join(words)[:NORMALIZED_NAME_MAX_LENGTH]
 
 
 class Allergen(models.Model):
@@ -10,6 +26,9 @@ class Allergen(models.Model):
 # Create your models here.
 class FoodEntry(models.Model):
     name = models.CharField(max_length=100)
+    normalizedName = models.CharField(
+        max_length=NORMALIZED_NAME_MAX_LENGTH, db_index=True, blank=True, default=""
+    )
     category = models.CharField(max_length=100)
     servingSize = models.FloatField()
     caloriesPerServing = models.FloatField()
@@ -21,17 +40,40 @@ class FoodEntry(models.Model):
     )
     dietaryOptions = models.JSONField(default=list)
     nutritionScore = models.FloatField()
+    # NUTRITION_SCORE_VERSION that produced nutritionScore, 0 = never scored
+    nutritionScoreVersion = models.PositiveSmallIntegerField(default=0, db_index=True)
     imageUrl = models.URLField(blank=True)
     micronutrients = models.JSONField(
         default=dict,
         blank=True,
         help_text="Micronutrient content (vitamins, minerals) per serving"
     )
+    sourceProposal = models.ForeignKey(
+        "FoodProposal",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="approvedEntries",
+    )  # proposal this entry was approved from, if any
 
+    class Meta:
+        # Catalog sorts by score, alone or within categories; InnoDB appends
+        # the primary key, which is the tie-breaker
+        indexes = [
+            models.Index(fields=["nutritionScore"]),
+            models.Index(fields=["category", "nutritionScore"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalizedName = normalize_food_name(self.name)
+        super().save(*args, **kwargs)
 
 
 class FoodProposal(models.Model):
     name = models.CharField(max_length=100)
+    normalizedName = models.CharField(
+        max_length=NORMALIZED_NAME_MAX_LENGTH, db_index=True, blank=True, default=""
+    )
     category = models.CharField(max_length=100)
     servingSize = models.FloatField()
     caloriesPerServing = models.FloatField()
@@ -43,6 +85,8 @@ class FoodProposal(models.Model):
     )
     dietaryOptions = models.JSONField(default=list)
     nutritionScore = models.FloatField()
+    # NUTRITION_SCORE_VERSION that produced nutritionScore, 0 = never scored
+    nutritionScoreVersion = models.PositiveSmallIntegerField(default=0, db_index=True)
     imageUrl = models.URLField(blank=True)
     micronutrients = models.JSONField(
         default=dict,
@@ -54,7 +98,25 @@ class FoodProposal(models.Model):
     )  # null=pending, True=approved, False=rejected
     createdAt = models.DateTimeField(default=django.utils.timezone.now)
     proposedBy = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Near-duplicates found at submission time, for moderators
+    duplicateOfEntry = models.ForeignKey(
+        FoodEntry,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="duplicateProposals",
+    )
+    duplicateOfProposal = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="duplicateProposals",
+    )
 
+    def save(self, *args, **kwargs):
+        self.normalizedName = normalize_food_name(self.name)
+        super().save(*args, **kwargs)
 
 
 class ImageCache(models.Model):
@@ -82,3 +144,59 @@ class ImageCache(models.Model):
 
     def __str__(self):
         return f"Cache for {self.original_url[:50]}..."
+
+
+class ImportJob(models.Model):
+    """
+    A bulk food import, queued by the upload endpoint and run by the
+    run_import_jobs command.
+
+    Counts are saved after every chunk, so the job doubles as a progress
+    report while it runs and as the import result once it's done.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    format = models.CharField(max_length=10)
+    dry_run = models.BooleanField(default=False)
+    # Where the uploaded file waits for the runner (see importer.store_upload)
+    upload = models.CharField(max_length=500, blank=True, default="")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL
+    )
+    total_rows = models.IntegerField(null=True, blank=True)
+    processed_rows = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)  # [{"line": n, "error": str}]
+    # Why the whole job failed, if it did
+    failure = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "dryRun": self.dry_run,
+            "totalRows": self.total_rows,
+            "processedRows": self.processed_rows,
+            "created": self.created,
+            "updated": self.updated,
+            "errorCount": self.error_count,
+            "errors": self.errors,
+            "failure": self.failure,
+        }
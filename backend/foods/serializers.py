@@ -37,5 +37,12 @@ class FoodProposalSerializer(ModelSerializer):
     class Meta:
         model = FoodProposal
         fields = "__all__"
-        read_only_fields = ("proposedBy", "nutritionScore")
+        read_only_fields = (
+            "proposedBy",
+            "nutritionScore",
+            "nutritionScoreVersion",
+            "normalizedName",
+            "duplicateOfEntry",
+            "duplicateOfProposal",
+        )
 
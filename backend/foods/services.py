@@ -5,7 +5,36 @@ Django Admin and REST API endpoints.
 """
 
 from django.db import transaction
-from .models import FoodEntry, FoodProposal
+
+from api.db_initialization.nutrition_score import (
+    NUTRITION_SCORE_VERSION,
+    calculate_nutrition_scores,
+)
+
+from .models import FoodEntry, FoodProposal, normalize_food_name
+
+BULK_BATCH_SIZE = 500
+
+# Rows read and rescored per query by refresh_nutrition_scores
+SCORE_BATCH_SIZE = 2000
+SCORE_INPUT_FIELDS = (
+    "id",
+    "name",
+    "category",
+    "servingSize",
+    "caloriesPerServing",
+    "proteinContent",
+    "fatContent",
+    "carbohydrateContent",
+    "nutritionScore",
+    "nutritionScoreVersion",
+)
+
+# Candidates compared per lookup; all share the same indexed normalizedName
+DUPLICATE_CANDIDATE_LIMIT = 20
+# Per-100 g macros within 10% (or the absolute slack below) count as the same food
+MACRO_RELATIVE_TOLERANCE = 0.1
+MACRO_ABSOLUTE_TOLERANCE = {"calories": 5.0, "protein": 1.0, "fat": 1.0, "carbs": 1.0}
 
 
 @transaction.atomic
@@ -38,7 +67,10 @@ def approve_food_proposal(proposal):
         carbohydrateContent=proposal.carbohydrateContent,
         dietaryOptions=proposal.dietaryOptions,
         nutritionScore=proposal.nutritionScore,
+        nutritionScoreVersion=proposal.nutritionScoreVersion,
         imageUrl=proposal.imageUrl,
+        micronutrients=proposal.micronutrients,
+        sourceProposal=proposal,
     )
 
     # Copy allergens relationship
@@ -61,3 +93,230 @@ def reject_food_proposal(proposal):
     proposal.isApproved = False
     proposal.save()
     return proposal
+
+
+def _entry_from_proposal(proposal):
+    return FoodEntry(
+        name=proposal.name,
+        normalizedName=normalize_food_name(proposal.name),
+        category=proposal.category,
+        servingSize=proposal.servingSize,
+        caloriesPerServing=proposal.caloriesPerServing,
+        proteinContent=proposal.proteinContent,
+        fatContent=proposal.fatContent,
+        carbohydrateContent=proposal.carbohydrateContent,
+        dietaryOptions=proposal.dietaryOptions,
+        nutritionScore=proposal.nutritionScore,
+        nutritionScoreVersion=proposal.nutritionScoreVersion,
+        imageUrl=proposal.imageUrl,
+        micronutrients=proposal.micronutrients,
+        sourceProposal=proposal,
+    )
+
+
+@transaction.atomic
+def bulk_approve_food_proposals(proposals):
+    """
+    Approve many food proposals in one transaction.
+
+    Proposals are flagged with a single UPDATE, their FoodEntry rows and
+    allergen links are inserted with bulk_create. Already approved proposals
+    are skipped.
+
+    Args:
+        proposals: FoodProposal queryset to approve
+
+    Returns:
+        list: The created FoodEntry instances
+    """
+    pending = list(
+        proposals.exclude(isApproved=True).select_for_update().order_by("id")
+    )
+    if not pending:
+        return []
+    ids = [proposal.id for proposal in pending]
+
+    FoodProposal.objects.filter(id__in=ids).update(isApproved=True)
+    entries = FoodEntry.objects.bulk_create(
+        [_entry_from_proposal(proposal) for proposal in pending],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    # MySQL doesn't return primary keys from bulk inserts, so map entries back
+    # to their proposals through sourceProposal (latest entry per proposal)
+    entry_ids = dict(
+        FoodEntry.objects.filter(sourceProposal_id__in=ids)
+        .order_by("id")
+        .values_list("sourceProposal_id", "id")
+    )
+
+    ProposalAllergen = FoodProposal.allergens.through
+    EntryAllergen = FoodEntry.allergens.through
+    EntryAllergen.objects.bulk_create(
+        [
+            EntryAllergen(foodentry_id=entry_ids[proposal_id], allergen_id=allergen_id)
+            for proposal_id, allergen_id in ProposalAllergen.objects.filter(
+                foodproposal_id__in=ids
+            ).values_list("foodproposal_id", "allergen_id")
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    return entries
+
+
+@transaction.atomic
+def bulk_reject_food_proposals(proposals):
+    """
+    Reject many food proposals with a single UPDATE.
+
+    Args:
+        proposals: FoodProposal queryset to reject
+
+    Returns:
+        int: Number of proposals rejected
+    """
+    return proposals.exclude(isApproved=False).update(isApproved=False)
+
+
+def _macro_profile(food):
+    """Per-100 g macros of a FoodEntry, FoodProposal or dict of their fields."""
+    get = food.get if isinstance(food, dict) else lambda field: getattr(food, field)
+    serving = float(get("servingSize") or 0) or 100.0
+    scale = 100.0 / serving
+    return {
+        "calories": float(get("caloriesPerServing") or 0) * scale,
+        "protein": float(get("proteinContent") or 0) * scale,
+        "fat": float(get("fatContent") or 0) * scale,
+        "carbs": float(get("carbohydrateContent") or 0) * scale,
+    }
+
+
+def macros_similar(a, b):
+    """Whether two foods have near-identical per-100 g macro profiles."""
+    profile_a, profile_b = _macro_profile(a), _macro_profile(b)
+    for macro, absolute in MACRO_ABSOLUTE_TOLERANCE.items():
+        x, y = profile_a[macro], profile_b[macro]
+        if abs(x - y) > max(absolute, MACRO_RELATIVE_TOLERANCE * max(x, y)):
+            return False
+    return True
+
+
+def find_duplicates(food, exclude_proposal_id=None):
+    """
+    Find a catalog entry and a pending proposal that duplicate ``food``.
+
+    Candidates are fetched by the indexed normalizedName key (bounded by
+    DUPLICATE_CANDIDATE_LIMIT), then compared by macro profile, so the cost
+    doesn't grow with the size of the catalog.
+
+    Args:
+        food: FoodProposal instance or dict with name and macro fields
+        exclude_proposal_id: Proposal to leave out of the candidates (itself)
+
+    Returns:
+        tuple: (FoodEntry or None, FoodProposal or None)
+    """
+    name = food["name"] if isinstance(food, dict) else food.name
+    key = normalize_food_name(name)
+    if not key:
+        return None, None
+
+    entry = next(
+        (
+            candidate
+            for candidate in FoodEntry.objects.filter(normalizedName=key).order_by(
+                "id"
+            )[:DUPLICATE_CANDIDATE_LIMIT]
+            if macros_similar(food, candidate)
+        ),
+        None,
+    )
+
+    proposals = FoodProposal.objects.filter(
+        normalizedName=key, isApproved__isnull=True
+    ).order_by("id")
+    if exclude_proposal_id is not None:
+        proposals = proposals.exclude(id=exclude_proposal_id)
+    proposal = next(
+        (
+            candidate
+            for candidate in proposals[:DUPLICATE_CANDIDATE_LIMIT]
+            if macros_similar(food, candidate)
+        ),
+        None,
+    )
+    return entry, proposal
+
+
+def flag_duplicates(proposal):
+    """
+    Record the near-duplicates of a newly submitted proposal on it.
+
+    Returns:
+        FoodProposal: The updated proposal
+    """
+    entry, duplicate = find_duplicates(proposal, exclude_proposal_id=proposal.id)
+    proposal.duplicateOfEntry = entry
+    proposal.duplicateOfProposal = duplicate
+    if entry or duplicate:
+        proposal.save(update_fields=["duplicateOfEntry", "duplicateOfProposal"])
+    return proposal
+
+
+def refresh_nutrition_scores(
+    model, batch_size=SCORE_BATCH_SIZE, max_batches=None, force=False, dry_run=False
+):
+    """
+    Recompute nutritionScore for rows scored by an older (or no) version.
+
+    Rows are walked by primary key, batch_size at a time, and written back
+    with bulk_update, so the work can be spread over several runs with
+    max_batches.
+
+    Args:
+        model: FoodEntry or FoodProposal
+        batch_size (int): Rows scored per query
+        max_batches (int): Stop after this many batches, None for all
+        force (bool): Rescore every row, not just the outdated ones
+        dry_run (bool): Count without writing
+
+    Returns:
+        tuple: (scanned, changed) - rows read and rows whose score changed
+    """
+    queryset = model.objects.all()
+    if not force:
+        queryset = queryset.filter(nutritionScoreVersion__lt=NUTRITION_SCORE_VERSION)
+
+    scanned = changed = batches = last_id = 0
+    while max_batches is None or batches < max_batches:
+        rows = list(
+            queryset.filter(id__gt=last_id)
+            .order_by("id")
+            .values(*SCORE_INPUT_FIELDS)[:batch_size]
+        )
+        if not rows:
+            break
+        batches += 1
+        last_id = rows[-1]["id"]
+        scanned += len(rows)
+
+        updates = []
+        for row, score in zip(rows, calculate_nutrition_scores(rows)):
+            if row["nutritionScore"] != score:
+                changed += 1
+            elif row["nutritionScoreVersion"] == NUTRITION_SCORE_VERSION:
+                continue
+            updates.append(
+                model(
+                    id=row["id"],
+                    nutritionScore=score,
+                    nutritionScoreVersion=NUTRITION_SCORE_VERSION,
+                )
+            )
+        if updates and not dry_run:
+            model.objects.bulk_update(
+                updates, ["nutritionScore", "nutritionScoreVersion"]
+            )
+
+    return scanned, changed
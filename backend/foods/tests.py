@@ -1,14 +1,41 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from foods.models import FoodEntry, FoodProposal
+from django.utils import timezone
+from foods.models import (
+    Allergen as FoodAllergen,
+    FoodEntry,
+    FoodProposal,
+    ImportJob,
+    normalize_food_name,
+)
+from api.db_initialization.nutrition_score import (
+    NUTRITION_SCORE_VERSION,
+    calculate_nutrition_score,
+)
+from foods import importer
+from foods.views import _fatsecret_source
+from foods.services import find_duplicates, refresh_nutrition_scores
 from foods.serializers import FoodEntrySerializer
 from accounts.models import Allergen
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+import json
+import os
 import requests
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from project.utils import response_cache
+from project.utils.resilience import UpstreamUnavailable
 
 User = get_user_model()
 
@@ -146,6 +173,9 @@ class FoodCatalogTests(TestCase):
 
 
 class SuggestRecipeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_suggest_recipe_successful(self):
         """Test that a valid food_name returns a recipe."""
         response = self.client.get(reverse("suggest_recipe"), {"food_name": "chicken"})
@@ -167,10 +197,11 @@ class SuggestRecipeTests(TestCase):
 
 class RandomMealTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.url = reverse("random-meal")
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_successful_random_meal(self, mock_get):
         """Test that a successful API call returns a random meal with all required fields."""
         # Mock successful API response
@@ -214,7 +245,7 @@ class RandomMealTests(TestCase):
         self.assertEqual(response.data["name"], "Teriyaki Chicken Casserole")
         self.assertEqual(len(response.data["ingredients"]), 2)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_empty_meals_response(self, mock_get):
         """Test that an empty meals response returns appropriate error."""
         # Mock empty meals response
@@ -227,7 +258,7 @@ class RandomMealTests(TestCase):
         self.assertIn("warning", response.data)
         self.assertIn("results", response.data)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_api_error(self, mock_get):
         """Test that API errors are handled properly."""
         # Mock API error
@@ -238,8 +269,137 @@ class RandomMealTests(TestCase):
         self.assertIn("error", response.data)
 
 
+class ResponseCacheTests(TestCase):
+    """Tests for the shared third-party response cache"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.reset_stats()
+
+    @patch("requests.Session.request")
+    def test_repeated_lookup_is_served_from_cache(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "meals": [{"strMeal": "Chicken Curry", "strInstructions": "Cook it."}]
+        }
+
+        first = self.client.get(reverse("suggest_recipe"), {"food_name": "Chicken"})
+        second = self.client.get(
+            reverse("suggest_recipe"), {"food_name": "  chicken "}
+        )
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(mock_get.call_count, 1)
+        stats = response_cache.get_stats()["themealdb.search"]
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    @patch("requests.Session.request")
+    def test_empty_result_is_negatively_cached(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"meals": None}
+
+        for _ in range(2):
+            response = self.client.get(
+                reverse("suggest_recipe"), {"food_name": "nothing"}
+            )
+            self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(
+            response_cache.get_stats()["themealdb.search"]["negative_hits"], 1
+        )
+
+    @patch("requests.Session.request")
+    def test_upstream_error_is_not_cached(self, mock_get):
+        mock_get.side_effect = requests.ConnectionError("down")
+        response = self.client.get(reverse("suggest_recipe"), {"food_name": "rice"})
+        self.assertEqual(response.status_code, 500)
+
+        mock_get.side_effect = None
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "meals": [{"strMeal": "Rice Pudding", "strInstructions": "Stir."}]
+        }
+        response = self.client.get(reverse("suggest_recipe"), {"food_name": "rice"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        fetched = []
+
+        def fetch():
+            fetched.append(True)
+            return ["fresh"]
+
+        query = response_cache.normalize_query("stale")
+        key = response_cache._cache_key("themealdb.search", query)
+        cache.set(key, {"value": ["old"], "empty": False, "fresh_until": 0})
+
+        with patch("project.utils.response_cache.threading.Thread") as mock_thread:
+            value = response_cache.get_or_fetch("themealdb.search", query, fetch)
+            refresh = mock_thread.call_args.kwargs["target"]
+
+        self.assertEqual(value, ["old"])
+        refresh()
+        self.assertEqual(fetched, [True])
+        self.assertEqual(
+            response_cache.get_or_fetch("themealdb.search", query, fetch), ["fresh"]
+        )
+        self.assertEqual(response_cache.get_stats()["themealdb.search"]["refreshes"], 1)
+
+    @patch("project.utils.response_cache.FILL_WAIT_SECONDS", 0)
+    def test_fill_never_releases_another_process_lock(self):
+        query = response_cache.normalize_query("locked")
+        key = response_cache._cache_key("themealdb.search", query)
+        # Another process is filling this entry
+        cache.set(f"{key}:fill", "their-token")
+
+        value = response_cache.get_or_fetch("themealdb.search", query, lambda: ["x"])
+
+        self.assertEqual(value, ["x"])
+        self.assertEqual(cache.get(f"{key}:fill"), "their-token")
+
+    def test_lock_is_released_only_by_its_holder(self):
+        token = response_cache._acquire(cache, "lock", 60)
+        self.assertIsNone(response_cache._acquire(cache, "lock", 60))
+
+        response_cache._release(cache, "lock", "someone-else")
+        self.assertEqual(cache.get("lock"), token)
+        response_cache._release(cache, "lock", token)
+        self.assertIsNone(cache.get("lock"))
+
+    def test_redis_lock_is_released_atomically(self):
+        from django.core.cache.backends.redis import RedisCache
+
+        redis_cache = RedisCache("redis://localhost:6379/0", {})
+        client = Mock()
+        with patch.object(RedisCache, "_cache", Mock()) as redis_client:
+            redis_client.get_client.return_value = client
+            response_cache._release(redis_cache, "lock", 1234)
+
+        key = redis_cache.make_and_validate_key("lock")
+        client.eval.assert_called_once_with(
+            response_cache._RELEASE_SCRIPT, 1, key, "1234"
+        )
+        client.delete.assert_not_called()
+
+    def test_stats_are_kept_in_the_shared_cache(self):
+        response_cache._record("themealdb.search", "hits")
+        response_cache._record("themealdb.search", "hits")
+
+        # What another worker's counters would read
+        self.assertEqual(
+            cache.get(response_cache._stats_key("themealdb.search", "hits")), 2
+        )
+        self.assertEqual(response_cache.get_stats()["themealdb.search"]["hits"], 2)
+        response_cache.reset_stats()
+        self.assertEqual(response_cache.get_stats(), {})
+
+
 class GetOrFetchFoodEntryTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.url = reverse("get_or_fetch_food")
         
@@ -347,6 +507,306 @@ class GetOrFetchFoodEntryTests(APITestCase):
         self.assertEqual(food.fatContent, parsed_data["fat"])
         self.assertEqual(food.imageUrl, mock_image_url.return_value)
         self.assertEqual(food.proposedBy, self.user)
+        self.assertGreater(food.nutritionScore, 0)
+        self.assertEqual(food.nutritionScoreVersion, NUTRITION_SCORE_VERSION)
+
+    @patch("foods.views.make_request")
+    def test_not_found_is_cached(self, mock_make_request):
+        """
+        A FatSecret miss is cached, so repeating the lookup doesn't call the API.
+        """
+        mock_make_request.return_value = {"foods": {"food": []}}
+        self.client.get(self.url, {"name": "Banana"})
+        response = self.client.get(self.url, {"name": "  banana "})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(mock_make_request.call_count, 1)
+
+    @patch("foods.views.make_request")
+    @patch("foods.views.extract_food_info")
+    @patch("foods.views.get_fatsecret_image_url")
+    def test_repeated_lookup_reuses_pending_proposal(
+        self, mock_image_url, mock_extract, mock_make
+    ):
+        """
+        Looking up the same unknown food twice creates a single proposal.
+        """
+        mock_make.side_effect = [
+            {"foods": {"food": [{"food_id": "123"}]}},
+            {"food": {"food_url": "http://example.com"}},
+        ]
+        mock_extract.return_value = {"food_name": "Banana", "calories": 89.0}
+        mock_image_url.return_value = "http://image.test/banana.png"
+
+        first = self.client.get(self.url, {"name": "Banana"})
+        second = self.client.get(self.url, {"name": "banana"})
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(FoodProposal.objects.filter(name="Banana").count(), 1)
+        self.assertEqual(mock_make.call_count, 2)
+        mock_image_url.assert_called_once()
+
+    @patch("foods.views.IMAGE_SCRAPE_WAIT", 0.01)
+    @patch("foods.views.make_request")
+    @patch("foods.views.extract_food_info")
+    @patch("foods.views.get_fatsecret_image_url")
+    def test_slow_image_scrape_does_not_block_proposal(
+        self, mock_image_url, mock_extract, mock_make
+    ):
+        """
+        A slow image scrape is left running and the proposal is returned without it.
+        """
+        release = threading.Event()
+
+        def slow_scrape(url):
+            release.wait(5)
+            return "http://image.test/banana.png"
+
+        mock_make.side_effect = [
+            {"foods": {"food": [{"food_id": "123"}]}},
+            {"food": {"food_url": "http://example.com"}},
+        ]
+        mock_extract.return_value = {"food_name": "Banana", "calories": 89.0}
+        mock_image_url.side_effect = slow_scrape
+
+        with patch("foods.views._store_deferred_image") as mock_store:
+            response = self.client.get(self.url, {"name": "Banana"})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data["imageUrl"], "")
+            release.set()
+            for _ in range(50):
+                if mock_store.called:
+                    break
+                time.sleep(0.05)
+            proposal_id, future = mock_store.call_args[0]
+            self.assertEqual(proposal_id, response.data["id"])
+            self.assertEqual(future.result(), "http://image.test/banana.png")
+
+    @patch("foods.views.IMAGE_SCRAPE_WAIT", 0.01)
+    @patch("foods.views.make_request")
+    @patch("foods.views.extract_food_info")
+    @patch("foods.views.get_fatsecret_image_url")
+    def test_deferred_image_store_never_runs_on_request_thread(
+        self, mock_image_url, mock_extract, mock_make
+    ):
+        """
+        A scrape finishing before its callback is added is still stored off
+        the request thread, whose DB connection the store closes.
+        """
+        release = threading.Event()
+
+        def slow_scrape(url):
+            release.wait(5)
+            return "http://image.test/banana.png"
+
+        def save_proposal(*args, **kwargs):
+            # The scrape finishes while the proposal is being saved
+            release.set()
+            time.sleep(0.1)
+            return create(*args, **kwargs)
+
+        mock_make.side_effect = [
+            {"foods": {"food": [{"food_id": "123"}]}},
+            {"food": {"food_url": "http://example.com"}},
+        ]
+        mock_extract.return_value = {"food_name": "Banana", "calories": 89.0}
+        mock_image_url.side_effect = slow_scrape
+        threads = []
+        create = FoodProposal.objects.create
+
+        with patch(
+            "foods.views._store_deferred_image",
+            side_effect=lambda *args: threads.append(threading.current_thread()),
+        ), patch.object(FoodProposal.objects, "create", side_effect=save_proposal):
+            response = self.client.get(self.url, {"name": "Banana"})
+            for _ in range(50):
+                if threads:
+                    break
+                time.sleep(0.05)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+
+class FoodEnrichmentTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("food_enrichment")
+        User.objects.create_user(
+            username="enricher", email="enricher@example.com", password="pass12345"
+        )
+        token = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "enricher", "password": "pass12345"},
+        ).data["access"]
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def sources(self, **overrides):
+        sources = {
+            "fatsecret": lambda name: {
+                "name": name,
+                "calories": 52.0,
+                "protein": 0.3,
+                "fat": 0.2,
+                "carbohydrates": 14.0,
+                "micronutrients": {"vitamin_c": 4.6},
+            },
+            "openfoodfacts": lambda name: {
+                "calories": 50.0,
+                "protein": None,
+                "fat": 0.1,
+                "carbohydrates": 13.0,
+                "fiber": 2.4,
+            },
+            "wikidata": lambda name: {
+                "id": "Q89",
+                "description": "fruit of the apple tree",
+                "wikipedia_link": "https://en.wikipedia.org/wiki/Apple",
+            },
+        }
+        sources.update(overrides)
+        return patch.dict("foods.views.ENRICHMENT_SOURCES", sources)
+
+    def test_requires_authentication(self):
+        response = self.client.get(self.url, {"name": "apple"})
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_name(self):
+        response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_merges_sources_by_priority(self):
+        with self.sources():
+            response = self.client.get(self.url, {"name": "apple"}, **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data["partial"])
+        self.assertEqual(data["wikidataId"], "Q89")
+        self.assertEqual(
+            data["nutrition"],
+            {
+                "calories": 52.0,
+                "protein": 0.3,
+                "fat": 0.2,
+                "carbohydrates": 14.0,
+                "fiber": 2.4,
+                "micronutrients": {"vitamin_c": 4.6},
+            },
+        )
+
+    @patch("foods.views.ENRICHMENT_SOURCE_DEADLINE", 0.2)
+    def test_slow_source_returns_partial_result(self):
+        def slow(name):
+            time.sleep(1)
+            return {"calories": 1.0}
+
+        def unavailable(name):
+            raise UpstreamUnavailable("circuit is open")
+
+        started = time.monotonic()
+        with self.sources(fatsecret=slow, wikidata=unavailable):
+            response = self.client.get(self.url, {"name": "apple"}, **self.auth)
+
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data["partial"])
+        self.assertEqual(data["sources"]["fatsecret"]["status"], "timeout")
+        self.assertEqual(data["sources"]["wikidata"]["status"], "unavailable")
+        self.assertEqual(data["nutrition"]["calories"], 50.0)
+
+    def fatsecret(self, amount, unit):
+        parsed = {
+            "food_name": "Milk",
+            "calories": 120.0,
+            "protein": 8.0,
+            "fat": 5.0,
+            "carbohydrates": 12.0,
+            "serving_amount": amount,
+            "serving_unit": unit,
+            "micronutrients": {"calcium": 300.0},
+        }
+        with patch(
+            "foods.views.response_cache.get_or_fetch",
+            return_value={"parsed": parsed, "food_url": ""},
+        ):
+            return _fatsecret_source("milk")
+
+    def test_fatsecret_mass_servings_are_scaled_to_100g(self):
+        data = self.fatsecret(8, "oz")
+        self.assertEqual(data["per"], "100 g")
+        self.assertAlmostEqual(data["calories"], 120.0 * 100 / (8 * 28.349523125))
+        self.assertAlmostEqual(data["micronutrients"]["calcium"], 300.0 * 100 / (8 * 28.349523125))
+
+    def test_fatsecret_volume_servings_are_not_merged(self):
+        data = self.fatsecret(244, "ml")
+        self.assertEqual(data["per"], "244 ml")
+        self.assertEqual(data["perServing"]["calories"], 120.0)
+
+        with self.sources(fatsecret=lambda name: data):
+            response = self.client.get(self.url, {"name": "milk"}, **self.auth)
+        # Open Food Facts' per-100 g values win over per-serving ones
+        self.assertEqual(response.json()["nutrition"]["calories"], 50.0)
+
+    def test_not_found_anywhere(self):
+        nothing = lambda name: None
+        with self.sources(fatsecret=nothing, openfoodfacts=nothing, wikidata=nothing):
+            response = self.client.get(self.url, {"name": "zzz"}, **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache.reset_stats()
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Concurrent misses for the same key make a single upstream call."""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ["meal"]
+
+        results = []
+
+        def lookup():
+            results.append(
+                response_cache.get_or_fetch("themealdb.search", "apple", fetch)
+            )
+
+        leader = threading.Thread(target=lookup)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lookup) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["meal"]] * 4)
+        stats = response_cache.get_stats()["themealdb.search"]
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["coalesced"], 3)
+
+    def test_fetch_error_is_shared_and_not_cached(self):
+        def fetch():
+            raise requests.RequestException("boom")
+
+        with self.assertRaises(requests.RequestException):
+            response_cache.get_or_fetch("themealdb.search", "apple", fetch)
+        self.assertEqual(
+            response_cache.get_or_fetch("themealdb.search", "apple", lambda: ["ok"]),
+            ["ok"],
+        )
 
 
 class FoodProposalTests(APITestCase):
@@ -618,6 +1078,7 @@ class FoodNutritionInfoTests(APITestCase):
     """Tests for food nutrition info endpoint using Open Food Facts API"""
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser",
             email="test@example.com",
@@ -632,7 +1093,7 @@ class FoodNutritionInfoTests(APITestCase):
         )
         self.access_token = token_res.data["access"]
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_success(self, mock_get):
         """Test successful nutrition info fetch from Open Food Facts API"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -682,7 +1143,7 @@ class FoodNutritionInfoTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_not_found(self, mock_get):
         """Test when no products are found in API"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -697,7 +1158,7 @@ class FoodNutritionInfoTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("warning", response.data)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_api_error(self, mock_get):
         """Test handling of API errors"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -708,7 +1169,7 @@ class FoodNutritionInfoTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn("error", response.data)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_incomplete_data(self, mock_get):
         """Test when API returns incomplete nutrition data"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -734,7 +1195,7 @@ class FoodNutritionInfoTests(APITestCase):
         self.assertIsNone(response.data.get("protein"))
         self.assertIsNone(response.data.get("fat"))
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_timeout(self, mock_get):
         """Test handling of timeout errors"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -745,7 +1206,7 @@ class FoodNutritionInfoTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn("error", response.data)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_empty_name(self, mock_get):
         """Test with empty name parameter"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -753,7 +1214,7 @@ class FoodNutritionInfoTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    @patch("requests.get")
+    @patch("requests.Session.request")
     def test_get_nutrition_info_special_characters(self, mock_get):
         """Test with food name containing special characters"""
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -778,3 +1239,590 @@ class FoodNutritionInfoTests(APITestCase):
         response = self.client.get(self.nutrition_info_url, {"name": "peanut-butter & jelly"})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BulkFoodProposalModerationTests(APITestCase):
+    """Tests for bulk approve/reject of food proposals"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="moderator",
+            email="moderator@example.com",
+            password="testpass123",
+            is_staff=True,
+        )
+        self.user = User.objects.create_user(
+            username="proposer",
+            email="proposer@example.com",
+            password="testpass123",
+        )
+        self.url = reverse("moderation-food-proposals-bulk")
+        self.peanuts = FoodAllergen.objects.create(name="Peanuts")
+        self.proposals = [
+            FoodProposal.objects.create(
+                name=f"Proposal {i}",
+                category="Fruit" if i % 2 else "Snacks",
+                servingSize=100,
+                caloriesPerServing=50 + i,
+                proteinContent=1,
+                fatContent=1,
+                carbohydrateContent=10,
+                nutritionScore=5.0,
+                micronutrients={"iron": 1.0},
+                proposedBy=self.user,
+            )
+            for i in range(6)
+        ]
+        self.proposals[0].allergens.set([self.peanuts])
+        self.client.force_authenticate(user=self.admin)
+
+    def test_bulk_approve_by_ids(self):
+        ids = [p.id for p in self.proposals[:3]]
+        response = self.client.post(
+            self.url, {"approved": True, "ids": ids}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            FoodProposal.objects.filter(id__in=ids, isApproved=True).count(), 3
+        )
+        entry = FoodEntry.objects.get(sourceProposal=self.proposals[0])
+        self.assertEqual(entry.name, "Proposal 0")
+        self.assertEqual(entry.micronutrients, {"iron": 1.0})
+        self.assertEqual(list(entry.allergens.all()), [self.peanuts])
+        self.assertEqual(FoodEntry.objects.filter(sourceProposal__isnull=False).count(), 3)
+
+    def test_bulk_approve_is_a_constant_number_of_queries(self):
+        ids = [p.id for p in self.proposals]
+        # select, update, insert entries, map entries, select and insert allergens,
+        # plus savepoint handling
+        with self.assertNumQueries(8):
+            self.client.post(self.url, {"approved": True, "ids": ids}, format="json")
+
+    def test_bulk_approve_skips_already_approved(self):
+        self.proposals[0].isApproved = True
+        self.proposals[0].save()
+
+        response = self.client.post(
+            self.url,
+            {"approved": True, "ids": [self.proposals[0].id, self.proposals[1].id]},
+            format="json",
+        )
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertFalse(FoodEntry.objects.filter(name="Proposal 0").exists())
+
+    def test_bulk_reject_by_filter(self):
+        self.proposals[1].isApproved = True
+        self.proposals[1].save()
+
+        response = self.client.post(
+            self.url,
+            {"approved": False, "filter": {"isApproved": "null", "category": "fruit"}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(FoodProposal.objects.filter(isApproved=False).count(), 2)
+        self.assertFalse(FoodEntry.objects.filter(sourceProposal__isnull=False).exists())
+
+    def test_requires_ids_or_filter(self):
+        for body in (
+            {"approved": True},
+            {"approved": True, "ids": [1], "filter": {"category": "Fruit"}},
+            {"approved": True, "filter": {"unknown": 1}},
+            {"approved": True, "filter": {"createdBefore": "yesterday"}},
+            {"approved": True, "filter": {}},
+            {"approved": True, "filter": {"isApproved": 1}},
+            {"approved": True, "filter": {"isApproved": "maybe"}},
+        ):
+            response = self.client.post(self.url, body, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(FoodProposal.objects.filter(isApproved__isnull=False).exists())
+
+    def test_filter_accepts_json_null_for_pending(self):
+        self.proposals[1].isApproved = False
+        self.proposals[1].save()
+
+        response = self.client.post(
+            self.url,
+            {"approved": False, "filter": {"isApproved": None, "category": "Fruit"}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.url, {"approved": True, "ids": [self.proposals[0].id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class NearDuplicateProposalTests(APITestCase):
+    """Tests for submission-time duplicate detection"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="dupuser", email="dup@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.proposal_url = reverse("submit_food_proposal")
+        self.entry = FoodEntry.objects.create(
+            name="Crème Brûlée",
+            category="Dessert",
+            servingSize=100,
+            caloriesPerServing=300,
+            proteinContent=4,
+            fatContent=20,
+            carbohydrateContent=26,
+            nutritionScore=2.0,
+        )
+
+    def proposal_data(self, **overrides):
+        data = {
+            "name": "creme-brulee!",
+            "category": "Dessert",
+            "servingSize": 200,
+            "caloriesPerServing": 606,
+            "proteinContent": 8.2,
+            "fatContent": 39.5,
+            "carbohydrateContent": 52,
+        }
+        data.update(overrides)
+        return data
+
+    def test_normalize_food_name(self):
+        self.assertEqual(normalize_food_name("  Crème  Brûlée! "), "creme brulee")
+        self.assertEqual(normalize_food_name("Chicken_Breast, RAW"), "chicken breast raw")
+        self.assertEqual(self.entry.normalizedName, "creme brulee")
+
+    def test_flags_duplicate_of_catalog_entry(self):
+        response = self.client.post(
+            self.proposal_url, self.proposal_data(), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["duplicateOfEntry"], self.entry.id)
+        self.assertIsNone(response.data["duplicateOfProposal"])
+
+    def test_different_macros_are_not_flagged(self):
+        response = self.client.post(
+            self.proposal_url,
+            self.proposal_data(caloriesPerServing=300, fatContent=5),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data["duplicateOfEntry"])
+
+    def test_flags_duplicate_of_pending_proposal(self):
+        first = self.client.post(
+            self.proposal_url, self.proposal_data(name="Pão de Queijo"), format="json"
+        )
+        second = self.client.post(
+            self.proposal_url, self.proposal_data(name="pao de queijo"), format="json"
+        )
+
+        self.assertIsNone(first.data["duplicateOfProposal"])
+        self.assertEqual(second.data["duplicateOfProposal"], first.data["id"])
+
+    def test_duplicate_lookup_is_constant_queries(self):
+        for i in range(30):
+            FoodEntry.objects.create(
+                name="Creme Brulee",
+                category="Dessert",
+                servingSize=100,
+                caloriesPerServing=100 + i * 50,
+                proteinContent=1,
+                fatContent=1,
+                carbohydrateContent=1,
+                nutritionScore=1.0,
+            )
+        proposal = FoodProposal.objects.create(
+            name="Creme brulee",
+            category="Dessert",
+            servingSize=100,
+            caloriesPerServing=5,
+            proteinContent=0,
+            fatContent=0,
+            carbohydrateContent=0,
+            nutritionScore=0,
+            proposedBy=self.user,
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(find_duplicates(proposal, proposal.id), (None, None))
+
+    @patch("foods.views.make_request")
+    @patch("foods.views.extract_food_info")
+    def test_get_or_fetch_returns_matching_entry(self, mock_extract, mock_make):
+        cache.clear()
+        mock_make.side_effect = [
+            {"foods": {"food": [{"food_id": "1"}]}},
+            {"food": {"food_url": "http://example.com"}},
+        ]
+        mock_extract.return_value = {
+            "food_name": "Creme Brulee",
+            "serving_amount": 100.0,
+            "calories": 301.0,
+            "protein": 4.0,
+            "fat": 20.0,
+            "carbohydrates": 26.0,
+        }
+
+        response = self.client.get(reverse("get_or_fetch_food"), {"name": "brulee"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.entry.id)
+        self.assertFalse(FoodProposal.objects.exists())
+
+    def test_get_or_fetch_matches_normalized_name(self):
+        response = self.client.get(
+            reverse("get_or_fetch_food"), {"name": "CREME BRULEE"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.entry.id)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), FOOD_IMPORT_BUCKET="")
+class FoodImportTests(APITestCase):
+    """Tests for the bulk food import endpoint and commands"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="importer",
+            email="importer@example.com",
+            password="testpass123",
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse("food_import")
+        FoodAllergen.objects.create(name="Gluten")
+        self.existing = FoodEntry.objects.create(
+            name="Import Test Bread",
+            category="Grain",
+            servingSize=100,
+            caloriesPerServing=250,
+            proteinContent=9,
+            fatContent=3,
+            carbohydrateContent=49,
+            nutritionScore=0,
+        )
+
+    def post(self, content, name="foods.ndjson", **params):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        upload = SimpleUploadedFile(name, content)
+        url = self.url
+        if params:
+            url += "?" + "&".join(f"{k}={v}" for k, v in params.items())
+        return self.client.post(url, {"file": upload}, format="multipart")
+
+    def upload(self, content, name="foods.ndjson", **params):
+        """Queue an import, run the runner and return the job's status."""
+        response = self.post(content, name, **params)
+        if response.status_code != status.HTTP_202_ACCEPTED:
+            return response
+        call_command("run_import_jobs", stdout=StringIO())
+        return self.client.get(reverse("food_import_job", args=[response.data["id"]]))
+
+    def test_upload_is_queued(self):
+        response = self.post("{}")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ImportJob.STATUS_PENDING)
+        job = ImportJob.objects.get(id=response.data["id"])
+        self.assertTrue(job.upload.startswith(settings.MEDIA_ROOT))
+        with open(job.upload, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "{}")
+
+    def test_runner_claims_each_job_once_and_deletes_its_upload(self):
+        first = self.post("{}").data["id"]
+        second = self.post("{}").data["id"]
+
+        claimed = importer.claim_import_job()
+        self.assertEqual(claimed.id, first)
+        self.assertEqual(claimed.status, ImportJob.STATUS_RUNNING)
+        self.assertEqual(importer.claim_import_job().id, second)
+        self.assertIsNone(importer.claim_import_job())
+
+        job = importer.run_import_job(claimed)
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertFalse(os.path.exists(job.upload))
+
+    def test_stale_running_jobs_are_failed(self):
+        job_id = self.post("{}").data["id"]
+        job = importer.claim_import_job()
+        ImportJob.objects.filter(id=job_id).update(
+            updated_at=timezone.now() - importer.STALE_AFTER - timedelta(minutes=1)
+        )
+        live_id = self.post("{}").data["id"]
+        importer.claim_import_job()
+
+        self.assertEqual(importer.fail_stale_import_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertFalse(os.path.exists(job.upload))
+        self.assertEqual(
+            ImportJob.objects.get(id=live_id).status, ImportJob.STATUS_RUNNING
+        )
+
+    def test_undecodable_file_fails_before_any_write(self):
+        valid = json.dumps(
+            {
+                "name": "Import Test Fig",
+                "category": "Fruit",
+                "caloriesPerServing": 74,
+                "proteinContent": 0.8,
+                "fatContent": 0.3,
+                "carbohydrateContent": 19,
+            }
+        )
+        # Past the first decode buffer, so the bad byte turns up mid-import
+        content = (valid + "\n") * 200 + '{"name": "caf\xe9"}\n'
+        self.post(content.encode("latin-1"))
+        job = importer.run_import_job(importer.claim_import_job(), chunk_size=1)
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.failure, "File must be UTF-8 encoded")
+        self.assertFalse(FoodEntry.objects.filter(name="Import Test Fig").exists())
+
+    def test_progress_is_saved_per_chunk(self):
+        content = "\n".join(
+            json.dumps(
+                {
+                    "name": f"Import Test Berry {i}",
+                    "category": "Fruit",
+                    "caloriesPerServing": 50,
+                    "proteinContent": 1,
+                    "fatContent": 0.3,
+                    "carbohydrateContent": 12,
+                }
+            )
+            for i in range(5)
+        )
+        self.post(content)
+        seen = []
+        save_progress = importer._save_progress
+
+        def record(job, result, rows_read):
+            save_progress(job, result, rows_read)
+            seen.append((job.total_rows, job.processed_rows, job.created))
+
+        with patch("foods.importer._save_progress", side_effect=record):
+            job = importer.run_import_job(importer.claim_import_job(), chunk_size=2)
+
+        self.assertEqual(seen, [(5, 2, 2), (5, 4, 4), (5, 5, 5)])
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+
+    def test_ndjson_upserts_and_reports_errors(self):
+        lines = [
+            {
+                "name": "import test bread!",
+                "category": "Grain",
+                "servingSize": 50,
+                "caloriesPerServing": 130,
+                "proteinContent": 4.5,
+                "fatContent": 1.5,
+                "carbohydrateContent": 25,
+                "allergens": ["Gluten"],
+            },
+            {"name": "No Macros", "category": "Other"},
+            {
+                "name": "Import Test Kiwi",
+                "category": "Fruit",
+                "caloriesPerServing": 61,
+                "proteinContent": 1.1,
+                "fatContent": 0.5,
+                "carbohydrateContent": 15,
+                "allergens": ["Kiwi"],
+            },
+        ]
+        content = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+
+        response = self.upload(content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], ImportJob.STATUS_DONE)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["errorCount"], 2)
+        self.assertEqual([e["line"] for e in response.data["errors"]], [2, 4])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "import test bread!")
+        self.assertEqual(self.existing.servingSize, 50)
+        self.assertGreater(self.existing.nutritionScore, 0)
+        self.assertEqual(
+            [a.name for a in self.existing.allergens.all()], ["Gluten"]
+        )
+        kiwi = FoodEntry.objects.get(normalizedName="import test kiwi")
+        self.assertEqual(kiwi.servingSize, 100)
+        self.assertEqual([a.name for a in kiwi.allergens.all()], ["Kiwi"])
+
+    def test_csv_import(self):
+        content = (
+            "name,category,servingSize,caloriesPerServing,proteinContent,"
+            "fatContent,carbohydrateContent,allergens,dietaryOptions\n"
+            "Import Test Oats,Grain,40,150,5,3,27,Gluten,Vegan;Vegetarian\n"
+            "Broken,Grain,40,abc,5,3,27,,\n"
+        )
+        response = self.upload(content, name="foods.csv")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+        oats = FoodEntry.objects.get(normalizedName="import test oats")
+        self.assertEqual(oats.dietaryOptions, ["Vegan", "Vegetarian"])
+
+    def test_dry_run_does_not_write(self):
+        content = json.dumps(
+            {
+                "name": "Import Test Plum",
+                "category": "Fruit",
+                "caloriesPerServing": 46,
+                "proteinContent": 0.7,
+                "fatContent": 0.3,
+                "carbohydrateContent": 11,
+            }
+        )
+        response = self.upload(content, dry_run="true")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertTrue(response.data["dryRun"])
+        self.assertFalse(FoodEntry.objects.filter(name="Import Test Plum").exists())
+
+    def test_chunk_queries_do_not_grow_with_rows(self):
+        rows = [
+            (
+                i,
+                {
+                    "name": f"Import Test Food {i}",
+                    "category": "Other",
+                    "caloriesPerServing": 100,
+                    "proteinContent": 1,
+                    "fatContent": 1,
+                    "carbohydrateContent": 1,
+                    "allergens": ["Gluten"],
+                },
+            )
+            for i in range(50)
+        ]
+        # Small enough for a single INSERT batch on SQLite
+        with self.assertNumQueries(7):
+            result = importer.import_foods(rows, chunk_size=500)
+        self.assertEqual(result.created, 50)
+
+    def test_requires_staff(self):
+        user = User.objects.create_user(
+            username="plain", email="plain@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(user=user)
+        response = self.upload("{}")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_management_command(self):
+        path = os.path.join(tempfile.mkdtemp(), "foods.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "name": "Import Test Pear",
+                        "category": "Fruit",
+                        "caloriesPerServing": 57,
+                        "proteinContent": 0.4,
+                        "fatContent": 0.1,
+                        "carbohydrateContent": 15,
+                    }
+                )
+            )
+        out = StringIO()
+        call_command("import_foods", path, stdout=out)
+        self.assertIn("created 1", out.getvalue())
+        self.assertTrue(FoodEntry.objects.filter(name="Import Test Pear").exists())
+
+
+class RecomputeNutritionScoresCommandTests(TestCase):
+    """Tests for the recompute_nutrition_scores command"""
+
+    def setUp(self):
+        self.food = FoodEntry.objects.create(
+            name="Recompute Test Broccoli",
+            category="Vegetable",
+            servingSize=100,
+            caloriesPerServing=34,
+            proteinContent=2.8,
+            fatContent=0.4,
+            carbohydrateContent=7,
+            nutritionScore=0,
+        )
+
+    def test_updates_changed_scores(self):
+        out = StringIO()
+        call_command("recompute_nutrition_scores", "--chunk-size", "50", stdout=out)
+
+        self.food.refresh_from_db()
+        self.assertEqual(
+            self.food.nutritionScore,
+            calculate_nutrition_score(
+                {
+                    "name": self.food.name,
+                    "category": self.food.category,
+                    "servingSize": 100,
+                    "caloriesPerServing": 34,
+                    "proteinContent": 2.8,
+                    "fatContent": 0.4,
+                    "carbohydrateContent": 7,
+                }
+            ),
+        )
+
+        self.assertEqual(self.food.nutritionScoreVersion, NUTRITION_SCORE_VERSION)
+
+        # A second run finds nothing left to rescore
+        out = StringIO()
+        call_command("recompute_nutrition_scores", stdout=out)
+        self.assertIn("FoodEntry: Updated 0 scores of 0 rows", out.getvalue())
+
+    def test_only_outdated_rows_are_rescored(self):
+        current = FoodEntry.objects.create(
+            name="Recompute Test Current",
+            category="Vegetable",
+            servingSize=100,
+            caloriesPerServing=34,
+            proteinContent=2.8,
+            fatContent=0.4,
+            carbohydrateContent=7,
+            nutritionScore=1.23,
+            nutritionScoreVersion=NUTRITION_SCORE_VERSION,
+        )
+
+        call_command("recompute_nutrition_scores", stdout=StringIO())
+        current.refresh_from_db()
+        self.assertEqual(current.nutritionScore, 1.23)
+
+        call_command("recompute_nutrition_scores", "--all", stdout=StringIO())
+        current.refresh_from_db()
+        self.assertNotEqual(current.nutritionScore, 1.23)
+
+    def test_max_batches_spreads_the_work(self):
+        stale = FoodEntry.objects.filter(
+            nutritionScoreVersion__lt=NUTRITION_SCORE_VERSION
+        )
+        before = stale.count()
+
+        scanned, _ = refresh_nutrition_scores(FoodEntry, batch_size=10, max_batches=2)
+
+        self.assertEqual(scanned, 20)
+        self.assertEqual(stale.count(), before - 20)
+
+    def test_dry_run_does_not_write(self):
+        out = StringIO()
+        call_command("recompute_nutrition_scores", "--dry-run", stdout=out)
+
+        self.assertIn("DRY RUN", out.getvalue())
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.nutritionScore, 0)
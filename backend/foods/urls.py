@@ -7,9 +7,12 @@ from .views import (
     FoodCatalog,
     GetOrFetchFoodEntry,
     FoodProposalSubmitView,
+    FoodImportView,
+    FoodImportJobView,
     suggest_recipe,
     get_random_meal,
     food_nutrition_info,
+    food_enrichment,
     image_proxy,
     image_cache_callback,
 )
@@ -29,12 +32,15 @@ urlpatterns = [
         FoodProposalSubmitView.as_view(),
         name="submit_food_proposal",
     ),
+    path("import/", FoodImportView.as_view(), name="food_import"),
+    path("import/<int:job_id>/", FoodImportJobView.as_view(), name="food_import_job"),
     path("get-or-fetch/", GetOrFetchFoodEntry.as_view(), name="get_or_fetch_food"),
     path("suggest_recipe/", suggest_recipe, name="suggest_recipe"),
     path("random-meal/", get_random_meal, name="random-meal"),
     path("", FoodCatalog.as_view(), name="get_foods"),
     path("catalog/", FoodCatalog.as_view(), name="food-catalog"),
     path("food/nutrition-info/", food_nutrition_info, name="food_nutrition_info"),
+    path("enrich/", food_enrichment, name="food_enrichment"),
     path("image-proxy/", image_proxy, name="image_proxy"),
     path("image-cache-callback/", image_cache_callback, name="image_cache_callback"),
     path("moderation/", include(moderation_router.urls), name="moderation"),
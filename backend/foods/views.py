@@ -1,33 +1,56 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
 from django.conf import settings as django_settings
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from foods.models import FoodEntry, FoodProposal, ImageCache
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from foods.models import (
+    FoodEntry,
+    FoodProposal,
+    ImageCache,
+    ImportJob,
+    normalize_food_name,
+)
+from foods.services import find_duplicates, flag_duplicates
+from foods import importer
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from foods.serializers import FoodEntrySerializer, FoodProposalSerializer
 from rest_framework.generics import ListAPIView
 from rest_framework import status
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Q
 import requests
 import sys
 import os
 import json
 import traceback
+import uuid
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from asgiref.sync import sync_to_async
 from rest_framework import status
-from django.http import HttpResponse, FileResponse, HttpResponseRedirect
+from django.http import HttpResponse, FileResponse, HttpResponseRedirect, JsonResponse
 from django.core.files.base import ContentFile
 from django.utils.http import urlencode
+import asyncio
 import hashlib
+import random
+import time
 from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from project.utils import http_client, response_cache
+from project.utils.resilience import UpstreamUnavailable
+from api.db_initialization.nutrition_score import (
+    NUTRITION_SCORE_VERSION,
+    calculate_nutrition_score,
+)
 
 sys.path.append(
     os.path.join(os.path.dirname(__file__), "..", "api", "db_initialization")
 )
 
 from scraper import make_request, extract_food_info, get_fatsecret_image_url
-from nutrition_score import calculate_nutrition_score
 
 # Lazy-loaded Pub/Sub publisher (initialized on first use)
 _pubsub_publisher = None
@@ -181,10 +204,12 @@ class FoodCatalog(ListAPIView):
         if sort_by.lower() in valid_sort_fields:
             sort_field = valid_sort_fields[sort_by.lower()]
             if order == "asc":
-                queryset = queryset.filter(category__in=categories).order_by(sort_field)
+                queryset = queryset.filter(category__in=categories).order_by(
+                    sort_field, "id"
+                )
             else:
                 queryset = queryset.filter(category__in=categories).order_by(
-                    f"-{sort_field}"
+                    f"-{sort_field}", "-id"
                 )
         else:
             # Default sort by id
@@ -236,6 +261,55 @@ class FoodCatalog(ListAPIView):
         return Response(data)
 
 
+# FatSecret page scrapes run here so a slow image lookup doesn't hold up the
+# proposal; after IMAGE_SCRAPE_WAIT seconds the proposal is saved without an
+# image and the URL is filled in once the scrape finishes.
+IMAGE_SCRAPE_WAIT = 2
+_image_scrape_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="fatsecret-image"
+)
+
+
+def _fetch_fatsecret_food(food_name):
+    """
+    Look up a food on FatSecret.
+
+    Returns:
+        dict: {"parsed": extract_food_info() output or None, "food_url": str},
+        or None if FatSecret has no match
+    """
+    search = make_request("foods.search", {"search_expression": food_name})
+    foods = search.get("foods", {}).get("food", [])
+    if not foods:
+        return None
+
+    food_id = foods[0]["food_id"]
+    details = make_request("food.get", {"food_id": food_id})
+    return {
+        "parsed": extract_food_info(details),
+        "food_url": details["food"]["food_url"],
+    }
+
+
+def _store_deferred_image(proposal_id, future):
+    """
+    Save the image URL of a scrape that outlived the request.
+
+    Always runs on an executor thread, never the request's: it closes its
+    thread's DB connection when done.
+    """
+    try:
+        image_url = future.result()
+        if image_url:
+            FoodProposal.objects.filter(id=proposal_id, imageUrl="").update(
+                imageUrl=image_url
+            )
+    except Exception as e:
+        print(f"Deferred image scrape failed for proposal {proposal_id}: {e}")
+    finally:
+        connection.close()
+
+
 class GetOrFetchFoodEntry(APIView):
     def get(self, request):
         food_name = request.query_params.get("name")
@@ -245,52 +319,97 @@ class GetOrFetchFoodEntry(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            food = FoodEntry.objects.get(name__iexact=food_name)
+        food = (
+            FoodEntry.objects.filter(normalizedName=normalize_food_name(food_name))
+            .order_by("id")
+            .first()
+        )
+        if food:
             serializer = FoodEntrySerializer(food)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        except FoodEntry.DoesNotExist:
-            pass
 
         try:
-            search = make_request("foods.search", {"search_expression": food_name})
-            foods = search.get("foods", {}).get("food", [])
-            if not foods:
+            # Cached (including "not found") and coalesced, so concurrent
+            # lookups of the same name make a single pair of FatSecret calls
+            result = response_cache.get_or_fetch(
+                "fatsecret.food",
+                response_cache.normalize_query(food_name),
+                lambda: _fetch_fatsecret_food(food_name),
+                is_empty=lambda value: value is None,
+            )
+            if result is None:
                 return Response(
                     {"error": "Food not found in FatSecret API"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            food_id = foods[0]["food_id"]
-            details = make_request("food.get", {"food_id": food_id})
-            parsed = extract_food_info(details)
-
+            parsed = result["parsed"]
             if not parsed:
                 return Response(
                     {"error": "Could not parse FatSecret response"},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
 
-            image_url = get_fatsecret_image_url(details["food"]["food_url"])
+            candidate = {
+                "name": parsed["food_name"],
+                "category": "Unknown",
+                "servingSize": parsed.get("serving_amount", 100.0),
+                "caloriesPerServing": parsed.get("calories", 0.0),
+                "proteinContent": parsed.get("protein", 0.0),
+                "fatContent": parsed.get("fat", 0.0),
+                "carbohydrateContent": parsed.get("carbohydrates", 0.0),
+            }
+            # FatSecret's name may match a catalog entry or a proposal that
+            # another request already created; return those instead
+            entry, pending = find_duplicates(candidate)
+            if entry:
+                serializer = FoodEntrySerializer(entry)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+            if pending:
+                serializer = FoodProposalSerializer(pending)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            image_future = _image_scrape_executor.submit(
+                get_fatsecret_image_url, result["food_url"]
+            )
+            try:
+                image_url = image_future.result(timeout=IMAGE_SCRAPE_WAIT)
+                deferred = False
+            except FutureTimeoutError:
+                image_url = ""
+                deferred = True
+            except Exception as e:
+                print(f"Image scrape failed for {parsed['food_name']}: {e}")
+                image_url = ""
+                deferred = False
 
             with transaction.atomic():
                 food = FoodProposal.objects.create(
-                    name=parsed["food_name"],
-                    category="Unknown",
-                    servingSize=parsed.get("serving_amount", 100.0),
-                    caloriesPerServing=parsed.get("calories", 0.0),
-                    proteinContent=parsed.get("protein", 0.0),
-                    fatContent=parsed.get("fat", 0.0),
-                    carbohydrateContent=parsed.get("carbohydrates", 0.0),
+                    **candidate,
                     dietaryOptions=[],
-                    nutritionScore=0.0,
+                    nutritionScore=calculate_nutrition_score(candidate),
+                    nutritionScoreVersion=NUTRITION_SCORE_VERSION,
                     imageUrl=image_url,
                     proposedBy=request.user,
                 )
 
+            if deferred:
+                # A callback added to an already finished future runs right
+                # here, so hand the store to the pool rather than running it
+                image_future.add_done_callback(
+                    lambda future, proposal_id=food.id: _image_scrape_executor.submit(
+                        _store_deferred_image, proposal_id, future
+                    )
+                )
+
             serializer = FoodProposalSerializer(food)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+        except UpstreamUnavailable as e:
+            return Response(
+                {"error": f"FatSecret is temporarily unavailable: {str(e)}"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         except Exception as e:
             traceback.print_exc()
             return Response(
@@ -298,6 +417,21 @@ class GetOrFetchFoodEntry(APIView):
             )
 
 
+def _search_mealdb_recipes(food_name):
+    url = f"https://www.themealdb.com/api/json/v1/1/search.php?s={food_name}"
+    response = http_client.get("themealdb", url, timeout=5)
+    response.raise_for_status()
+    return response.json().get("meals") or []
+
+
+def _fetch_random_mealdb_meal():
+    url = "https://www.themealdb.com/api/json/v1/1/random.php"
+    response = http_client.get("themealdb", url, timeout=5)
+    response.raise_for_status()
+    meals = response.json().get("meals")
+    return meals[0] if meals else None
+
+
 # get food_name as parameter
 # make api call to https://www.themealdb.com/api/json/v1/1/search.php?s={food_name}
 # check if the response is not empty
@@ -309,12 +443,12 @@ def suggest_recipe(request):
     if not food_name:
         return Response({"error": "food_name parameter is required."}, status=400)
 
-    url = f"https://www.themealdb.com/api/json/v1/1/search.php?s={food_name}"
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        meals = data.get("meals")
+        meals = response_cache.get_or_fetch(
+            "themealdb.search",
+            response_cache.normalize_query(food_name),
+            lambda: _search_mealdb_recipes(food_name),
+        )
         if not meals:
             return Response(
                 {"warning": "No recipe found for the given food name.", "results": []},
@@ -327,6 +461,11 @@ def suggest_recipe(request):
                 "Instructions": meal.get("strInstructions"),
             }
         )
+    except UpstreamUnavailable as e:
+        return Response(
+            {"error": f"Recipe service is temporarily unavailable: {str(e)}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except requests.RequestException as e:
         return Response({"error": f"Failed to fetch recipe: {str(e)}"}, status=500)
 
@@ -334,18 +473,19 @@ def suggest_recipe(request):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_random_meal(request):
-    url = "https://www.themealdb.com/api/json/v1/1/random.php"
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        meals = data.get("meals")
-        if not meals:
+        # Serve from a small pool of cached random meals
+        slot = random.randrange(response_cache.RANDOM_POOL_SIZE)
+        meal = response_cache.get_or_fetch(
+            "themealdb.random",
+            response_cache.normalize_query("random", slot),
+            _fetch_random_mealdb_meal,
+        )
+        if not meal:
             return Response(
                 {"warning": "No random meal found.", "results": []},
                 status=404,
             )
-        meal = meals[0]
         return Response(
             {
                 "id": meal.get("idMeal"),
@@ -366,6 +506,11 @@ def get_random_meal(request):
                 ],
             }
         )
+    except UpstreamUnavailable as e:
+        return Response(
+            {"error": f"Recipe service is temporarily unavailable: {str(e)}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except requests.RequestException as e:
         return Response(
             {"error": f"Failed to fetch random meal: {str(e)}"},
@@ -384,11 +529,90 @@ class FoodProposalSubmitView(APIView):
         serializer = FoodProposalSerializer(data=request.data)
         if serializer.is_valid():
             nutrition_score = calculate_nutrition_score(serializer.validated_data)
-            serializer.save(proposedBy=request.user, nutritionScore=nutrition_score)
+            proposal = serializer.save(
+                proposedBy=request.user,
+                nutritionScore=nutrition_score,
+                nutritionScoreVersion=NUTRITION_SCORE_VERSION,
+            )
+            # Duplicates are still accepted, but flagged for moderators
+            flag_duplicates(proposal)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class FoodImportView(APIView):
+    """
+    POST /api/foods/import/?type=ndjson|csv&dry_run=true
+
+    Queues a bulk import of foods from an uploaded NDJSON or CSV file
+    ("file" field) and returns 202 with the job. The run_import_jobs
+    command (a CronJob in production) picks it up; poll
+    /api/foods/import/<id>/ for progress and the result. Rows are upserted
+    by normalized name in chunks; invalid rows are reported by line number
+    and skipped.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "Missing 'file' upload"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # "format" is reserved by DRF for renderer selection
+        fmt = request.query_params.get("type")
+        if not fmt:
+            fmt = "csv" if upload.name.lower().endswith(".csv") else "ndjson"
+        if fmt not in ("ndjson", "csv"):
+            return Response(
+                {"error": "type must be 'ndjson' or 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        dry_run = request.query_params.get("dry_run", "").lower() == "true"
+
+        # The upload is gone once the request ends, so keep a copy that
+        # the runner can read from any pod, before the job becomes claimable
+        location = importer.store_upload(f"{uuid.uuid4().hex}.{fmt}", upload.chunks())
+        job = ImportJob.objects.create(
+            format=fmt, dry_run=dry_run, upload=location, created_by=request.user
+        )
+        return Response(job.as_dict(), status=status.HTTP_202_ACCEPTED)
+
+
+class FoodImportJobView(APIView):
+    """
+    GET /api/foods/import/<id>/
+
+    Progress of a queued import, and its result once done.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ImportJob, id=job_id)
+        return Response(job.as_dict())
+
+
+def _fetch_openfoodfacts_nutriments(food_name):
+    """Return the nutriments of the best Open Food Facts match, or None."""
+    api_url = "https://world.openfoodfacts.org/cgi/search.pl"
+    params = {
+        "search_terms": food_name,
+        "search_simple": 1,
+        "action": "process",
+        "json": 1,
+        "page_size": 1,
+    }
+    resp = http_client.get("openfoodfacts", api_url, params=params, timeout=5)
+    resp.raise_for_status()
+    products = resp.json().get("products", [])
+    if not products:
+        return None
+    return products[0].get("nutriments", {})
+
+
 @api_view(["GET"])
 def food_nutrition_info(request):
     """
@@ -403,24 +627,16 @@ def food_nutrition_info(request):
         )
 
     try:
-        api_url = "https://world.openfoodfacts.org/cgi/search.pl"
-        params = {
-            "search_terms": food_name,
-            "search_simple": 1,
-            "action": "process",
-            "json": 1,
-            "page_size": 1,
-        }
-        resp = requests.get(api_url, params=params, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-        products = data.get("products", [])
-        if not products:
+        nutriments = response_cache.get_or_fetch(
+            "openfoodfacts.search",
+            response_cache.normalize_query(food_name),
+            lambda: _fetch_openfoodfacts_nutriments(food_name),
+            is_empty=lambda value: value is None,
+        )
+        if nutriments is None:
             return Response(
                 {"warning": f"No nutrition info found for '{food_name}'."}, status=404
             )
-        product = products[0]
-        nutriments = product.get("nutriments", {})
         result = {
             "food": food_name,
             "calories": nutriments.get("energy-kcal_100g"),
@@ -430,12 +646,206 @@ def food_nutrition_info(request):
             "fiber": nutriments.get("fiber_100g"),
         }
         return Response(result)
+    except UpstreamUnavailable as e:
+        return Response(
+            {"error": f"Nutrition service is temporarily unavailable: {str(e)}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except Exception as e:
         return Response(
             {"error": f"Failed to fetch nutrition info: {str(e)}"}, status=500
         )
 
 
+# Per-source deadline for the enrichment fan-out. A source that misses it is
+# reported as "timeout"; its call keeps running and still fills the cache.
+ENRICHMENT_SOURCE_DEADLINE = 3.0
+_enrichment_executor = ThreadPoolExecutor(
+    max_workers=64, thread_name_prefix="food-enrichment"
+)
+# Mass units FatSecret reports servings in, as grams
+FATSECRET_GRAMS_PER_UNIT = {"g": 1.0, "oz": 28.349523125}
+
+
+def _fatsecret_source(food_name):
+    result = response_cache.get_or_fetch(
+        "fatsecret.food",
+        response_cache.normalize_query(food_name),
+        lambda: _fetch_fatsecret_food(food_name),
+        is_empty=lambda value: value is None,
+    )
+    parsed = result and result["parsed"]
+    if not parsed:
+        return None
+
+    # FatSecret reports the chosen serving; scale mass servings to 100 g
+    amount = parsed.get("serving_amount") or 0.0
+    grams = amount * FATSECRET_GRAMS_PER_UNIT.get(parsed.get("serving_unit"), 0.0)
+    values = {
+        "calories": parsed.get("calories", 0.0),
+        "protein": parsed.get("protein", 0.0),
+        "fat": parsed.get("fat", 0.0),
+        "carbohydrates": parsed.get("carbohydrates", 0.0),
+        "micronutrients": parsed.get("micronutrients") or {},
+    }
+    if not grams:
+        # Volume or unknown servings can't be put on a per-100 g basis, so
+        # they are reported as is and left out of the merged nutrition
+        unit = parsed.get("serving_unit") or "serving"
+        return {
+            "name": parsed["food_name"],
+            "per": f"{amount:g} {unit}" if amount else "serving",
+            "perServing": values,
+        }
+
+    scale = 100.0 / grams
+    return {
+        "name": parsed["food_name"],
+        "per": "100 g",
+        "calories": values["calories"] * scale,
+        "protein": values["protein"] * scale,
+        "fat": values["fat"] * scale,
+        "carbohydrates": values["carbohydrates"] * scale,
+        "micronutrients": {
+            name: value * scale for name, value in values["micronutrients"].items()
+        },
+    }
+
+
+def _openfoodfacts_source(food_name):
+    nutriments = response_cache.get_or_fetch(
+        "openfoodfacts.search",
+        response_cache.normalize_query(food_name),
+        lambda: _fetch_openfoodfacts_nutriments(food_name),
+        is_empty=lambda value: value is None,
+    )
+    if nutriments is None:
+        return None
+    return {
+        "calories": nutriments.get("energy-kcal_100g"),
+        "protein": nutriments.get("proteins_100g"),
+        "fat": nutriments.get("fat_100g"),
+        "carbohydrates": nutriments.get("carbohydrates_100g"),
+        "fiber": nutriments.get("fiber_100g"),
+    }
+
+
+def _wikidata_source(food_name):
+    from api.views import WikidataEntityView, WikidataFoodView
+
+    matches = response_cache.get_or_fetch(
+        "wikidata.search",
+        response_cache.normalize_query(food_name, 1),
+        lambda: WikidataFoodView().search_wikidata_entities(food_name, 1),
+    )
+    if not matches:
+        return None
+    entity_id = matches[0]["id"]
+    return response_cache.get_or_fetch(
+        "wikidata.entity",
+        entity_id,
+        lambda: WikidataEntityView().get_wikidata_entity(entity_id),
+        is_empty=lambda value: value is None,
+    )
+
+
+ENRICHMENT_SOURCES = {
+    "fatsecret": _fatsecret_source,
+    "openfoodfacts": _openfoodfacts_source,
+    "wikidata": _wikidata_source,
+}
+
+# Sources consulted, in order of preference, for each merged nutrient
+NUTRIENT_PRIORITY = ("fatsecret", "openfoodfacts")
+MERGED_NUTRIENTS = ("calories", "protein", "fat", "carbohydrates", "fiber")
+
+
+async def _query_source(name, fetch, food_name):
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        data = await asyncio.wait_for(
+            loop.run_in_executor(_enrichment_executor, fetch, food_name),
+            timeout=ENRICHMENT_SOURCE_DEADLINE,
+        )
+        outcome = {"status": "ok" if data else "not_found", "data": data}
+    except asyncio.TimeoutError:
+        outcome = {"status": "timeout", "data": None}
+    except UpstreamUnavailable as e:
+        outcome = {"status": "unavailable", "data": None, "error": str(e)}
+    except Exception as e:
+        outcome = {"status": "error", "data": None, "error": str(e)}
+    outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return name, outcome
+
+
+def _merge_nutrition(sources):
+    merged = {}
+    for nutrient in MERGED_NUTRIENTS:
+        merged[nutrient] = None
+        for name in NUTRIENT_PRIORITY:
+            data = sources[name]["data"]
+            if data and data.get(nutrient) is not None:
+                merged[nutrient] = round(float(data[nutrient]), 2)
+                break
+    fatsecret = sources["fatsecret"]["data"]
+    merged["micronutrients"] = (fatsecret or {}).get("micronutrients", {})
+    return merged
+
+
+async def food_enrichment(request):
+    """
+    GET /api/foods/enrich/?name={food_name}
+
+    Queries FatSecret, Open Food Facts and Wikidata concurrently and merges
+    their nutrition facts (per 100 g). Each source has its own deadline, so a
+    slow upstream only drops that source from the result ("partial": true).
+    """
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if auth is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    food_name = request.GET.get("name", "").strip()
+    if not food_name:
+        return JsonResponse({"error": "name parameter is required"}, status=400)
+
+    results = await asyncio.gather(
+        *(
+            _query_source(name, fetch, food_name)
+            for name, fetch in ENRICHMENT_SOURCES.items()
+        )
+    )
+    sources = dict(results)
+    if not any(source["data"] for source in sources.values()):
+        status_code = (
+            404
+            if all(source["status"] == "not_found" for source in sources.values())
+            else 503
+        )
+        return JsonResponse(
+            {"error": f"No enrichment data for '{food_name}'", "sources": sources},
+            status=status_code,
+        )
+
+    wikidata = sources["wikidata"]["data"] or {}
+    return JsonResponse(
+        {
+            "food": food_name,
+            "nutrition": _merge_nutrition(sources),
+            "description": wikidata.get("description", ""),
+            "wikidataId": wikidata.get("id"),
+            "wikipediaLink": wikidata.get("wikipedia_link"),
+            "partial": any(source["status"] != "ok" for source in sources.values()),
+            "sources": sources,
+        }
+    )
+
+
 
 
 @api_view(["GET"])
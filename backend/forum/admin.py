@@ -1,7 +1,7 @@
 from django.contrib import admin
 from rest_framework import viewsets, status, serializers
 from rest_framework.permissions import BasePermission
-from .models import Post, Tag, Comment, Like
+from .models import Post, Tag, Comment, Like, Translation
 
 
 @admin.register(Post)
@@ -38,6 +38,13 @@ class LikeAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "post__title")
 
 
+@admin.register(Translation)
+class TranslationAdmin(admin.ModelAdmin):
+    list_display = ("id", "target_lang", "detected_source_lang", "created_at")
+    list_filter = ("target_lang",)
+    search_fields = ("source_text", "translated_text")
+
+
 class IsAdminUser(BasePermission):
     """
     Permission class that allows only staff members and superusers to access.
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from api.views import TranslationError, TranslationService, source_hash
+from forum.models import Post, Translation
+from project.utils.resilience import UpstreamUnavailable
+
+
+class Command(BaseCommand):
+    help = "Pre-translate the most liked recent forum posts into the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-lang",
+            action="append",
+            dest="target_langs",
+            help="Target language code, can be repeated (default: TR)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Number of posts to pre-translate (default: 100)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Rank posts by likes received in the last N days (default: 30)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show how many texts would be translated without calling DeepL",
+        )
+
+    def handle(self, *args, **options):
+        target_langs = [lang.upper() for lang in options["target_langs"] or ["TR"]]
+        limit = options["limit"]
+        dry_run = options["dry_run"]
+        since = timezone.now() - timedelta(days=options["days"])
+
+        posts = (
+            Post.objects.annotate(
+                recent_likes=Count("likes", filter=Q(likes__created_at__gte=since))
+            )
+            .filter(recent_likes__gt=0)
+            .order_by("-recent_likes", "-created_at")[:limit]
+        )
+        texts = []
+        for post in posts:
+            texts.extend(text for text in (post.title, post.body) if text)
+
+        if not texts:
+            self.stdout.write(self.style.SUCCESS("No popular posts to translate"))
+            return
+
+        service = TranslationService()
+        hashes = {source_hash(text) for text in texts}
+        for target_lang in target_langs:
+            cached = Translation.objects.filter(
+                target_lang=target_lang, source_hash__in=hashes
+            ).count()
+            missing = len(hashes) - cached
+
+            if dry_run:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"DRY RUN: {target_lang}: would translate {missing} of "
+                        f"{len(hashes)} texts"
+                    )
+                )
+                continue
+
+            try:
+                service.translate_texts(texts, target_lang)
+            except (TranslationError, UpstreamUnavailable) as e:
+                raise CommandError(f"{target_lang}: {e}") from e
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{target_lang}: translated {missing} new texts "
+                    f"({cached} already cached)"
+                )
+            )
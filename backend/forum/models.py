@@ -2,6 +2,9 @@ from typing import Any
 from django.db import models
 from django.conf import settings
 from django.db.models import Sum
+from django.utils.functional import cached_property
+
+from project.utils.nutrients import NutrientVector
 
 
 class Tag(models.Model):
@@ -87,20 +90,51 @@ class Recipe(models.Model):
     def __str__(self):
         return f"Recipe for {self.post.title}"
 
+    @cached_property
+    def nutrient_totals(self):
+        """
+        Totals of all ingredients as a NutrientVector, summed in one pass.
+        Uses prefetched ingredients and foods when the queryset has them.
+        """
+        return NutrientVector.sum(
+            NutrientVector.from_food(ingredient.food)
+            * (ingredient.amount / ingredient.food.servingSize)
+            for ingredient in self.ingredients.all()
+        )
+
     @property
     def total_protein(self):
-        return sum(ingredient.protein_content for ingredient in self.ingredients.all())
+        return self.nutrient_totals["protein"]
 
     @property
     def total_fat(self):
-        return sum(ingredient.fat_content for ingredient in self.ingredients.all())
+        return self.nutrient_totals["fat"]
 
     @property
     def total_carbohydrates(self):
-        return sum(
-            ingredient.carbohydrate_content for ingredient in self.ingredients.all()
-        )
+        return self.nutrient_totals["carbohydrates"]
 
     @property
     def total_calories(self):
-        return sum(ingredient.calorie_content for ingredient in self.ingredients.all())
+        return self.nutrient_totals["calories"]
+
+
+class Translation(models.Model):
+    """
+    Cached DeepL translation of a piece of text, keyed by the SHA-256 of the
+    source text and the target language.
+    """
+
+    objects: Any
+    source_hash = models.CharField(max_length=64)
+    target_lang = models.CharField(max_length=10)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    detected_source_lang = models.CharField(max_length=10, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("source_hash", "target_lang")
+
+    def __str__(self):
+        return f"{self.source_hash[:12]} -> {self.target_lang}"
@@ -195,5 +195,6 @@ class RecipeSerializer(serializers.ModelSerializer):
         # Create new ingredients
         for ingredient_data in ingredients_data:
             RecipeIngredient.objects.create(recipe=instance, **ingredient_data)
+        instance.__dict__.pop("nutrient_totals", None)
 
         return instance
@@ -1,5 +1,7 @@
 from typing import cast
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -174,10 +176,35 @@ class RecipeTests(TestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+        # Totals come from the new ingredients, not the prefetched ones
+        self.assertAlmostEqual(response.data["total_protein"], 31.0 * 1.5 + 2.6)
         recipe.refresh_from_db()
         self.assertEqual(recipe.instructions, "Updated instructions")
         self.assertEqual(recipe.ingredients.count(), 2)
 
+    def test_listing_recipes_prefetches_ingredients(self):
+        def add_recipe(title):
+            post = Post.objects.create(title=title, body="Body", author=self.user1)
+            recipe = Recipe.objects.create(post=post, instructions="Cook")
+            RecipeIngredient.objects.create(recipe=recipe, food=self.food1, amount=200)
+            RecipeIngredient.objects.create(recipe=recipe, food=self.food2, amount=150)
+
+        self.client.force_authenticate(user=self.user2)
+        url = reverse("recipe-list")
+        add_recipe("First")
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(url)
+        for i in range(3):
+            add_recipe(f"More {i}")
+        with CaptureQueriesContext(connection) as four:
+            response = cast(Response, self.client.get(url))
+
+        self.assertEqual(len(response.data["results"]), 4)
+        self.assertEqual(len(four), len(one))
+        self.assertAlmostEqual(
+            response.data["results"][0]["total_protein"], 31.0 * 2 + 2.6 * 1.5
+        )
+
     def test_user_cannot_update_others_recipe(self):
         recipe = Recipe.objects.create(
             post=self.post, instructions="Original instructions"
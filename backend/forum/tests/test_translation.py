@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.views import source_hash
+from forum.models import Like, Post, Translation
+
+User = get_user_model()
+
+
+class PretranslatePostsCommandTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", password="pass123", email="author@example.com"
+        )
+        self.fan = User.objects.create_user(
+            username="fan", password="pass123", email="fan@example.com"
+        )
+        self.popular = Post.objects.create(
+            title="Popular", body="Liked body", author=self.author
+        )
+        Post.objects.create(title="Quiet", body="Nobody liked this", author=self.author)
+        Like.objects.create(post=self.popular, user=self.fan)
+
+    @patch("requests.Session.request")
+    def test_translates_liked_posts_in_one_call(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+        mock_post.return_value.json.return_value = {
+            "translations": [
+                {"text": "Popüler", "detected_source_language": "EN"},
+                {"text": "Beğenilen gövde", "detected_source_language": "EN"},
+            ]
+        }
+
+        call_command("pretranslate_posts", "--target-lang", "tr", stdout=StringIO())
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(
+            mock_post.call_args.kwargs["json"]["text"], ["Popular", "Liked body"]
+        )
+        translation = Translation.objects.get(
+            source_hash=source_hash("Popular"), target_lang="TR"
+        )
+        self.assertEqual(translation.translated_text, "Popüler")
+
+    @patch("requests.Session.request")
+    def test_dry_run_does_not_call_deepl(self, mock_post):
+        out = StringIO()
+        call_command("pretranslate_posts", "--dry-run", stdout=out)
+
+        mock_post.assert_not_called()
+        self.assertIn("would translate 2 of 2 texts", out.getvalue())
@@ -209,7 +209,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
     ordering_fields = ["created_at"]
 
     def get_queryset(self):
-        queryset = Recipe.objects.all().order_by("-created_at")
+        queryset = (
+            Recipe.objects.select_related("post__author")
+            .prefetch_related("ingredients__food")
+            .order_by("-created_at")
+        )
         post_id = self.request.query_params.get("post")
         if post_id is not None:
             queryset = queryset.filter(post_id=post_id)
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import MealPlan
+from .models import MealPlan, MealPlanItem
+
+
+class MealPlanItemInline(admin.TabularInline):
+    model = MealPlanItem
+    extra = 0
+    raw_id_fields = ['food']
+    fields = ['position', 'food', 'serving_size', 'meal_type']
 
 
 @admin.register(MealPlan)
@@ -8,9 +15,9 @@ class MealPlanAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at', 'updated_at']
     search_fields = ['user__username', 'user__email', 'name']
     readonly_fields = ['created_at', 'updated_at', 'total_calories', 'total_protein', 'total_fat', 'total_carbohydrates']
+    inlines = [MealPlanItemInline]
     
-    def save_model(self, request, obj, form, change):
-        """Override save to recalculate nutrition when meals are updated"""
-        super().save_model(request, obj, form, change)
-        if obj.meals:  # Only recalculate if meals exist
-            obj.calculate_total_nutrition()
+    def save_related(self, request, form, formsets, change):
+        """Recalculate nutrition once the inline items are saved"""
+        super().save_related(request, form, formsets, change)
+        form.instance.calculate_total_nutrition()
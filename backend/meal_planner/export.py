@@ -0,0 +1,119 @@
+"""
+Streaming export of a user's nutrition logs as CSV or NDJSON.
+
+Rows are read in keyset-paginated batches of EXPORT_BATCH_SIZE days (the
+(user, date) index drives each batch) and written through generators, so
+memory stays flat however long the range is. QuerySet.iterator() alone
+doesn't give that on MySQL, whose driver buffers the whole result set.
+With level='entries', each batch of days costs one more query for its
+food log entries.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import DailyNutritionLog, FoodLogEntry
+
+EXPORT_BATCH_SIZE = 500
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+LEVELS = ('days', 'entries')
+
+DAY_FIELDS = (
+    'date', 'total_calories', 'total_protein', 'total_carbohydrates',
+    'total_fat', 'micronutrients_summary',
+)
+ENTRY_FIELDS = (
+    'date', 'meal_type', 'food_id', 'food_name', 'serving_size', 'serving_unit',
+    'calories', 'protein', 'carbohydrates', 'fat', 'micronutrients', 'logged_at',
+)
+# FoodLogEntry lookups behind ENTRY_FIELDS, after the daily log id
+ENTRY_COLUMNS = (
+    'daily_log_id', 'meal_type', 'food_id', 'food__name', 'serving_size',
+    'serving_unit', 'calories', 'protein', 'carbohydrates', 'fat',
+    'micronutrients', 'logged_at',
+)
+
+
+def _day_batches(user, start_date=None, end_date=None, batch_size=None):
+    """Yield lists of (id, *DAY_FIELDS) rows in date order."""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    logs = DailyNutritionLog.objects.filter(user=user)
+    if start_date:
+        logs = logs.filter(date__gte=start_date)
+    if end_date:
+        logs = logs.filter(date__lte=end_date)
+    logs = logs.order_by('date').values_list('id', *DAY_FIELDS)
+
+    last_date = None
+    while True:
+        batch = logs if last_date is None else logs.filter(date__gt=last_date)
+        rows = list(batch[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last_date = rows[-1][1]
+
+
+def export_rows(user, level='days', start_date=None, end_date=None, batch_size=None):
+    """
+    Yield export rows as tuples in the order of the level's fields.
+
+    Args:
+        user: User whose logs are exported
+        level (str): 'days' for daily totals, 'entries' for every food logged
+        start_date, end_date: Optional inclusive date bounds
+        batch_size (int): Days read per query, EXPORT_BATCH_SIZE by default
+    """
+    for days in _day_batches(user, start_date, end_date, batch_size):
+        if level == 'days':
+            for row in days:
+                yield row[1:]
+            continue
+
+        dates = {row[0]: row[1] for row in days}
+        entries = {}
+        for row in (
+            FoodLogEntry.objects.filter(daily_log_id__in=list(dates))
+            .order_by('logged_at', 'id')
+            .values_list(*ENTRY_COLUMNS)
+        ):
+            entries.setdefault(row[0], []).append(row)
+        for log_id, day in dates.items():
+            for row in entries.get(log_id, ()):
+                yield (day, *row[1:])
+
+
+class _Echo:
+    """File-like object whose write() returns the line for the generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(value) if isinstance(value, dict) else value
+            for value in row
+        ])
+
+
+def ndjson_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(user, fmt='csv', level='days', start_date=None, end_date=None):
+    """Lines of the export file, for a StreamingHttpResponse."""
+    fields = DAY_FIELDS if level == 'days' else ENTRY_FIELDS
+    rows = export_rows(user, level, start_date, end_date)
+    if fmt == 'csv':
+        return csv_lines(fields, rows)
+    return ndjson_lines(fields, rows)
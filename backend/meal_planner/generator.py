@@ -0,0 +1,233 @@
+"""
+Meal plan generation from nutrition targets.
+
+Candidate foods are loaded once as a matrix of per-serving macros (one row
+per food, columns in nutrients.MACROS order) and divided by the targets, so
+a perfect plan sums to a vector of ones. The optimizer is a greedy over that
+matrix: each step scores every (food, serving size) pair at once from the
+quadratic form of the weighted squared residual, adds the best one, and
+stops when every macro is within tolerance. Additions alone can't undo an
+overshoot, so when the greedy gets stuck a refinement pass re-chooses each
+pick's serving size (or drops it) with the others fixed, and the greedy
+resumes.
+
+Nothing loops over foods in Python, so a step costs two matrix-vector
+products regardless of catalog size; the candidate query is bounded by
+CANDIDATE_LIMIT and reads the nutritionScore indexes.
+"""
+
+import numpy as np
+from django.db.models import Q
+
+from foods.models import FoodEntry
+from project.utils.nutrients import MACROS
+from project.utils.nutrition_calculator import calculate_macro_targets
+
+from .models import MealPlan
+
+DEFAULT_TOLERANCE = 0.1
+MAX_FOODS = 8
+SERVING_OPTIONS = np.array([0.5, 1.0, 1.5, 2.0, 2.5, 3.0])
+# Highest-scoring foods considered; keeps the query and matrix bounded
+CANDIDATE_LIMIT = 5000
+# Most of any daily target one food may cover, so plans stay varied and the
+# greedy doesn't paint itself into a corner with one oversized pick
+MAX_SHARE = 0.4
+# Calories count double in the residual; the macros share the rest
+MACRO_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+# Tie-breaker towards healthier foods, small next to any real improvement
+SCORE_WEIGHT = 1e-4
+# Rounds of greedy additions followed by a serving-size refinement pass
+MAX_ROUNDS = 4
+MEAL_SLOTS = ('breakfast', 'lunch', 'dinner', 'snack')
+
+
+class GenerationError(ValueError):
+    pass
+
+
+def resolve_targets(user, calories=None):
+    """
+    Daily macro targets as {'calories', 'protein', 'carbohydrates', 'fat'}.
+
+    An explicit calorie goal is split with calculate_macro_targets; otherwise
+    the user's NutritionTargets are used, then targets derived from their
+    metrics.
+
+    Raises:
+        GenerationError: If there is nothing to derive targets from
+    """
+    if calories is None:
+        from accounts.models import NutritionTargets, UserMetrics
+
+        targets = NutritionTargets.objects.filter(user=user).first()
+        if targets is not None:
+            return {nutrient: float(getattr(targets, nutrient)) for nutrient in MACROS}
+        metrics = UserMetrics.objects.filter(user=user).first()
+        if metrics is None:
+            raise GenerationError(
+                'Set your nutrition targets or metrics, or provide a calorie goal.'
+            )
+        calories = metrics.calculate_tdee()
+
+    macro_targets = calculate_macro_targets(calories)
+    return {
+        'calories': macro_targets['calories'],
+        'protein': macro_targets['protein_g'],
+        'carbohydrates': macro_targets['carbohydrates_g'],
+        'fat': macro_targets['fat_g'],
+    }
+
+
+def load_candidates(user, categories=None):
+    """
+    Foods the user can eat as (ids, macros, scores) arrays.
+
+    Foods with any of the user's allergens are excluded; allergens and
+    categories match case-insensitively.
+    """
+    foods = FoodEntry.objects.filter(caloriesPerServing__gt=0)
+    # User and food allergens are separate models, matched by name
+    allergens = Q()
+    for allergen in user.allergens.values_list('name', flat=True):
+        allergens |= Q(allergens__name__iexact=allergen)
+    if allergens:
+        foods = foods.exclude(allergens)
+    if categories:
+        match = Q()
+        for category in categories:
+            match |= Q(category__iexact=category)
+        foods = foods.filter(match)
+
+    rows = list(
+        foods.order_by('-nutritionScore', 'id').values_list(
+            'id', 'caloriesPerServing', 'proteinContent', 'carbohydrateContent',
+            'fatContent', 'nutritionScore'
+        )[:CANDIDATE_LIMIT]
+    )
+    if not rows:
+        return np.zeros(0, dtype=int), np.zeros((0, len(MACROS))), np.zeros(0)
+    matrix = np.array(rows, dtype=float)
+    return matrix[:, 0].astype(int), matrix[:, 1:5], matrix[:, 5]
+
+
+def optimize(macros, scores, target, tolerance=DEFAULT_TOLERANCE, max_foods=MAX_FOODS):
+    """
+    Choose foods and serving sizes whose macros sum close to target.
+
+    Args:
+        macros: (n, 4) per-serving macros of the candidates
+        scores: (n,) nutrition scores, used to break ties
+        target: (4,) daily targets
+        tolerance (float): Accepted relative error per macro
+        max_foods (int): Most foods in the plan
+
+    Returns:
+        list: (row index, serving size) pairs in the order chosen
+    """
+    if not len(macros):
+        return []
+    # Relative to the targets, so every macro's goal is 1
+    scaled = macros / np.maximum(target, 1.0)
+    # ||r - s*a||_w^2 = ||r||_w^2 - 2s(a.wr) + s^2(a.wa), and ||r||_w^2 is the
+    # same for every candidate, so only the last two terms are compared
+    quadratic = (scaled ** 2) @ MACRO_WEIGHTS
+    bonus = SCORE_WEIGHT * scores / 100
+    # (servings, foods) pairs that would exceed MAX_SHARE of a target
+    too_large = SERVING_OPTIONS[:, None] * scaled.max(axis=1) > MAX_SHARE
+
+    def fit(residual):
+        return float(MACRO_WEIGHTS @ residual ** 2)
+
+    def within_tolerance(residual):
+        return bool(np.all(np.abs(residual) <= tolerance))
+
+    residual = np.ones(len(MACROS))
+    available = np.ones(len(macros), dtype=bool)
+    chosen = []
+    options = np.concatenate(([0.0], SERVING_OPTIONS))
+    for _ in range(MAX_ROUNDS):
+        # Greedy: add the (food, serving) pair that most reduces the residual
+        while (
+            sum(1 for _, serving in chosen if serving) < max_foods
+            and not within_tolerance(residual)
+        ):
+            linear = scaled @ (MACRO_WEIGHTS * residual)
+            # (servings, foods) change in the residual's weighted squared norm
+            change = (
+                SERVING_OPTIONS[:, None] ** 2 * quadratic
+                - 2 * SERVING_OPTIONS[:, None] * linear
+            )
+            cost = np.where(available & ~too_large, change - bonus, np.inf)
+            serving_index, row = np.unravel_index(np.argmin(cost), cost.shape)
+            best = cost[serving_index, row]
+            if not np.isfinite(best) or change[serving_index, row] >= -1e-9:
+                break  # only overshoots are left; refinement may shrink picks
+            serving = float(SERVING_OPTIONS[serving_index])
+            chosen.append([row, serving])
+            available[row] = False
+            residual = residual - serving * scaled[row]
+        if within_tolerance(residual):
+            break
+
+        # Refinement: re-choose each pick's serving (0 drops it), others fixed
+        improved = False
+        for pick in chosen:
+            row, serving = pick
+            without = residual + serving * scaled[row]
+            allowed = options[options * scaled[row].max() <= MAX_SHARE]
+            trials = without[None, :] - allowed[:, None] * scaled[row]
+            best = float(allowed[np.argmin((trials ** 2) @ MACRO_WEIGHTS)])
+            if best != serving and fit(without - best * scaled[row]) < fit(residual):
+                pick[1] = best
+                residual = without - best * scaled[row]
+                improved = True
+        if not improved:
+            break
+
+    return [(int(row), serving) for row, serving in chosen if serving > 0]
+
+
+def generate_meal_plan(
+    user, name='Generated Meal Plan', categories=None, calories=None,
+    tolerance=DEFAULT_TOLERANCE,
+):
+    """
+    Build and save a MealPlan that meets the user's targets.
+
+    Returns:
+        tuple: (MealPlan, report) - report holds the targets, the achieved
+            macros and, per macro, whether it is within tolerance
+
+    Raises:
+        GenerationError: If no targets are available or no food qualifies
+    """
+    targets = resolve_targets(user, calories)
+    target = np.array([targets[nutrient] for nutrient in MACROS])
+    ids, macros, scores = load_candidates(user, categories)
+    picks = optimize(macros, scores, target, tolerance)
+    if not picks:
+        raise GenerationError('No foods match your allergens and category preferences.')
+
+    achieved = sum(serving * macros[row] for row, serving in picks)
+    plan = MealPlan(user=user, name=name)
+    plan.meals = [
+        {
+            'food_id': int(ids[row]),
+            'serving_size': serving,
+            'meal_type': MEAL_SLOTS[position % len(MEAL_SLOTS)],
+        }
+        for position, (row, serving) in enumerate(picks)
+    ]
+    plan.save()
+    plan.calculate_total_nutrition()
+
+    report = {
+        'targets': {nutrient: round(value, 2) for nutrient, value in targets.items()},
+        'achieved': dict(zip(MACROS, np.round(achieved, 2).tolist())),
+        'within_tolerance': {
+            nutrient: bool(abs(value - goal) <= tolerance * max(goal, 1.0))
+            for nutrient, value, goal in zip(MACROS, achieved, target)
+        },
+    }
+    return plan, report
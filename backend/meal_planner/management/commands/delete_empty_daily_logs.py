@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from meal_planner.models import DailyNutritionLog, FoodLogEntry
+
+
+def empty_logs():
+    """Daily logs without any entries."""
+    return DailyNutritionLog.objects.filter(
+        ~Exists(FoodLogEntry.objects.filter(daily_log=OuterRef('pk')))
+    )
+
+
+class Command(BaseCommand):
+    help = "Delete daily logs that never had a food logged (left behind by reads)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-days',
+            type=int,
+            default=1,
+            help='Only delete logs not updated in the last N days, so a log '
+                 'created for an entry being logged is left alone (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Logs deleted per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count empty logs without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(days=options['min_age_days'])
+        logs = empty_logs().filter(updated_at__lt=cutoff)
+
+        deleted = last_id = 0
+        while True:
+            ids = list(
+                logs.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            if dry_run:
+                deleted += len(ids)
+                continue
+            # Re-check emptiness in the delete itself, in case an entry was
+            # logged since the batch was read
+            count, _ = logs.filter(id__in=ids).delete()
+            deleted += count
+
+        verb = 'DRY RUN: would have deleted' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} empty daily logs'))
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from meal_planner.models import DailyNutritionLog, FoodLogEntry, NutritionRollup
+from project.utils.nutrients import NutrientVector
+
+TOTAL_FIELDS = {
+    'total_calories': 'calories',
+    'total_protein': 'protein',
+    'total_carbohydrates': 'carbohydrates',
+    'total_fat': 'fat',
+}
+
+# Running micronutrient totals are rounded on every change, so they may be
+# a few hundredths off a fresh sum without having drifted
+MICRONUTRIENT_TOLERANCE = 0.05
+
+
+def _micronutrients_drifted(stored, expected):
+    """Compare a stored summary dict with the NutrientVector of its entries."""
+    stored = NutrientVector.from_values(micronutrients=stored)
+    return not stored.isclose(expected, MICRONUTRIENT_TOLERANCE)
+
+
+class Command(BaseCommand):
+    help = "Re-derive daily log totals from their entries and fix any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Only check logs updated in the last N days (default: 2)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Check every log regardless of when it was updated',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Logs checked per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted logs without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        logs = DailyNutritionLog.objects.all()
+        if not options['all']:
+            since = timezone.now() - timedelta(days=options['days'])
+            logs = logs.filter(updated_at__gte=since)
+
+        checked = fixed = last_id = 0
+        while True:
+            ids = list(
+                logs.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+            with transaction.atomic():
+                fixed += self.reconcile_batch(ids, dry_run)
+
+        verb = 'DRY RUN: would have fixed' if dry_run else 'Fixed'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} {fixed} of {checked} daily logs')
+        )
+
+    def reconcile_batch(self, ids, dry_run):
+        """Re-derive one batch of logs, returning how many had drifted."""
+        batch = DailyNutritionLog.objects.filter(id__in=ids).order_by('id')
+        if not dry_run:
+            # Entry writes lock the log to apply their delta, so none can
+            # land between the sums below and the update
+            batch = batch.select_for_update()
+        batch = list(batch)
+
+        sums = {
+            row['daily_log_id']: row
+            for row in FoodLogEntry.objects.filter(daily_log_id__in=ids)
+            .order_by()
+            .values('daily_log_id')
+            .annotate(**{
+                name: Sum(name) for name in TOTAL_FIELDS.values()
+            })
+        }
+        micronutrients = {}
+        for log_id, values in FoodLogEntry.objects.filter(
+            daily_log_id__in=ids
+        ).values_list('daily_log_id', 'micronutrients'):
+            micronutrients.setdefault(log_id, []).append(
+                NutrientVector.from_values(micronutrients=values)
+            )
+
+        drifted = []
+        for log in batch:
+            row = sums.get(log.id, {})
+            expected_micros = NutrientVector.sum(micronutrients.get(log.id, []))
+            changed = False
+            for field, name in TOTAL_FIELDS.items():
+                expected = (row.get(name) or Decimal('0')).quantize(Decimal('0.01'))
+                if getattr(log, field) != expected:
+                    setattr(log, field, expected)
+                    changed = True
+            if _micronutrients_drifted(log.micronutrients_summary, expected_micros):
+                log.micronutrients_summary = expected_micros.to_micronutrients()
+                changed = True
+            if changed:
+                drifted.append(log)
+                self.stdout.write(
+                    self.style.WARNING(f'Drift in {log.user_id}/{log.date}')
+                )
+
+        if drifted and not dry_run:
+            DailyNutritionLog.objects.bulk_update(
+                drifted, [*TOTAL_FIELDS, 'micronutrients_summary']
+            )
+            # The drift carried over into the weekly/monthly rollups
+            dates = {}
+            for log in drifted:
+                dates.setdefault(log.user_id, []).append(log.date)
+            for user_id, days in dates.items():
+                NutritionRollup.rebuild(user_id, days)
+        return len(drifted)
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_meals_to_items(apps, schema_editor):
+    MealPlan = apps.get_model('meal_planner', 'MealPlan')
+    MealPlanItem = apps.get_model('meal_planner', 'MealPlanItem')
+    FoodEntry = apps.get_model('foods', 'FoodEntry')
+    existing = set(FoodEntry.objects.values_list('id', flat=True))
+
+    items = []
+    for plan in MealPlan.objects.only('id', 'meals').iterator():
+        position = 0
+        for meal in plan.meals or []:
+            try:
+                food_id = int(meal.get('food_id'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if food_id not in existing:
+                continue
+            items.append(MealPlanItem(
+                meal_plan_id=plan.id,
+                food_id=food_id,
+                serving_size=meal.get('serving_size', 1.0),
+                meal_type=meal.get('meal_type', 'meal'),
+                position=position,
+            ))
+            position += 1
+    MealPlanItem.objects.bulk_create(items, batch_size=1000)
+
+
+def copy_items_to_meals(apps, schema_editor):
+    MealPlan = apps.get_model('meal_planner', 'MealPlan')
+    MealPlanItem = apps.get_model('meal_planner', 'MealPlanItem')
+
+    meals = {}
+    for item in MealPlanItem.objects.order_by('meal_plan_id', 'position', 'id'):
+        meals.setdefault(item.meal_plan_id, []).append({
+            'food_id': item.food_id,
+            'serving_size': item.serving_size,
+            'meal_type': item.meal_type,
+        })
+    for plan in MealPlan.objects.filter(id__in=meals):
+        plan.meals = meals[plan.id]
+        plan.save(update_fields=['meals'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0012_nutrition_score_version'),
+        ('meal_planner', '0002_dailynutritionlog_foodlogentry_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealPlanItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serving_size', models.FloatField(default=1.0)),
+                ('meal_type', models.CharField(default='meal', max_length=50)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plan_items', to='foods.foodentry')),
+                ('meal_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='meal_planner.mealplan')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'indexes': [models.Index(fields=['meal_plan', 'position'], name='meal_planne_meal_pl_21d76f_idx')],
+            },
+        ),
+        migrations.RunPython(copy_meals_to_items, copy_items_to_meals),
+        migrations.RemoveField(
+            model_name='mealplan',
+            name='meals',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_badges'),
+        ('meal_planner', '0003_meal_plan_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoggingStreak',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='logging_streak', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current', models.PositiveIntegerField(default=0)),
+                ('best', models.PositiveIntegerField(default=0)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
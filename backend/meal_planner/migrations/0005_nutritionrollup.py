@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def backfill_rollups(apps, schema_editor):
+    DailyNutritionLog = apps.get_model('meal_planner', 'DailyNutritionLog')
+    NutritionRollup = apps.get_model('meal_planner', 'NutritionRollup')
+    for period, trunc in (('week', TruncWeek), ('month', TruncMonth)):
+        rows = (
+            DailyNutritionLog.objects.order_by()
+            .annotate(start=trunc('date'))
+            .values('user_id', 'start')
+            .annotate(
+                days=Count('id'),
+                calories=Sum('total_calories'),
+                protein=Sum('total_protein'),
+                carbohydrates=Sum('total_carbohydrates'),
+                fat=Sum('total_fat'),
+            )
+        )
+        NutritionRollup.objects.bulk_create(
+            [
+                NutritionRollup(
+                    user_id=row['user_id'],
+                    period=period,
+                    period_start=row['start'],
+                    days_logged=row['days'],
+                    total_calories=row['calories'],
+                    total_protein=row['protein'],
+                    total_carbohydrates=row['carbohydrates'],
+                    total_fat=row['fat'],
+                )
+                for row in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planner', '0004_loggingstreak'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NutritionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('days_logged', models.IntegerField(default=0)),
+                ('total_calories', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_protein', models.DecimalField(decimal_places=2, default=0, max_digits=11)),
+                ('total_carbohydrates', models.DecimalField(decimal_places=2, default=0, max_digits=11)),
+                ('total_fat', models.DecimalField(decimal_places=2, default=0, max_digits=11)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'unique_together': {('user', 'period', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
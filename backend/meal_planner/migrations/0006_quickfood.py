@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:13
+
+from datetime import datetime, timezone
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# QuickFood.EPOCH and HALF_LIFE_DAYS as of this migration
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE_SECONDS = 14 * 86400
+
+
+def backfill_quick_foods(apps, schema_editor):
+    FoodLogEntry = apps.get_model('meal_planner', 'FoodLogEntry')
+    QuickFood = apps.get_model('meal_planner', 'QuickFood')
+    entries = FoodLogEntry.objects.order_by('id').values_list(
+        'id', 'daily_log__user_id', 'food_id', 'logged_at', 'serving_size',
+        'serving_unit', 'meal_type',
+    )
+
+    foods = {}
+    last_id = 0
+    while True:
+        batch = list(entries.filter(id__gt=last_id)[:2000])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        for _, user_id, food_id, logged_at, serving_size, serving_unit, meal_type in batch:
+            row = foods.get((user_id, food_id))
+            if row is None:
+                row = foods[(user_id, food_id)] = QuickFood(
+                    user_id=user_id, food_id=food_id, last_logged_at=logged_at
+                )
+            # Scores are log2 of the summed weights, see QuickFood
+            position = (logged_at - EPOCH).total_seconds() / HALF_LIFE_SECONDS
+            if row.log_count:
+                high, low = max(row.score, position), min(row.score, position)
+                row.score = high + math.log2(1 + 2 ** (low - high))
+            else:
+                row.score = position
+            row.log_count += 1
+            if logged_at >= row.last_logged_at:
+                row.last_logged_at = logged_at
+                row.serving_size = serving_size
+                row.serving_unit = serving_unit
+                row.meal_type = meal_type
+    QuickFood.objects.bulk_create(foods.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0012_nutrition_score_version'),
+        ('meal_planner', '0005_nutritionrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuickFood',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('log_count', models.IntegerField(default=0)),
+                ('last_logged_at', models.DateTimeField()),
+                ('serving_size', models.DecimalField(decimal_places=2, default=1.0, max_digits=6)),
+                ('serving_unit', models.CharField(default='serving', max_length=50)),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Breakfast'), ('lunch', 'Lunch'), ('dinner', 'Dinner'), ('snack', 'Snack')], max_length=20)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quick_food_entries', to='foods.foodentry')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quick_foods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-score'], name='meal_planne_user_id_318245_idx'), models.Index(fields=['user', '-last_logged_at'], name='meal_planne_user_id_f1afbb_idx')],
+                'unique_together': {('user', 'food')},
+            },
+        ),
+        migrations.RunPython(backfill_quick_foods, migrations.RunPython.noop),
+    ]
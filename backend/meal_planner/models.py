@@ -1,8 +1,30 @@
-from django.db import models
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import math
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Greatest, Least, Log, Power
 from django.conf import settings
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
+from django.utils import timezone
+
+from project.utils.nutrients import NutrientVector
+
 
+class MealPlanQuerySet(models.QuerySet):
+    def with_items(self):
+        """Prefetch items joined with their foods, plus the foods' allergens."""
+        return self.prefetch_related(meal_plan_items_prefetch())
+
+
+def meal_plan_items_prefetch():
+    return models.Prefetch(
+        'items',
+        queryset=MealPlanItem.objects.select_related('food').prefetch_related(
+            'food__allergens'
+        ),
+    )
 
 
 class MealPlan(models.Model):
@@ -20,48 +42,181 @@ class MealPlan(models.Model):
     total_fat = models.FloatField(default=0.0)
     total_carbohydrates = models.FloatField(default=0.0)
     
-    # Array of foods as meals - storing food IDs and meal information
-    meals = models.JSONField(default=list, help_text="Array of meal objects with food information")
-    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=False)
+
+    objects = MealPlanQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.user.username}'s Meal Plan - {self.name}"
-    
-    def calculate_total_nutrition(self):
-        """Calculate and update total nutrition from meals array"""
-        total_calories = 0.0
-        total_protein = 0.0
-        total_fat = 0.0
-        total_carbs = 0.0
-        
-        for meal in self.meals:
-            # Assuming meal structure: {'food_id': int, 'serving_size': float, 'meal_type': str}
-            from foods.models import FoodEntry
+
+    def get_items(self):
+        """Return the plan's items in order, with their foods loaded."""
+        if 'items' not in getattr(self, '_prefetched_objects_cache', {}):
+            models.prefetch_related_objects([self], meal_plan_items_prefetch())
+        return self.items.all()
+
+    @property
+    def meals(self):
+        """
+        Meals as a list of {'food_id', 'serving_size', 'meal_type'} dicts,
+        the shape the API has always used. Items are stored in MealPlanItem.
+        """
+        pending = getattr(self, '_pending_meals', None)
+        if pending is not None:
+            return pending
+        if self.pk is None:
+            return []
+        return [
+            {
+                'food_id': item.food_id,
+                'serving_size': item.serving_size,
+                'meal_type': item.meal_type,
+            }
+            for item in self.get_items()
+        ]
+
+    @meals.setter
+    def meals(self, value):
+        self.set_meals(value)
+
+    def set_meals(self, meals, foods=None):
+        """
+        Replace the plan's meals; the items are written on the next save().
+
+        Args:
+            meals (list): {'food_id', 'serving_size', 'meal_type'} dicts
+            foods (dict): {id: FoodEntry} the caller already loaded for these
+                meals, which saves looking the foods up again
+        """
+        self._pending_meals = list(meals or [])
+        self._pending_foods = foods
+
+    def save(self, *args, **kwargs):
+        pending = getattr(self, '_pending_meals', None)
+        if pending is None:
+            return super().save(*args, **kwargs)
+
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not is_new:
+                self.items.all().delete()
+            self._add_items(pending, self._pending_foods)
+        self._pending_meals = self._pending_foods = None
+
+    def _add_items(self, meals, foods=None):
+        """Write meals as the plan's items, skipping foods that don't exist."""
+        from foods.models import FoodEntry
+
+        if foods is not None:
+            existing = set(foods)
+        else:
+            food_ids = set()
+            for meal in meals:
+                try:
+                    food_ids.add(int(meal.get('food_id')))
+                except (TypeError, ValueError):
+                    continue
+            existing = set(
+                FoodEntry.objects.filter(id__in=food_ids).values_list('id', flat=True)
+            )
+
+        items = []
+        for meal in meals:
             try:
-                food_entry = FoodEntry.objects.get(id=meal.get('food_id'))
-                serving_size = meal.get('serving_size', 1.0)
-                
-                total_calories += food_entry.caloriesPerServing * serving_size
-                total_protein += food_entry.proteinContent * serving_size
-                total_fat += food_entry.fatContent * serving_size
-                total_carbs += food_entry.carbohydrateContent * serving_size
-            except FoodEntry.DoesNotExist:
+                food_id = int(meal.get('food_id'))
+            except (TypeError, ValueError):
                 continue
+            if food_id not in existing:
+                continue
+            items.append(MealPlanItem(
+                meal_plan=self,
+                food_id=food_id,
+                serving_size=meal.get('serving_size', 1.0),
+                meal_type=meal.get('meal_type', 'meal'),
+                position=len(items),
+            ))
+        MealPlanItem.objects.bulk_create(items)
+        getattr(self, '_prefetched_objects_cache', {}).pop('items', None)
+    
+    def nutrient_totals(self):
+        """Macro and micronutrient totals of the plan's items, as a NutrientVector."""
+        return NutrientVector.sum(
+            NutrientVector.from_food(item.food) * item.serving_size
+            for item in self.get_items()
+        )
+
+    def calculate_total_nutrition(self):
+        """Calculate and update total nutrition from the plan's items"""
+        totals = self.nutrient_totals().macros()
         
         # Update the total nutrition fields
-        self.total_calories = total_calories
-        self.total_protein = total_protein
-        self.total_fat = total_fat
-        self.total_carbohydrates = total_carbs
+        self.total_calories = totals['calories']
+        self.total_protein = totals['protein']
+        self.total_fat = totals['fat']
+        self.total_carbohydrates = totals['carbohydrates']
         self.save(update_fields=['total_calories', 'total_protein', 'total_fat', 'total_carbohydrates'])
 
 
+class MealPlanItem(models.Model):
+    """A food in a meal plan, with its serving size and meal slot."""
+    meal_plan = models.ForeignKey(
+        MealPlan,
+        on_delete=models.CASCADE,
+        related_name='items'
+    )
+    food = models.ForeignKey(
+        'foods.FoodEntry',
+        on_delete=models.CASCADE,
+        related_name='meal_plan_items'
+    )
+    serving_size = models.FloatField(default=1.0)
+    meal_type = models.CharField(max_length=50, default='meal')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['meal_plan', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.food_id} x{self.serving_size} ({self.meal_type})"
+
+
+LOG_TOTAL_FIELDS = ('total_calories', 'total_protein', 'total_carbohydrates', 'total_fat')
+
+
+class DailyNutritionLogQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete logs, updating each affected user's streak, rollups and quick
+        foods once.
+        """
+        with transaction.atomic():
+            removed = {}
+            for values in self.values('user_id', 'date', *LOG_TOTAL_FIELDS):
+                removed.setdefault(values['user_id'], []).append(values)
+            # Entries go by cascade, which skips FoodLogEntryQuerySet.delete()
+            entries = {}
+            for values in FoodLogEntry.objects.filter(daily_log__in=self).values(
+                'food_id', 'logged_at', 'daily_log__user_id'
+            ):
+                entries.setdefault(values['daily_log__user_id'], []).append(values)
+            result = super().delete()
+            for user_id, logs in removed.items():
+                DailyNutritionLog.forget(user_id, logs, entries.get(user_id, ()))
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class DailyNutritionLog(models.Model):
     """
     Tracks actual daily food consumption.
@@ -87,6 +242,8 @@ class DailyNutritionLog(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DailyNutritionLogQuerySet.as_manager()
     
     class Meta:
         ordering = ['-date']
@@ -97,32 +254,477 @@ class DailyNutritionLog(models.Model):
     
     def __str__(self):
         return f"{self.user.username}'s log for {self.date}"
+
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                LoggingStreak.record(self.user_id, [self.date])
+                NutritionRollup.apply(
+                    self.user_id, self.date, NutritionDelta.from_log(self), days=1
+                )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            entries = list(self.entries.values('food_id', 'logged_at'))
+            result = super().delete(*args, **kwargs)
+            self.forget(self.user_id, [
+                {'date': self.date, **{field: getattr(self, field) for field in LOG_TOTAL_FIELDS}}
+            ], entries)
+        return result
+
+    @staticmethod
+    def forget(user_id, logs, entries=()):
+        """
+        Take deleted days out of the user's streak, rollups and quick foods.
+
+        Runs from delete() rather than a post_delete signal so that bulk
+        deletes rebuild the streak once per user instead of once per day.
+        Logs removed by cascade when the user is deleted skip this; their
+        streak, rollups and quick foods are deleted with them.
+
+        Args:
+            user_id: Owner of the deleted logs
+            logs: Dicts with the 'date' and total fields of each deleted log
+            entries: Dicts with the 'food_id' and 'logged_at' of the entries
+                deleted with them
+        """
+        LoggingStreak.rebuild(user_id, create=False)
+        NutritionRollup.remove_logs(user_id, logs)
+        if entries:
+            QuickFood.forget(user_id, entries)
+
+    @property
+    def logged_entries(self):
+        """The day's entries; none for a log that hasn't been saved yet."""
+        if self.pk is None:
+            return []
+        return self.entries.all()
     
+    def nutrient_totals(self):
+        """The day's totals, micronutrients included, as a NutrientVector."""
+        return NutrientVector.from_values(
+            calories=self.total_calories,
+            protein=self.total_protein,
+            carbohydrates=self.total_carbohydrates,
+            fat=self.total_fat,
+            micronutrients=self.micronutrients_summary,
+        )
+
     def recalculate_totals(self):
         """Recalculate and update totals from all food log entries for this day."""
-        from project.utils.nutrition_calculator import aggregate_micronutrients
-        
-        entries = self.entries.all()
-        
-        total_calories = sum(float(entry.calories) for entry in entries)
-        total_protein = sum(float(entry.protein) for entry in entries)
-        total_fat = sum(float(entry.fat) for entry in entries)
-        total_carbs = sum(float(entry.carbohydrates) for entry in entries)
-        
-        # Aggregate micronutrients
-        micronutrient_list = [entry.micronutrients for entry in entries if entry.micronutrients]
-        micronutrients = aggregate_micronutrients(micronutrient_list)
+        previous = NutritionDelta.from_log(self)
+        totals = NutrientVector.sum(
+            NutrientVector.from_values(**entry.nutrition_values())
+            for entry in self.entries.all()
+        )
         
         # Update fields
-        self.total_calories = total_calories
-        self.total_protein = total_protein
-        self.total_fat = total_fat
-        self.total_carbohydrates = total_carbs
-        self.micronutrients_summary = micronutrients
+        macros = totals.macros(ndigits=2)
+        self.total_calories = macros['calories']
+        self.total_protein = macros['protein']
+        self.total_fat = macros['fat']
+        self.total_carbohydrates = macros['carbohydrates']
+        self.micronutrients_summary = totals.to_micronutrients()
         self.save(update_fields=[
             'total_calories', 'total_protein', 'total_fat',
             'total_carbohydrates', 'micronutrients_summary'
         ])
+        change = NutritionDelta.from_log(self)
+        change.vector -= previous.vector
+        NutritionRollup.apply(self.user_id, self.date, change)
+
+    @classmethod
+    def apply_delta(cls, log_id, delta):
+        """
+        Add a NutritionDelta to a log's totals without reloading its entries.
+
+        Macros are updated with F() expressions; the micronutrient summary is
+        merged under a row lock. Call inside the transaction that changes the
+        entries so totals and entries commit together.
+        """
+        if not delta:
+            return
+        with transaction.atomic():
+            row = (
+                cls.objects.select_for_update()
+                .filter(pk=log_id)
+                .order_by()
+                .values_list('user_id', 'date', 'micronutrients_summary')
+                .first()
+            )
+            if row is None:
+                # The log itself is being deleted
+                return
+            user_id, day, summary = row
+            cls.objects.filter(pk=log_id).update(
+                total_calories=F('total_calories') + delta.calories,
+                total_protein=F('total_protein') + delta.protein,
+                total_carbohydrates=F('total_carbohydrates') + delta.carbohydrates,
+                total_fat=F('total_fat') + delta.fat,
+                micronutrients_summary=delta.merge_micronutrients(summary or {}),
+                updated_at=timezone.now(),
+            )
+            NutritionRollup.apply(user_id, day, delta)
+
+
+def compute_streaks(dates):
+    """
+    Gaps-and-islands over logged dates: consecutive days form one island.
+
+    Args:
+        dates: Distinct dates in ascending order
+
+    Returns:
+        tuple: (current, best, last_date) - length of the island ending at
+            the last date, length of the longest island, and the last date
+    """
+    current = best = 0
+    last_date = None
+    for day in dates:
+        if last_date is not None and (day - last_date).days == 1:
+            current += 1
+        else:
+            current = 1
+        best = max(best, current)
+        last_date = day
+    return current, best, last_date
+
+
+class LoggingStreak(models.Model):
+    """
+    Denormalized logging streak per user, kept up to date as daily logs are
+    created so reading it never scans the user's logs.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='logging_streak'
+    )
+    current = models.PositiveIntegerField(default=0)  # streak ending at last_date
+    best = models.PositiveIntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.current} days (best {self.best})"
+
+    def current_as_of(self, day):
+        """Streak of consecutive logged days ending at day, or None if unknown."""
+        if self.last_date is None or self.last_date < day:
+            return 0
+        if self.last_date == day:
+            return self.current
+        # A later day is logged; the counter only tracks the latest island
+        return None
+
+    @staticmethod
+    def _from_logs(user_id):
+        """Derive (current, best, last_date) from the user's logs in one query."""
+        return compute_streaks(
+            DailyNutritionLog.objects.filter(user_id=user_id)
+            .order_by('date')
+            .values_list('date', flat=True)
+        )
+
+    @classmethod
+    def rebuild(cls, user_id, create=True):
+        """Recompute the streak from the user's logs."""
+        current, best, last_date = cls._from_logs(user_id)
+        values = {'current': current, 'best': best, 'last_date': last_date}
+        if create:
+            return cls.objects.update_or_create(user_id=user_id, defaults=values)[0]
+        cls.objects.filter(user_id=user_id).update(**values)
+
+    @classmethod
+    def record(cls, user_id, dates):
+        """Update the streak for newly created daily logs."""
+        dates = sorted(set(dates))
+        if not dates:
+            return
+        with transaction.atomic():
+            streak = cls.objects.select_for_update().filter(user_id=user_id).first()
+            if streak is None:
+                current, best, last_date = cls._from_logs(user_id)
+                cls.objects.create(
+                    user_id=user_id, current=current, best=best, last_date=last_date
+                )
+                return
+
+            if streak.last_date is not None and dates[0] <= streak.last_date:
+                # A backfilled day may join two islands
+                current, best, last_date = cls._from_logs(user_id)
+            else:
+                current, best, last_date = streak.current, streak.best, streak.last_date
+                for day in dates:
+                    if last_date is not None and (day - last_date).days == 1:
+                        current += 1
+                    else:
+                        current = 1
+                    best = max(best, current)
+                    last_date = day
+            streak.current = current
+            streak.best = best
+            streak.last_date = last_date
+            streak.save(update_fields=['current', 'best', 'last_date', 'updated_at'])
+
+
+def _delta_macro(name):
+    return property(lambda self: _to_cents(self.vector[name]))
+
+
+class NutritionDelta:
+    """Change in a daily log's totals caused by adding or removing entries."""
+
+    calories = _delta_macro('calories')
+    protein = _delta_macro('protein')
+    carbohydrates = _delta_macro('carbohydrates')
+    fat = _delta_macro('fat')
+
+    def __init__(self, vector=None):
+        self.vector = NutrientVector() if vector is None else vector
+
+    def __bool__(self):
+        return bool(self.vector)
+
+    @classmethod
+    def from_log(cls, log, sign=1):
+        """Delta for a whole day's log being added (sign=1) or removed."""
+        return cls(NutrientVector.from_values(
+            calories=log.total_calories,
+            protein=log.total_protein,
+            carbohydrates=log.total_carbohydrates,
+            fat=log.total_fat,
+        ) * sign)
+
+    def add(self, values, sign=1):
+        """Add (sign=1) or remove (sign=-1) an entry's stored nutrition values."""
+        vector = NutrientVector.from_values(
+            calories=values['calories'],
+            protein=values['protein'],
+            carbohydrates=values['carbohydrates'],
+            fat=values['fat'],
+            micronutrients=values['micronutrients'],
+        )
+        self.vector += vector if sign > 0 else -vector
+        return self
+
+    def merge_micronutrients(self, summary):
+        merged = NutrientVector.from_values(micronutrients=summary) + self.vector
+        # Drop nutrients whose last contributing entry was removed
+        merged.present &= ~(
+            (merged.values.round(2) == 0) & (self.vector.values < 0)
+        )
+        for nutrient, value in self.vector.extra.items():
+            if value < 0 and round(merged.extra.get(nutrient, 0), 2) == 0:
+                merged.extra.pop(nutrient, None)
+        return merged.to_micronutrients()
+
+
+def period_start(period, day):
+    """First day of the ISO week (Monday) or calendar month containing day."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    if period == NutritionRollup.WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+class NutritionRollup(models.Model):
+    """
+    Per-user totals for one ISO week or calendar month of daily logs.
+    Kept up to date incrementally as logs and their entries change, so long
+    trend ranges read a handful of rows instead of every daily log.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='nutrition_rollups'
+    )
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    days_logged = models.IntegerField(default=0)
+    total_calories = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_protein = models.DecimalField(max_digits=11, decimal_places=2, default=0)
+    total_carbohydrates = models.DecimalField(max_digits=11, decimal_places=2, default=0)
+    total_fat = models.DecimalField(max_digits=11, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-period_start']
+        unique_together = [('user', 'period', 'period_start')]
+
+    def __str__(self):
+        return f"{self.user_id}'s {self.period} of {self.period_start}"
+
+    @property
+    def period_end(self):
+        if self.period == self.WEEK:
+            return self.period_start + timedelta(days=6)
+        next_month = (self.period_start + timedelta(days=32)).replace(day=1)
+        return next_month - timedelta(days=1)
+
+    def nutrient_totals(self):
+        return NutrientVector.from_values(
+            calories=self.total_calories,
+            protein=self.total_protein,
+            carbohydrates=self.total_carbohydrates,
+            fat=self.total_fat,
+        )
+
+    def average(self, field):
+        """Average per logged day of a total field."""
+        if not self.days_logged:
+            return 0.0
+        return round(float(getattr(self, field)) / self.days_logged, 1)
+
+    @classmethod
+    def apply(cls, user_id, day, delta, days=0):
+        """Add a NutritionDelta (and a change in logged days) to the week and
+        month containing day."""
+        if not delta and not days:
+            return
+        for period in (cls.WEEK, cls.MONTH):
+            cls._apply_period(user_id, period, period_start(period, day), delta, days)
+
+    @classmethod
+    def add_days(cls, user_id, dates):
+        """Count newly created (still empty) daily logs in their rollups."""
+        counts = Counter(
+            (period, period_start(period, day))
+            for day in dates
+            for period in (cls.WEEK, cls.MONTH)
+        )
+        for (period, start), days in counts.items():
+            cls._apply_period(user_id, period, start, NutritionDelta(), days)
+
+    @classmethod
+    def remove_logs(cls, user_id, logs):
+        """Take deleted daily logs (dicts of 'date' and total fields) out of
+        their week and month rollups."""
+        removed = {}
+        for log in logs:
+            for period in (cls.WEEK, cls.MONTH):
+                key = (period, period_start(period, log['date']))
+                totals = removed.setdefault(key, dict.fromkeys(LOG_TOTAL_FIELDS, 0))
+                totals['days_logged'] = totals.get('days_logged', 0) + 1
+                for field in LOG_TOTAL_FIELDS:
+                    totals[field] += log[field]
+        # Rows are only updated, never created
+        for (period, start), totals in removed.items():
+            cls.objects.filter(user_id=user_id, period=period, period_start=start).update(
+                updated_at=timezone.now(),
+                **{field: F(field) - value for field, value in totals.items()},
+            )
+
+    @classmethod
+    def _apply_period(cls, user_id, period, start, delta, days):
+        changes = {
+            'days_logged': F('days_logged') + days,
+            'total_calories': F('total_calories') + delta.calories,
+            'total_protein': F('total_protein') + delta.protein,
+            'total_carbohydrates': F('total_carbohydrates') + delta.carbohydrates,
+            'total_fat': F('total_fat') + delta.fat,
+            'updated_at': timezone.now(),
+        }
+        rollups = cls.objects.filter(user_id=user_id, period=period, period_start=start)
+        if rollups.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id,
+                    period=period,
+                    period_start=start,
+                    days_logged=days,
+                    total_calories=delta.calories,
+                    total_protein=delta.protein,
+                    total_carbohydrates=delta.carbohydrates,
+                    total_fat=delta.fat,
+                )
+        except IntegrityError:
+            # Created concurrently
+            rollups.update(**changes)
+
+    @classmethod
+    def rebuild(cls, user_id, days=None):
+        """
+        Recompute rollups from the daily logs.
+
+        Args:
+            user_id: User whose rollups are rebuilt
+            days: Only rebuild the weeks and months containing these dates;
+                None rebuilds all of them
+        """
+        logs = DailyNutritionLog.objects.filter(user_id=user_id)
+        rollups = cls.objects.filter(user_id=user_id)
+        if days is not None:
+            periods = {(period, period_start(period, day)) for day in days for period in (cls.WEEK, cls.MONTH)}
+            if not periods:
+                return
+            window = Q()
+            for period, start in periods:
+                window |= Q(period=period, period_start=start)
+            rollups = rollups.filter(window)
+            logs = logs.filter(
+                date__gte=min(start for _, start in periods),
+                date__lte=max(start for _, start in periods) + timedelta(days=31),
+            )
+
+        totals = {}
+        for log in logs.values(
+            'date', 'total_calories', 'total_protein', 'total_carbohydrates', 'total_fat'
+        ):
+            for period in (cls.WEEK, cls.MONTH):
+                key = (period, period_start(period, log['date']))
+                if days is not None and key not in periods:
+                    continue
+                rollup = totals.setdefault(key, cls(
+                    user_id=user_id, period=period, period_start=key[1]
+                ))
+                rollup.days_logged += 1
+                rollup.total_calories += log['total_calories']
+                rollup.total_protein += log['total_protein']
+                rollup.total_carbohydrates += log['total_carbohydrates']
+                rollup.total_fat += log['total_fat']
+
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create(totals.values())
+
+
+class FoodLogEntryQuerySet(models.QuerySet):
+    def delete(self):
+        """Delete entries, updating each affected log's totals once."""
+        with transaction.atomic():
+            deltas = {}
+            logged = {}
+            for values in self.values(
+                'daily_log_id', 'calories', 'protein', 'carbohydrates', 'fat',
+                'micronutrients', 'food_id', 'logged_at', 'daily_log__user_id'
+            ):
+                deltas.setdefault(values['daily_log_id'], NutritionDelta()).add(
+                    values, sign=-1
+                )
+                logged.setdefault(values['daily_log__user_id'], []).append(values)
+            result = super().delete()
+            for log_id, delta in deltas.items():
+                DailyNutritionLog.apply_delta(log_id, delta)
+            for user_id, entries in logged.items():
+                QuickFood.forget(user_id, entries)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class FoodLogEntry(models.Model):
@@ -171,6 +773,8 @@ class FoodLogEntry(models.Model):
     )
     
     logged_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FoodLogEntryQuerySet.as_manager()
     
     class Meta:
         ordering = ['logged_at']
@@ -179,30 +783,252 @@ class FoodLogEntry(models.Model):
     def __str__(self):
         return f"{self.food.name} ({self.serving_size} {self.serving_unit}) - {self.meal_type}"
     
-    def save(self, *args, **kwargs):
-        """Calculate nutrition values before saving."""
-        # Calculate nutrition based on food and serving size
+    def nutrition_values(self):
+        return {
+            'calories': self.calories,
+            'protein': self.protein,
+            'carbohydrates': self.carbohydrates,
+            'fat': self.fat,
+            'micronutrients': self.micronutrients,
+        }
+
+    def calculate_nutrition(self):
+        """Set the nutrition values from the food and serving size."""
+        # Rounded the way the columns store them, so the log's running totals
+        # match the stored entries exactly
         multiplier = float(self.serving_size)
-        self.calories = float(self.food.caloriesPerServing) * multiplier
-        self.protein = float(self.food.proteinContent) * multiplier
-        self.carbohydrates = float(self.food.carbohydrateContent) * multiplier
-        self.fat = float(self.food.fatContent) * multiplier
+        self.calories = _to_cents(float(self.food.caloriesPerServing) * multiplier)
+        self.protein = _to_cents(float(self.food.proteinContent) * multiplier)
+        self.carbohydrates = _to_cents(float(self.food.carbohydrateContent) * multiplier)
+        self.fat = _to_cents(float(self.food.fatContent) * multiplier)
         
         # Calculate micronutrients
         if self.food.micronutrients:
-            self.micronutrients = {
-                nutrient: value * multiplier
-                for nutrient, value in self.food.micronutrients.items()
-            }
-        
-        super().save(*args, **kwargs)
+            self.micronutrients = (
+                NutrientVector.from_values(micronutrients=self.food.micronutrients)
+                * multiplier
+            ).to_micronutrients(ndigits=None)
+
+    def save(self, *args, **kwargs):
+        """Calculate nutrition values before saving."""
+        self.calculate_nutrition()
+        is_new = self._state.adding
         
-        # Update daily log totals
-        self.daily_log.recalculate_totals()
+        with transaction.atomic():
+            # Update daily log totals by the difference to the stored row
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    FoodLogEntry.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values(
+                        'daily_log_id', 'calories', 'protein', 'carbohydrates',
+                        'fat', 'micronutrients'
+                    )
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            if previous and previous['daily_log_id'] != self.daily_log_id:
+                DailyNutritionLog.apply_delta(
+                    previous['daily_log_id'], NutritionDelta().add(previous, sign=-1)
+                )
+                previous = None
+            delta = NutritionDelta().add(self.nutrition_values())
+            if previous:
+                delta.add(previous, sign=-1)
+            DailyNutritionLog.apply_delta(self.daily_log_id, delta)
+            if is_new:
+                QuickFood.record(self.daily_log.user_id, [self])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            DailyNutritionLog.apply_delta(
+                self.daily_log_id, NutritionDelta().add(self.nutrition_values(), sign=-1)
+            )
+            QuickFood.forget(
+                self.daily_log.user_id,
+                [{'food_id': self.food_id, 'logged_at': self.logged_at}],
+            )
+        return result
+
+
+class QuickFood(models.Model):
+    """
+    A food the user logs often or recently, for one-tap re-logging.
+
+    Maintained from FoodLogEntry writes. ``score`` is a forward-decayed log
+    count kept in log2 space: each log has weight 2 ** position(logged_at),
+    its age in half-lives since EPOCH, and score is the log2 of the summed
+    weights. Scores only ever grow, yet ordering by them ranks foods by
+    frequency with older logs weighing exponentially less. Nothing is
+    rewritten as time passes; frequency() takes the decay back out.
+
+    In log2 space scores grow by about 26 a year instead of doubling every
+    half-life, so they never overflow and adding or removing a log doesn't
+    subtract nearly equal huge floats.
+    """
+    HALF_LIFE_DAYS = 14
+    EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    # Smallest share of the score a removal may leave, so rounding never
+    # takes the log of zero
+    MIN_REMAINDER = 2.0 ** -40
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='quick_foods'
+    )
+    food = models.ForeignKey(
+        'foods.FoodEntry',
+        on_delete=models.CASCADE,
+        related_name='quick_food_entries'
+    )
+    score = models.FloatField(default=0)
+    log_count = models.IntegerField(default=0)
+    last_logged_at = models.DateTimeField()
+    # The most recent serving, offered as the default when re-logging
+    serving_size = models.DecimalField(max_digits=6, decimal_places=2, default=1.0)
+    serving_unit = models.CharField(max_length=50, default='serving')
+    meal_type = models.CharField(max_length=20, choices=FoodLogEntry.MEAL_TYPE_CHOICES)
+
+    class Meta:
+        unique_together = [('user', 'food')]
+        indexes = [
+            models.Index(fields=['user', '-score']),
+            models.Index(fields=['user', '-last_logged_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.food_id} x{self.log_count}"
+
+    @classmethod
+    def position(cls, when):
+        """Half-lives from EPOCH to when: the log2 of one log's weight then."""
+        return (when - cls.EPOCH).total_seconds() / (cls.HALF_LIFE_DAYS * 86400)
+
+    def frequency(self, now=None):
+        """Decayed log count as of now: recent logs count ~1, older ones less."""
+        return 2 ** (self.score - self.position(now or timezone.now()))
+
+    @classmethod
+    def record(cls, user_id, entries):
+        """
+        Count newly logged entries of one user, in at most four queries
+        however many foods they cover.
+        """
+        foods = {}
+        for entry in sorted(entries, key=lambda entry: entry.logged_at):
+            score, count, _ = foods.get(entry.food_id, (None, 0, None))
+            position = cls.position(entry.logged_at)
+            score = position if score is None else _log2_add(score, position)
+            foods[entry.food_id] = (score, count + 1, entry)
+        if not foods:
+            return
+
+        rows = {
+            row.food_id: row
+            for row in cls.objects.filter(user_id=user_id, food_id__in=foods)
+        }
+        missing = [food_id for food_id in foods if food_id not in rows]
+        if missing:
+            # Insert empty rows and count every log with the update below,
+            # so a concurrent first log of the same food only adds to it
+            cls.objects.bulk_create(
+                [
+                    cls(
+                        user_id=user_id,
+                        food_id=food_id,
+                        last_logged_at=foods[food_id][2].logged_at,
+                        meal_type=foods[food_id][2].meal_type,
+                    )
+                    for food_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            rows.update(
+                (row.food_id, row)
+                for row in cls.objects.filter(user_id=user_id, food_id__in=missing)
+            )
+
+        for food_id, row in rows.items():
+            score, count, latest = foods[food_id]
+            # Empty rows take the score as is; score is assigned before
+            # log_count, which MySQL applies left to right
+            row.score = models.Case(
+                models.When(log_count=0, then=Value(score)),
+                default=_log2_add_expression(score),
+            )
+            row.log_count = F('log_count') + count
+            row.last_logged_at = latest.logged_at
+            row.serving_size = latest.serving_size
+            row.serving_unit = latest.serving_unit
+            row.meal_type = latest.meal_type
+        cls.objects.bulk_update(
+            rows.values(),
+            ['score', 'log_count', 'last_logged_at', 'serving_size', 'serving_unit', 'meal_type'],
+        )
+
+    @classmethod
+    def forget(cls, user_id, entries):
+        """
+        Take deleted entries (dicts of 'food_id' and 'logged_at') back out of
+        the user's scores, removing foods left with no logs. The rest go back
+        to the serving of their latest remaining entry.
+        """
+        foods = {}
+        for entry in entries:
+            score, count = foods.get(entry['food_id'], (None, 0))
+            position = cls.position(entry['logged_at'])
+            score = position if score is None else _log2_add(score, position)
+            foods[entry['food_id']] = (score, count + 1)
+        rows = list(cls.objects.filter(user_id=user_id, food_id__in=foods))
+        if not rows:
+            return
+        for row in rows:
+            score, count = foods[row.food_id]
+            # log2(2 ** score - 2 ** removed), as score + log2(1 - 2 ** (removed - score))
+            row.score = F('score') + Log(
+                2,
+                Greatest(
+                    1.0 - Power(2, Value(score) - F('score')),
+                    Value(cls.MIN_REMAINDER),
+                ),
+            )
+            row.log_count = F('log_count') - count
+        cls.objects.bulk_update(rows, ['score', 'log_count'])
+        cls.objects.filter(user_id=user_id, food_id__in=foods, log_count__lte=0).delete()
+
+        latest = FoodLogEntry.objects.filter(
+            daily_log__user_id=OuterRef('user_id'), food_id=OuterRef('food_id')
+        ).order_by('-logged_at', '-id')
+        cls.objects.filter(Exists(latest), user_id=user_id, food_id__in=foods).update(
+            **{
+                field: Subquery(latest.values(column)[:1])
+                for field, column in (
+                    ('last_logged_at', 'logged_at'),
+                    ('serving_size', 'serving_size'),
+                    ('serving_unit', 'serving_unit'),
+                    ('meal_type', 'meal_type'),
+                )
+            }
+        )
+
+
+def _log2_add(a, b):
+    """log2(2 ** a + 2 ** b), without leaving log2 space."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _log2_add_expression(score):
+    """_log2_add() of the score column and a value, evaluated in the UPDATE."""
+    high = Greatest(F('score'), Value(score))
+    low = Least(F('score'), Value(score))
+    return high + Log(2, 1.0 + Power(2, low - high))
+
 
+def _to_cents(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
 
-# Signal to recalculate totals when an entry is deleted
-@receiver(post_delete, sender=FoodLogEntry)
-def recalculate_daily_log_on_delete(sender, instance, **kwargs):
-    """Update daily log totals when a food entry is deleted."""
-    instance.daily_log.recalculate_totals()
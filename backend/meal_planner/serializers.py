@@ -1,7 +1,32 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import models
 from rest_framework import serializers
-from .models import MealPlan
+from .generator import DEFAULT_TOLERANCE
+from .models import FoodLogEntry, MealPlan
+from .services import (
+    MAX_SERVING_SIZE,
+    copied_day_items,
+    meal_plan_items,
+    recipe_items,
+)
+from accounts.models import NutritionTargets
 from foods.models import FoodEntry
 from foods.serializers import FoodEntrySerializer
+from forum.models import Recipe
+from project.utils.nutrients import NutrientVector, macro_percentages
+
+
+def resolve_foods(food_ids):
+    """Load the given food IDs with a single in_bulk query, skipping bad IDs."""
+    ids = set()
+    for food_id in food_ids:
+        try:
+            ids.add(int(food_id))
+        except (TypeError, ValueError):
+            continue
+    return FoodEntry.objects.in_bulk(ids) if ids else {}
 
 
 class MealSerializer(serializers.Serializer):
@@ -12,7 +37,13 @@ class MealSerializer(serializers.Serializer):
     
     def validate_food_id(self, value):
         """Validate that the food entry exists"""
-        if not FoodEntry.objects.filter(id=value).exists():
+        # The parent serializer resolves every meal's food up front
+        foods = self.context.get('foods')
+        if foods is not None:
+            exists = value in foods
+        else:
+            exists = FoodEntry.objects.filter(id=value).exists()
+        if not exists:
             raise serializers.ValidationError("Food entry with this ID does not exist.")
         return value
 
@@ -24,17 +55,23 @@ class MealPlanCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = MealPlan
         fields = ['name', 'meals']
+
+    def to_internal_value(self, data):
+        meals = data.get('meals') if hasattr(data, 'get') else None
+        if isinstance(meals, list):
+            self.context['foods'] = resolve_foods(
+                meal.get('food_id') for meal in meals if isinstance(meal, dict)
+            )
+        return super().to_internal_value(data)
     
     def create(self, validated_data):
         meals_data = validated_data.pop('meals', [])
         
-        # Create meal plan first
-        meal_plan = MealPlan.objects.create(**validated_data)
-        
-        # Set the meals data directly to the JSONField
+        # Items are written together with the plan
+        meal_plan = MealPlan(**validated_data)
+        meal_plan.set_meals(meals_data, foods=self.context.get('foods'))
+        meal_plan.save()
         if meals_data:
-            meal_plan.meals = meals_data
-            meal_plan.save()  # Save after setting meals
             meal_plan.calculate_total_nutrition()
         
         return meal_plan
@@ -46,24 +83,27 @@ class MealPlanCreateSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        # Update meals array if provided
+        # Replace the plan's items if meals are provided
         if meals_data:
-            instance.meals = meals_data
-            instance.calculate_total_nutrition()
+            instance.set_meals(meals_data, foods=self.context.get('foods'))
         
         instance.save()
+        if meals_data:
+            instance.calculate_total_nutrition()
         return instance
 
 
 class MealPlanSerializer(serializers.ModelSerializer):
     """Serializer for reading meal plans with detailed meal information"""
+    meals = serializers.ListField(read_only=True)
     meals_details = serializers.SerializerMethodField()
+    total_micronutrients = serializers.SerializerMethodField()
     
     class Meta:
         model = MealPlan
         fields = [
             'id', 'name', 'total_calories', 'total_protein', 
-            'total_fat', 'total_carbohydrates', 'meals', 
+            'total_fat', 'total_carbohydrates', 'total_micronutrients', 'meals', 
             'meals_details', 'created_at', 'updated_at', 'is_active'
         ]
         read_only_fields = [
@@ -74,26 +114,42 @@ class MealPlanSerializer(serializers.ModelSerializer):
     def get_meals_details(self, obj):
         """Get detailed food information for each meal"""
         meals_details = []
-        for meal in obj.meals:
-            try:
-                food_entry = FoodEntry.objects.get(id=meal.get('food_id'))
-                food_serializer = FoodEntrySerializer(food_entry)
-                meal_detail = {
-                    'food': food_serializer.data,
-                    'serving_size': meal.get('serving_size', 1.0),
-                    'meal_type': meal.get('meal_type', 'meal'),
-                    'calculated_nutrition': {
-                        'calories': food_entry.caloriesPerServing * meal.get('serving_size', 1.0),
-                        'protein': food_entry.proteinContent * meal.get('serving_size', 1.0),
-                        'fat': food_entry.fatContent * meal.get('serving_size', 1.0),
-                        'carbohydrates': food_entry.carbohydrateContent * meal.get('serving_size', 1.0),
-                    }
+        for item in obj.get_items():
+            food_entry = item.food
+            food_serializer = FoodEntrySerializer(food_entry)
+            meal_detail = {
+                'food': food_serializer.data,
+                'serving_size': item.serving_size,
+                'meal_type': item.meal_type,
+                'calculated_nutrition': {
+                    'calories': food_entry.caloriesPerServing * item.serving_size,
+                    'protein': food_entry.proteinContent * item.serving_size,
+                    'fat': food_entry.fatContent * item.serving_size,
+                    'carbohydrates': food_entry.carbohydrateContent * item.serving_size,
                 }
-                meals_details.append(meal_detail)
-            except FoodEntry.DoesNotExist:
-                continue
+            }
+            meals_details.append(meal_detail)
         return meals_details
 
+    def get_total_micronutrients(self, obj):
+        """Micronutrient totals of the plan's items."""
+        return obj.nutrient_totals().to_micronutrients()
+
+
+class MealPlanGenerateSerializer(serializers.Serializer):
+    """Options for generating a meal plan from nutrition targets."""
+    name = serializers.CharField(max_length=100, required=False, default='Generated Meal Plan')
+    categories = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, default=list
+    )
+    calories = serializers.FloatField(
+        required=False, min_value=500, max_value=10000,
+        help_text="Daily calorie goal; defaults to the user's targets"
+    )
+    tolerance = serializers.FloatField(
+        required=False, default=DEFAULT_TOLERANCE, min_value=0.01, max_value=0.5
+    )
+
 
 class FoodLogEntrySerializer(serializers.ModelSerializer):
     """Serializer for individual food log entries."""
@@ -122,9 +178,135 @@ class FoodLogEntrySerializer(serializers.ModelSerializer):
         return value
 
 
-class DailyNutritionLogSerializer(serializers.ModelSerializer):
+MAX_BULK_LOG_ENTRIES = 200
+
+
+class BulkFoodLogItemSerializer(serializers.Serializer):
+    """One food in a bulk logging request."""
+    food_id = serializers.IntegerField()
+    serving_size = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=Decimal('0.01')
+    )
+    serving_unit = serializers.CharField(max_length=50, required=False)
+    meal_type = serializers.ChoiceField(choices=FoodLogEntry.MEAL_TYPE_CHOICES)
+    date = serializers.DateField(required=False)
+
+    def validate_food_id(self, value):
+        """Validate that the food entry exists"""
+        if value not in self.context.get('foods', {}):
+            raise serializers.ValidationError("Food entry with this ID does not exist.")
+        return value
+
+
+class BulkFoodLogSerializer(serializers.Serializer):
+    """
+    Log many foods at once from exactly one source: a list of entries, a
+    meal plan, a forum recipe, or a copy of another day.
+    """
+    SOURCES = ('entries', 'meal_plan_id', 'recipe_id', 'copy_from')
+
+    date = serializers.DateField(required=False)
+    entries = BulkFoodLogItemSerializer(many=True, required=False)
+    meal_plan_id = serializers.IntegerField(required=False)
+    recipe_id = serializers.IntegerField(required=False)
+    # Whole recipes eaten; forum recipes have no servings/yield to divide by
+    multiplier = serializers.FloatField(required=False, default=1.0, min_value=0.01)
+    meal_type = serializers.ChoiceField(
+        choices=FoodLogEntry.MEAL_TYPE_CHOICES, required=False
+    )
+    copy_from = serializers.DateField(required=False)
+
+    def to_internal_value(self, data):
+        entries = data.get('entries') if hasattr(data, 'get') else None
+        if isinstance(entries, list):
+            self.context['foods'] = resolve_foods(
+                entry.get('food_id') for entry in entries if isinstance(entry, dict)
+            )
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        sources = [source for source in self.SOURCES if source in attrs]
+        if len(sources) != 1:
+            raise serializers.ValidationError(
+                f"Provide exactly one of: {', '.join(self.SOURCES)}."
+            )
+        user = self.context['request'].user
+        day = attrs.get('date') or date.today()
+
+        if 'entries' in attrs:
+            items = [
+                {**entry, 'date': entry.get('date') or day}
+                for entry in attrs['entries']
+            ]
+        elif 'meal_plan_id' in attrs:
+            meal_plan = MealPlan.objects.filter(
+                id=attrs['meal_plan_id'], user=user
+            ).first()
+            if meal_plan is None:
+                raise serializers.ValidationError(
+                    {'meal_plan_id': "Meal plan not found."}
+                )
+            items = meal_plan_items(meal_plan, day, attrs.get('meal_type'))
+        elif 'recipe_id' in attrs:
+            if 'meal_type' not in attrs:
+                raise serializers.ValidationError(
+                    {'meal_type': "Required when logging a recipe."}
+                )
+            recipe = Recipe.objects.filter(id=attrs['recipe_id']).first()
+            if recipe is None:
+                raise serializers.ValidationError({'recipe_id': "Recipe not found."})
+            items = recipe_items(recipe, day, attrs['multiplier'], attrs['meal_type'])
+        else:
+            if attrs['copy_from'] == day:
+                raise serializers.ValidationError(
+                    {'copy_from': "Can't copy a day onto itself."}
+                )
+            items = copied_day_items(user, attrs['copy_from'], day)
+
+        if not items:
+            raise serializers.ValidationError("Nothing to log.")
+        if len(items) > MAX_BULK_LOG_ENTRIES:
+            raise serializers.ValidationError(
+                f"At most {MAX_BULK_LOG_ENTRIES} entries can be logged at once."
+            )
+        # Meal plans and recipe multipliers aren't bounded by the entry column
+        if any(item['serving_size'] > MAX_SERVING_SIZE for item in items):
+            raise serializers.ValidationError(
+                f"Serving sizes can be at most {MAX_SERVING_SIZE}."
+            )
+        attrs['items'] = items
+        return attrs
+
+
+class UserTargetsMixin:
+    """
+    Looks up the log owner's NutritionTargets once per serializer.
+
+    Views can pass them (or None) as the 'targets' context to share one
+    query across serializers; the serialized logs belong to one user.
+    """
+
+    def user_targets(self, obj):
+        if 'targets' not in self.context:
+            self.context['targets'] = NutritionTargets.objects.filter(
+                user_id=obj.user_id
+            ).first()
+        return self.context['targets']
+
+
+def targets_dict(targets):
+    return {
+        'calories': float(targets.calories),
+        'protein': float(targets.protein),
+        'carbohydrates': float(targets.carbohydrates),
+        'fat': float(targets.fat),
+        'micronutrients': targets.micronutrients,
+    }
+
+
+class DailyNutritionLogSerializer(UserTargetsMixin, serializers.ModelSerializer):
     """Serializer for daily nutrition log with nested entries and target comparison."""
-    entries = FoodLogEntrySerializer(many=True, read_only=True)
+    entries = FoodLogEntrySerializer(many=True, read_only=True, source='logged_entries')
     targets = serializers.SerializerMethodField(read_only=True)
     adherence = serializers.SerializerMethodField(read_only=True)
 
@@ -143,45 +325,121 @@ class DailyNutritionLogSerializer(serializers.ModelSerializer):
 
     def get_targets(self, obj):
         """Get user's nutrition targets if available."""
-        try:
-            targets = obj.user.nutrition_targets
-            return {
-                'calories': float(targets.calories),
-                'protein': float(targets.protein),
-                'carbohydrates': float(targets.carbohydrates),
-                'fat': float(targets.fat),
-                'micronutrients': targets.micronutrients,
-            }
-        except:
-            return None
+        targets = self.user_targets(obj)
+        return targets_dict(targets) if targets is not None else None
 
     def get_adherence(self, obj):
         """Calculate adherence percentage to targets."""
-        try:
-            targets = obj.user.nutrition_targets
-            adherence = {
-                'calories': round((float(obj.total_calories) / float(targets.calories)) * 100, 1) if float(targets.calories) > 0 else 0,
-                'protein': round((float(obj.total_protein) / float(targets.protein)) * 100, 1) if float(targets.protein) > 0 else 0,
-                'carbohydrates': round((float(obj.total_carbohydrates) / float(targets.carbohydrates)) * 100, 1) if float(targets.carbohydrates) > 0 else 0,
-                'fat': round((float(obj.total_fat) / float(targets.fat)) * 100, 1) if float(targets.fat) > 0 else 0,
-            }
-            return adherence
-        except:
+        targets = self.user_targets(obj)
+        if targets is None:
             return None
+        return obj.nutrient_totals().percent_of(NutrientVector.from_targets(targets)).macros()
 
 
-class DailyNutritionLogListSerializer(serializers.ModelSerializer):
+class DailyNutritionLogBatchSerializer(serializers.ListSerializer):
+    """Computes every log's macro adherence in one array operation."""
+
+    def to_representation(self, data):
+        logs = list(data.all() if isinstance(data, models.Manager) else data)
+        targets = self.child.user_targets(logs[0]) if logs else None
+        if targets is not None:
+            rows = [
+                (log.total_calories, log.total_protein, log.total_carbohydrates, log.total_fat)
+                for log in logs
+            ]
+            percentages = macro_percentages(rows, NutrientVector.from_targets(targets))
+            self.child.adherence = {
+                id(log): percent for log, percent in zip(logs, percentages)
+            }
+        return super().to_representation(logs)
+
+
+class DailyNutritionLogListSerializer(UserTargetsMixin, serializers.ModelSerializer):
     """Simplified serializer for list views (no nested entries)."""
+    adherence = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         from .models import DailyNutritionLog
         model = DailyNutritionLog
         fields = [
             'date', 'total_calories', 'total_protein', 'total_carbohydrates',
-            'total_fat', 'micronutrients_summary'
+            'total_fat', 'micronutrients_summary', 'adherence'
         ]
         read_only_fields = [
             'total_calories', 'total_protein', 'total_carbohydrates', 'total_fat',
             'micronutrients_summary'
         ]
+        list_serializer_class = DailyNutritionLogBatchSerializer
+
+    def get_adherence(self, obj):
+        """Macro intake as a percentage of the user's targets."""
+        adherence = getattr(self, 'adherence', None)
+        if adherence is not None and id(obj) in adherence:
+            return adherence[id(obj)]
+        targets = self.user_targets(obj)
+        if targets is None:
+            return None
+        return obj.nutrient_totals().percent_of(NutrientVector.from_targets(targets)).macros()
+
+
+class NutritionRollupSerializer(serializers.ModelSerializer):
+    """
+    Weekly or monthly totals with per-day averages. Adherence is computed
+    against the targets passed in the 'targets' context (the user's current
+    targets), so it follows target changes without rewriting rollups.
+    """
+    period_end = serializers.DateField(read_only=True)
+    averages = serializers.SerializerMethodField(read_only=True)
+    adherence = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        from .models import NutritionRollup
+        model = NutritionRollup
+        fields = [
+            'period', 'period_start', 'period_end', 'days_logged',
+            'total_calories', 'total_protein', 'total_carbohydrates', 'total_fat',
+            'averages', 'adherence'
+        ]
+        read_only_fields = fields
+
+    def get_averages(self, obj):
+        return {
+            'calories': obj.average('total_calories'),
+            'protein': obj.average('total_protein'),
+            'carbohydrates': obj.average('total_carbohydrates'),
+            'fat': obj.average('total_fat'),
+        }
+
+    def get_adherence(self, obj):
+        """Average intake as a percentage of the user's targets."""
+        targets = self.context.get('targets')
+        if targets is None or not obj.days_logged:
+            return None
+        return (obj.nutrient_totals() * (1 / obj.days_logged)).percent_of(
+            NutrientVector.from_targets(targets)
+        ).macros()
+
+
+class QuickFoodSerializer(serializers.ModelSerializer):
+    """
+    A food to offer for quick logging, with the serving last used. frequency
+    is the decayed log count as of the 'now' context.
+    """
+    food_id = serializers.IntegerField(read_only=True)
+    food_name = serializers.CharField(source='food.name', read_only=True)
+    image_url = serializers.CharField(source='food.imageUrl', read_only=True)
+    calories_per_serving = serializers.FloatField(source='food.caloriesPerServing', read_only=True)
+    frequency = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        from .models import QuickFood
+        model = QuickFood
+        fields = [
+            'food_id', 'food_name', 'image_url', 'calories_per_serving',
+            'serving_size', 'serving_unit', 'meal_type', 'log_count',
+            'frequency', 'last_logged_at'
+        ]
+        read_only_fields = fields
 
+    def get_frequency(self, obj):
+        return round(obj.frequency(self.context.get('now')), 2)
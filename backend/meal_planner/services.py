@@ -0,0 +1,177 @@
+"""
+Service layer for food logging.
+Bulk logging writes many FoodLogEntry rows with one bulk_create and applies
+one totals update per affected day, all in a single transaction.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from foods.models import FoodEntry
+from .models import (
+    DailyNutritionLog,
+    FoodLogEntry,
+    LoggingStreak,
+    NutritionDelta,
+    NutritionRollup,
+    QuickFood,
+)
+
+MEAL_TYPES = {choice for choice, _ in FoodLogEntry.MEAL_TYPE_CHOICES}
+DEFAULT_MEAL_TYPE = 'snack'
+# Largest serving_size FoodLogEntry's DecimalField(max_digits=6) can hold
+MAX_SERVING_SIZE = Decimal('9999.99')
+
+
+def to_serving_size(value):
+    """Round a serving multiplier to the column's two decimal places."""
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def get_or_create_logs(user, dates):
+    """
+    Return {date: DailyNutritionLog} for the user's given dates, creating the
+    missing logs with one bulk insert. Runs inside the caller's transaction.
+    """
+    dates = set(dates)
+    logs = {
+        log.date: log
+        for log in DailyNutritionLog.objects.filter(user=user, date__in=dates)
+    }
+    missing = dates - set(logs)
+    if missing:
+        # ignore_conflicts covers a concurrent request creating the same day
+        new_logs = [DailyNutritionLog(user=user, date=day) for day in missing]
+        DailyNutritionLog.objects.bulk_create(new_logs, ignore_conflicts=True)
+        # A locking read sees days a concurrent request committed meanwhile;
+        # only rows carrying this insert's created_at are new from here
+        stamps = {log.date: log.created_at for log in new_logs}
+        logs.update(
+            (log.date, log)
+            for log in DailyNutritionLog.objects.select_for_update().filter(
+                user=user, date__in=missing
+            )
+        )
+        created = {day for day in missing if logs[day].created_at == stamps[day]}
+        # bulk_create skips DailyNutritionLog.save()
+        LoggingStreak.record(user.id, created)
+        NutritionRollup.add_days(user.id, created)
+    return logs
+
+
+@transaction.atomic
+def bulk_log_entries(user, items):
+    """
+    Log many foods at once.
+
+    Args:
+        user: User whose daily logs receive the entries
+        items (list): Dicts with 'date', 'food_id', 'serving_size' and
+            'meal_type', and optionally 'serving_unit'. Every food_id must
+            exist.
+
+    Returns:
+        dict: {date: DailyNutritionLog} for the affected days, with
+            refreshed totals
+    """
+    if not items:
+        return {}
+
+    foods = FoodEntry.objects.in_bulk({item['food_id'] for item in items})
+    logs = get_or_create_logs(user, (item['date'] for item in items))
+
+    entries = []
+    deltas = {}
+    for item in items:
+        entry = FoodLogEntry(
+            daily_log=logs[item['date']],
+            food=foods[item['food_id']],
+            serving_size=to_serving_size(item['serving_size']),
+            serving_unit=item.get('serving_unit') or 'serving',
+            meal_type=item['meal_type'],
+        )
+        entry.calculate_nutrition()
+        entries.append(entry)
+        deltas.setdefault(entry.daily_log_id, NutritionDelta()).add(
+            entry.nutrition_values()
+        )
+
+    FoodLogEntry.objects.bulk_create(entries)
+    for log_id, delta in deltas.items():
+        DailyNutritionLog.apply_delta(log_id, delta)
+    # bulk_create skips FoodLogEntry.save()
+    QuickFood.record(user.id, entries)
+
+    return {
+        log.date: log
+        for log in DailyNutritionLog.objects.filter(
+            id__in=[log.id for log in logs.values()]
+        )
+    }
+
+
+def meal_plan_items(meal_plan, day, meal_type=None):
+    """Log items for every food in a meal plan, at its planned servings."""
+    items = []
+    for item in meal_plan.items.all():
+        # Plan servings are floats; log them at the entry column's precision
+        serving_size = to_serving_size(item.serving_size)
+        if serving_size <= 0:
+            continue
+        items.append({
+            'date': day,
+            'food_id': item.food_id,
+            'serving_size': serving_size,
+            # Plans use free-form meal names; fall back when they aren't a
+            # log meal type
+            'meal_type': meal_type or (
+                item.meal_type if item.meal_type in MEAL_TYPES else DEFAULT_MEAL_TYPE
+            ),
+        })
+    return items
+
+
+def recipe_items(recipe, day, multiplier, meal_type):
+    """
+    Log items for a forum recipe's ingredients.
+
+    Recipes have no yield, so multiplier counts whole recipes (0.5 for half
+    of it). Ingredient amounts are in grams; they are converted to servings
+    of each food, the unit every entry is logged in.
+    """
+    items = []
+    for ingredient in recipe.ingredients.select_related('food'):
+        if not ingredient.food.servingSize:
+            continue
+        serving_size = to_serving_size(
+            ingredient.amount / ingredient.food.servingSize * multiplier
+        )
+        if serving_size <= 0:
+            continue
+        items.append({
+            'date': day,
+            'food_id': ingredient.food_id,
+            'serving_size': serving_size,
+            'meal_type': meal_type,
+        })
+    return items
+
+
+def copied_day_items(user, source_day, day):
+    """Log items repeating every entry of another day."""
+    items = []
+    for entry in FoodLogEntry.objects.filter(
+        daily_log__user=user, daily_log__date=source_day
+    ).values('food_id', 'serving_size', 'serving_unit', 'meal_type'):
+        serving_size = to_serving_size(entry['serving_size'])
+        if serving_size <= 0:
+            continue
+        items.append({
+            'date': day,
+            'food_id': entry['food_id'],
+            'serving_size': serving_size,
+            'serving_unit': entry['serving_unit'],
+            'meal_type': entry['meal_type'],
+        })
+    return items
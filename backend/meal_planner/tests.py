@@ -4,7 +4,7 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.urls import reverse
 
-from .models import MealPlan
+from .models import MealPlan, MealPlanItem
 from foods.models import FoodEntry
 
 
@@ -98,6 +98,65 @@ class MealPlanModelTests(TestCase):
         self.assertAlmostEqual(plan.total_carbohydrates, 0.6, places=4)
 
 
+    def test_meals_are_stored_as_items(self):
+        plan = MealPlan.objects.create(
+            user=self.user,
+            name="Items",
+            meals=[
+                {"food_id": self.food2.id, "serving_size": 2.0, "meal_type": "breakfast"},
+                {"food_id": 999999, "serving_size": 1.0, "meal_type": "lunch"},
+                {"food_id": self.food1.id, "meal_type": "dinner"},
+            ],
+        )
+
+        items = list(MealPlanItem.objects.filter(meal_plan=plan))
+        self.assertEqual([item.food_id for item in items], [self.food2.id, self.food1.id])
+        self.assertEqual([item.position for item in items], [0, 1])
+        self.assertEqual(items[1].serving_size, 1.0)
+
+        plan = MealPlan.objects.get(pk=plan.pk)
+        self.assertEqual(
+            plan.meals,
+            [
+                {"food_id": self.food2.id, "serving_size": 2.0, "meal_type": "breakfast"},
+                {"food_id": self.food1.id, "serving_size": 1.0, "meal_type": "dinner"},
+            ],
+        )
+        self.assertEqual(
+            list(MealPlan.objects.filter(items__food=self.food1)), [plan]
+        )
+
+    def test_nutrient_totals_include_micronutrients(self):
+        self.food1.micronutrients = {"Iron": 2.0}
+        self.food1.save()
+        self.food2.micronutrients = {"Iron": 1.0, "Vitamin D": 1.1}
+        self.food2.save()
+        plan = MealPlan.objects.create(
+            user=self.user,
+            meals=[
+                {"food_id": self.food1.id, "serving_size": 1.5, "meal_type": "breakfast"},
+                {"food_id": self.food2.id, "serving_size": 2.0, "meal_type": "breakfast"},
+            ],
+        )
+
+        totals = MealPlan.objects.with_items().get(pk=plan.pk).nutrient_totals()
+        self.assertAlmostEqual(totals["calories"], 194.0 * 1.5 + 78.0 * 2.0, places=4)
+        self.assertEqual(totals.to_micronutrients(), {"Vitamin D": 2.2, "Iron": 5.0})
+
+    def test_setting_meals_replaces_items(self):
+        plan = MealPlan.objects.create(
+            user=self.user,
+            meals=[{"food_id": self.food1.id, "serving_size": 1.0, "meal_type": "lunch"}],
+        )
+        plan.meals = [{"food_id": self.food2.id, "serving_size": 3.0, "meal_type": "snack"}]
+        plan.save()
+
+        self.assertEqual(
+            list(plan.items.values_list("food_id", "serving_size")),
+            [(self.food2.id, 3.0)],
+        )
+
+
 class MealPlanSerializerTests(TestCase):
     def setUp(self):
         self.user = create_user()
@@ -150,6 +209,43 @@ class MealPlanSerializerTests(TestCase):
         self.assertEqual(len(plan.meals), 1)
         self.assertGreater(plan.total_calories, 0.0)
 
+    def test_create_resolves_foods_once(self):
+        from .serializers import MealPlanCreateSerializer
+
+        foods = [create_food(name=f"Food {i}") for i in range(30)]
+        serializer = MealPlanCreateSerializer(
+            data={
+                "name": "Big Plan",
+                "meals": [
+                    {"food_id": food.id, "serving_size": 1.0, "meal_type": "lunch"}
+                    for food in foods
+                ],
+            }
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        # Plan and items inserted in a savepoint, then the items with their
+        # foods and allergens (kept for the response) and the totals update
+        with self.assertNumQueries(7):
+            plan = serializer.save(user=self.user)
+        self.assertEqual(plan.items.count(), 30)
+
+    def test_create_rejects_unknown_food(self):
+        from .serializers import MealPlanCreateSerializer
+
+        serializer = MealPlanCreateSerializer(
+            data={
+                "name": "Bad Plan",
+                "meals": [
+                    {"food_id": self.food.id},
+                    {"food_id": 123456789},
+                ],
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("food_id", serializer.errors["meals"][1])
+
 
 class MealPlanAPITests(APITestCase):
     def setUp(self):
@@ -241,3 +337,927 @@ class MealPlanAPITests(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["id"], plan1.id)
 
+
+    def test_list_prefetches_items_and_foods(self):
+        for i in range(3):
+            MealPlan.objects.create(
+                user=self.user,
+                name=f"Plan {i}",
+                meals=[
+                    {"food_id": self.food1.id, "serving_size": 1.0, "meal_type": "breakfast"},
+                    {"food_id": self.food2.id, "serving_size": 2.0, "meal_type": "lunch"},
+                ],
+            )
+
+        url = reverse("meal-plan-list-create")
+        # Page count, plans, items joined with their foods, food allergens
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data if isinstance(res.data, list) else res.data.get("results", [])
+        self.assertEqual(len(results), 3)
+        for plan in results:
+            self.assertEqual(len(plan["meals"]), 2)
+            self.assertEqual(plan["meals_details"][1]["food"]["id"], self.food2.id)
+            self.assertEqual(plan["meals_details"][1]["calculated_nutrition"]["calories"], 118.0)
+
+
+class DailyLogTotalsTests(TestCase):
+    def setUp(self):
+        from .models import DailyNutritionLog
+
+        self.user = create_user()
+        self.food = create_food(
+            name="Spinach",
+            caloriesPerServing=23.0,
+            proteinContent=2.9,
+            fatContent=0.4,
+            carbohydrateContent=3.6,
+        )
+        self.food.micronutrients = {"Iron": 2.7, "Vitamin C": 28.1}
+        self.food.save()
+        self.other_food = create_food(name="Rice", caloriesPerServing=130.0)
+        self.log = DailyNutritionLog.objects.create(user=self.user, date="2026-01-05")
+
+    def add_entry(self, food, serving_size):
+        from .models import FoodLogEntry
+
+        return FoodLogEntry.objects.create(
+            daily_log=self.log, food=food, serving_size=serving_size, meal_type="lunch"
+        )
+
+    def assert_totals_match_entries(self):
+        from decimal import Decimal
+
+        self.log.refresh_from_db()
+        entries = list(self.log.entries.all())
+        self.assertEqual(
+            self.log.total_calories, sum((e.calories for e in entries), Decimal("0"))
+        )
+        self.assertEqual(
+            self.log.total_protein, sum((e.protein for e in entries), Decimal("0"))
+        )
+
+    def test_entry_changes_update_totals_by_delta(self):
+        from decimal import Decimal
+
+        entry = self.add_entry(self.food, "1.5")
+        rice = self.add_entry(self.other_food, "2")
+        self.assert_totals_match_entries()
+        self.assertEqual(self.log.total_calories, Decimal("294.50"))
+        self.assertEqual(self.log.micronutrients_summary, {"Iron": 4.05, "Vitamin C": 42.15})
+
+        entry.serving_size = Decimal("1")
+        entry.save()
+        self.assert_totals_match_entries()
+        self.assertEqual(self.log.micronutrients_summary, {"Iron": 2.7, "Vitamin C": 28.1})
+
+        entry.delete()
+        self.assert_totals_match_entries()
+        self.assertEqual(self.log.total_calories, Decimal("260.00"))
+        self.assertEqual(self.log.micronutrients_summary, {})
+
+        rice.delete()
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.total_calories, Decimal("0"))
+
+    def test_bulk_delete_updates_each_log_once(self):
+        from .models import FoodLogEntry
+
+        for _ in range(5):
+            self.add_entry(self.food, "1")
+
+        # Entry values and delete, then one lock + update for the log and
+        # one update per rollup, each step inside its own savepoint, and the
+        # quick food read, update, prune and latest serving refresh
+        with self.assertNumQueries(14):
+            FoodLogEntry.objects.filter(daily_log=self.log).delete()
+
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.total_calories, 0)
+        self.assertEqual(self.log.micronutrients_summary, {})
+
+    def test_reconcile_fixes_drift(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import DailyNutritionLog
+
+        self.add_entry(self.food, "2")
+        DailyNutritionLog.objects.filter(pk=self.log.pk).update(
+            total_calories=999, micronutrients_summary={"Iron": 1}
+        )
+
+        out = StringIO()
+        call_command("reconcile_daily_logs", "--dry-run", stdout=out)
+        self.assertIn("would have fixed 1 of 1", out.getvalue())
+
+        call_command("reconcile_daily_logs", stdout=StringIO())
+        self.assert_totals_match_entries()
+        self.assertEqual(self.log.micronutrients_summary, {"Iron": 5.4, "Vitamin C": 56.2})
+
+        out = StringIO()
+        call_command("reconcile_daily_logs", stdout=out)
+        self.assertIn("Fixed 0 of 1", out.getvalue())
+
+
+class BulkFoodLogTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="logger", email="logger@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("food-log-entry-bulk")
+        self.apple = create_food(name="Apple", caloriesPerServing=95.0, proteinContent=0.5, fatContent=0.3, carbohydrateContent=25.0)
+        self.yogurt = create_food(name="Yogurt", caloriesPerServing=59.0, proteinContent=10.0, fatContent=0.4, carbohydrateContent=3.6)
+
+    def test_bulk_entries_across_days(self):
+        from decimal import Decimal
+        from .models import DailyNutritionLog, FoodLogEntry
+
+        payload = {
+            "date": "2026-03-02",
+            "entries": [
+                {"food_id": self.apple.id, "serving_size": "2", "meal_type": "breakfast"},
+                {"food_id": self.yogurt.id, "serving_size": "1", "meal_type": "snack"},
+                {"food_id": self.apple.id, "serving_size": "1", "meal_type": "lunch", "date": "2026-03-01"},
+            ],
+        }
+        res = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data["created"], 3)
+        self.assertEqual([log["date"] for log in res.data["logs"]], ["2026-03-01", "2026-03-02"])
+        self.assertEqual(FoodLogEntry.objects.filter(daily_log__user=self.user).count(), 3)
+        log = DailyNutritionLog.objects.get(user=self.user, date="2026-03-02")
+        self.assertEqual(log.total_calories, Decimal("249.00"))
+
+    def test_unknown_food_rejects_whole_request(self):
+        from .models import FoodLogEntry
+
+        payload = {
+            "entries": [
+                {"food_id": self.apple.id, "serving_size": "1", "meal_type": "lunch"},
+                {"food_id": 987654, "serving_size": "1", "meal_type": "lunch"},
+            ],
+        }
+        res = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("food_id", res.data["entries"][1])
+        self.assertFalse(FoodLogEntry.objects.exists())
+
+    def test_requires_exactly_one_source(self):
+        res = self.client.post(self.url, {"date": "2026-03-02"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_apply_meal_plan(self):
+        from .models import DailyNutritionLog
+
+        plan = MealPlan.objects.create(
+            user=self.user,
+            meals=[
+                {"food_id": self.apple.id, "serving_size": 1.5, "meal_type": "breakfast"},
+                {"food_id": self.yogurt.id, "serving_size": 1.0, "meal_type": "meal"},
+            ],
+        )
+        # Independent of the plan's size: plan and items, then foods, the
+        # day's log, logging streak and rollups, one entry insert and one
+        # totals update, the quick foods lookup, insert, re-read and update,
+        # then the targets for the response's adherence
+        with self.assertNumQueries(34):
+            res = self.client.post(
+                self.url, {"date": "2026-03-02", "meal_plan_id": plan.id}, format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        log = DailyNutritionLog.objects.get(user=self.user, date="2026-03-02")
+        self.assertEqual(
+            list(log.entries.values_list("meal_type", "serving_size")),
+            [("breakfast", 1.5), ("snack", 1.0)],
+        )
+        self.assertAlmostEqual(float(log.total_calories), 95.0 * 1.5 + 59.0)
+
+    def test_other_users_meal_plan_is_rejected(self):
+        other = create_user(username="mallory", email="mallory@example.com")
+        plan = MealPlan.objects.create(
+            user=other, meals=[{"food_id": self.apple.id, "serving_size": 1.0}]
+        )
+        res = self.client.post(self.url, {"meal_plan_id": plan.id}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_log_recipe_multiplier(self):
+        from forum.models import Post, Recipe, RecipeIngredient
+        from .models import DailyNutritionLog
+
+        post = Post.objects.create(title="Bowl", body="Tasty", author=self.user)
+        recipe = Recipe.objects.create(post=post, instructions="Mix")
+        RecipeIngredient.objects.create(recipe=recipe, food=self.apple, amount=150)
+        RecipeIngredient.objects.create(recipe=recipe, food=self.yogurt, amount=50)
+
+        res = self.client.post(
+            self.url,
+            {"date": "2026-03-02", "recipe_id": recipe.id, "multiplier": 2, "meal_type": "dinner"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        log = DailyNutritionLog.objects.get(user=self.user, date="2026-03-02")
+        self.assertEqual(
+            sorted(log.entries.values_list("serving_size", "serving_unit")),
+            [(1.0, "serving"), (3.0, "serving")],
+        )
+        self.assertAlmostEqual(float(log.total_calories), 95.0 * 3 + 59.0)
+
+    def test_copy_previous_day(self):
+        from .models import DailyNutritionLog
+
+        self.client.post(
+            self.url,
+            {
+                "date": "2026-03-01",
+                "entries": [
+                    {"food_id": self.apple.id, "serving_size": "2", "meal_type": "breakfast"},
+                    {"food_id": self.yogurt.id, "serving_size": "1", "meal_type": "snack"},
+                ],
+            },
+            format="json",
+        )
+        res = self.client.post(
+            self.url, {"date": "2026-03-02", "copy_from": "2026-03-01"}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        first, second = DailyNutritionLog.objects.filter(user=self.user).order_by("date")
+        self.assertEqual(second.total_calories, first.total_calories)
+        self.assertEqual(second.entries.count(), 2)
+
+    def test_meal_plan_servings_are_rounded_and_bounded(self):
+        from decimal import Decimal
+        from .models import FoodLogEntry
+
+        plan = MealPlan.objects.create(
+            user=self.user,
+            meals=[
+                {"food_id": self.apple.id, "serving_size": 1.005, "meal_type": "breakfast"},
+                {"food_id": self.yogurt.id, "serving_size": 0.001, "meal_type": "lunch"},
+            ],
+        )
+        res = self.client.post(
+            self.url, {"date": "2026-03-02", "meal_plan_id": plan.id}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        # Rounds like the column; a serving that rounds to nothing is skipped
+        self.assertEqual(
+            list(FoodLogEntry.objects.values_list("food_id", "serving_size")),
+            [(self.apple.id, Decimal("1.01"))],
+        )
+
+        plan.meals = [{"food_id": self.apple.id, "serving_size": 10000, "meal_type": "lunch"}]
+        plan.save()
+        res = self.client.post(
+            self.url, {"date": "2026-03-03", "meal_plan_id": plan.id}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FoodLogEntry.objects.count(), 1)
+
+    def test_day_created_concurrently_is_counted_once(self):
+        from datetime import date
+        from unittest.mock import patch
+        from django.db import transaction
+        from .models import DailyNutritionLog, NutritionRollup
+        from .services import get_or_create_logs
+
+        day = date(2026, 3, 2)
+        bulk_create = DailyNutritionLog.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Another request creates the day between the lookup and insert
+            DailyNutritionLog.objects.create(user=self.user, date=day)
+            return bulk_create(objs, **kwargs)
+
+        with transaction.atomic(), patch.object(
+            DailyNutritionLog.objects, "bulk_create", side_effect=racing_bulk_create
+        ):
+            logs = get_or_create_logs(self.user, [day, date(2026, 3, 3)])
+
+        self.assertEqual(set(logs), {day, date(2026, 3, 3)})
+        rollup = NutritionRollup.objects.get(
+            user=self.user, period=NutritionRollup.WEEK
+        )
+        self.assertEqual(rollup.days_logged, 2)
+
+
+class LoggingStreakTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="streaker", email="streaker@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def log_days(self, *offsets):
+        from datetime import date, timedelta
+        from .models import DailyNutritionLog
+
+        today = date.today()
+        for offset in offsets:
+            DailyNutritionLog.objects.create(user=self.user, date=today - timedelta(days=offset))
+
+    def streak(self):
+        from .models import LoggingStreak
+
+        return LoggingStreak.objects.get(user=self.user)
+
+    def test_compute_streaks(self):
+        from datetime import date
+        from .models import compute_streaks
+
+        days = [date(2026, 1, d) for d in (1, 2, 3, 5, 6, 9)]
+        self.assertEqual(compute_streaks(days), (1, 3, date(2026, 1, 9)))
+        self.assertEqual(compute_streaks([]), (0, 0, None))
+
+    def test_streak_follows_new_logs(self):
+        self.log_days(5, 4, 3, 1, 0)
+        self.assertEqual((self.streak().current, self.streak().best), (2, 3))
+
+        # Backfilling the gap joins both islands
+        self.log_days(2)
+        self.assertEqual((self.streak().current, self.streak().best), (6, 6))
+
+    def test_deleting_a_day_rebuilds_streak(self):
+        from datetime import date, timedelta
+        from .models import DailyNutritionLog
+
+        self.log_days(3, 2, 1, 0)
+        DailyNutritionLog.objects.get(user=self.user, date=date.today() - timedelta(days=1)).delete()
+        self.assertEqual((self.streak().current, self.streak().best), (1, 2))
+
+    def test_statistics_streak_is_constant_time(self):
+        self.log_days(*range(60))
+        url = reverse("nutrition-statistics")
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["statistics"]["streak_days"], 60)
+        self.assertEqual(res.data["statistics"]["best_streak_days"], 60)
+
+    def test_statistics_streak_is_zero_without_today(self):
+        self.log_days(3, 2, 1)
+        res = self.client.get(reverse("nutrition-statistics"))
+        self.assertEqual(res.data["statistics"]["streak_days"], 0)
+        self.assertEqual(res.data["statistics"]["best_streak_days"], 3)
+
+
+class NutritionRollupTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="roller", email="roller@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.food = create_food(name="Oats", caloriesPerServing=100.0, proteinContent=10.0)
+
+    def log_food(self, day, serving_size="1"):
+        from datetime import date
+        from .models import DailyNutritionLog, FoodLogEntry
+
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        log, _ = DailyNutritionLog.objects.get_or_create(user=self.user, date=day)
+        return FoodLogEntry.objects.create(
+            daily_log=log, food=self.food, serving_size=serving_size, meal_type="breakfast"
+        )
+
+    def rollups(self):
+        from .models import NutritionRollup
+
+        return {
+            (r.period, str(r.period_start)): (r.days_logged, r.total_calories)
+            for r in NutritionRollup.objects.filter(user=self.user)
+        }
+
+    def assert_rollups_match_logs(self):
+        from .models import NutritionRollup
+
+        incremental = self.rollups()
+        NutritionRollup.rebuild(self.user.id)
+        rebuilt = self.rollups()
+        # Emptied periods linger with zero days until a rebuild drops them
+        self.assertEqual(
+            {k: v for k, v in incremental.items() if v[0]}, rebuilt
+        )
+
+    def test_rollups_follow_logs_and_entries(self):
+        from decimal import Decimal
+        from .models import DailyNutritionLog
+
+        # Sunday closes the ISO week starting 2026-09-28; Oct 1 opens a month
+        self.log_food("2026-09-28", "2")
+        entry = self.log_food("2026-10-01")
+        self.log_food("2026-10-04")
+        self.log_food("2026-10-05")
+
+        rollups = self.rollups()
+        self.assertEqual(rollups[("week", "2026-09-28")], (3, Decimal("400.00")))
+        self.assertEqual(rollups[("week", "2026-10-05")], (1, Decimal("100.00")))
+        self.assertEqual(rollups[("month", "2026-09-01")], (1, Decimal("200.00")))
+        self.assertEqual(rollups[("month", "2026-10-01")], (3, Decimal("300.00")))
+        self.assert_rollups_match_logs()
+
+        entry.serving_size = Decimal("3")
+        entry.save()
+        self.assertEqual(self.rollups()[("week", "2026-09-28")], (3, Decimal("600.00")))
+        self.assert_rollups_match_logs()
+
+        DailyNutritionLog.objects.get(user=self.user, date="2026-10-04").delete()
+        self.assertEqual(self.rollups()[("week", "2026-09-28")], (2, Decimal("500.00")))
+        self.assert_rollups_match_logs()
+
+    def test_bulk_logging_counts_new_days(self):
+        from decimal import Decimal
+
+        url = reverse("food-log-entry-bulk")
+        items = [
+            {"date": day, "food_id": self.food.id, "serving_size": 1, "meal_type": "lunch"}
+            for day in ("2026-10-05", "2026-10-06", "2026-10-06")
+        ]
+        res = self.client.post(url, {"entries": items}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.rollups()[("week", "2026-10-05")], (2, Decimal("300.00")))
+        self.assert_rollups_match_logs()
+
+    def test_history_by_week_reads_rollups(self):
+        from accounts.models import NutritionTargets
+
+        NutritionTargets.objects.create(
+            user=self.user, calories=200, protein=20, carbohydrates=100, fat=50
+        )
+        for day in ("2026-06-01", "2026-06-02", "2026-10-05"):
+            self.log_food(day)
+
+        url = reverse("daily-nutrition-history")
+        params = {"granularity": "week", "start_date": "2026-01-01", "end_date": "2026-10-11"}
+        with self.assertNumQueries(3):
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 2)
+        latest, earlier = res.data["results"]
+        self.assertEqual(latest["period_start"], "2026-10-05")
+        self.assertEqual(latest["period_end"], "2026-10-11")
+        self.assertEqual(earlier["days_logged"], 2)
+        self.assertEqual(earlier["averages"]["calories"], 100.0)
+        self.assertEqual(earlier["adherence"]["calories"], 50.0)
+        self.assertEqual(earlier["adherence"]["protein"], 50.0)
+
+    def test_statistics_all_time_uses_month_rollups(self):
+        from datetime import date, timedelta
+
+        today = date.today()
+        self.log_food(today, "2")
+        self.log_food(today - timedelta(days=400))
+
+        res = self.client.get(reverse("nutrition-statistics"), {"period": "all"})
+        self.assertEqual(res.data["statistics"]["days_logged"], 2)
+        self.assertEqual(res.data["statistics"]["avg_calories"], 150.0)
+        self.assertEqual(res.data["start_date"], (today - timedelta(days=400)).replace(day=1))
+        # No targets set: no adherence, rather than an error
+        self.assertIsNone(res.data["statistics"]["adherence"])
+
+        res = self.client.get(reverse("nutrition-statistics"), {"period": "year"})
+        self.assertEqual(res.data["statistics"]["days_logged"], 1)
+        self.assertEqual(res.data["statistics"]["avg_calories"], 200.0)
+
+
+class MealPlanGeneratorTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="planner", email="planner@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("meal-plan-generate")
+
+        self.chicken = create_food(name="Chicken", category="Meat", nutritionScore=70.0)
+        self.rice = create_food(
+            name="Rice", category="Grain", caloriesPerServing=130.0,
+            proteinContent=2.7, fatContent=0.3, carbohydrateContent=28.0,
+        )
+        self.oil = create_food(
+            name="Olive Oil", category="Fat", caloriesPerServing=120.0,
+            proteinContent=0.0, fatContent=14.0, carbohydrateContent=0.0,
+        )
+        self.peanuts = create_food(
+            name="Peanuts", category="Snack", caloriesPerServing=567.0,
+            proteinContent=25.8, fatContent=49.2, carbohydrateContent=16.1,
+            nutritionScore=95.0,
+        )
+
+    def test_optimizer_meets_targets(self):
+        import numpy as np
+        from .generator import optimize
+
+        rng = np.random.default_rng(0)
+        protein, carbs, fat = rng.uniform(0, 30, (3, 100_000))
+        macros = np.column_stack([4 * protein + 4 * carbs + 9 * fat, protein, carbs, fat])
+        target = np.array([2200.0, 165.0, 220.0, 73.0])
+
+        picks = optimize(macros, rng.uniform(0, 100, 100_000), target, tolerance=0.05)
+
+        achieved = sum(serving * macros[row] for row, serving in picks)
+        self.assertTrue(np.all(np.abs(achieved - target) <= 0.05 * target), achieved)
+        self.assertEqual(len({row for row, _ in picks}), len(picks))
+
+    def test_generates_plan_within_tolerance(self):
+        from accounts.models import Allergen as UserAllergen, NutritionTargets
+        from foods.models import Allergen
+
+        NutritionTargets.objects.create(
+            user=self.user, calories=1500, protein=110, carbohydrates=150, fat=50
+        )
+        self.peanuts.allergens.add(Allergen.objects.create(name="Peanuts"))
+        self.user.allergens.add(UserAllergen.objects.create(name="peanuts"))
+
+        res = self.client.post(self.url, {"name": "Cut"}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data["name"], "Cut")
+        food_ids = {meal["food_id"] for meal in res.data["meals"]}
+        self.assertNotIn(self.peanuts.id, food_ids)
+        self.assertTrue(all(res.data["generation"]["within_tolerance"].values()), res.data)
+        plan = MealPlan.objects.get(pk=res.data["id"])
+        self.assertAlmostEqual(plan.total_calories, res.data["generation"]["achieved"]["calories"], places=1)
+
+    def test_calorie_goal_and_categories(self):
+        res = self.client.post(
+            self.url, {"calories": 2000, "categories": ["meat", "grain"]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data["generation"]["targets"]["protein"], 150.0)
+        self.assertLessEqual(
+            {meal["food"]["category"] for meal in res.data["meals_details"]},
+            {"Meat", "Grain"},
+        )
+
+    def test_requires_targets(self):
+        res = self.client.post(self.url, {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(self.url, {"calories": 2000, "categories": ["candy"]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NutritionLogExportTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="exporter", email="exporter@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("daily-nutrition-export")
+        self.food = create_food(name="Lentils", caloriesPerServing=116.0)
+
+    def log_days(self, count):
+        from datetime import date, timedelta
+        from .models import DailyNutritionLog, FoodLogEntry
+
+        start = date(2024, 1, 1)
+        for offset in range(count):
+            log = DailyNutritionLog.objects.create(
+                user=self.user, date=start + timedelta(days=offset)
+            )
+            FoodLogEntry.objects.create(
+                daily_log=log, food=self.food, serving_size="1", meal_type="lunch"
+            )
+
+    def read(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content).decode()
+
+    def test_csv_days_span_the_whole_history(self):
+        import csv
+        import io
+
+        self.log_days(5)
+        other = create_user(username="other", email="other@example.com")
+        from .models import DailyNutritionLog
+        DailyNutritionLog.objects.create(user=other, date="2024-01-02")
+
+        rows = list(csv.reader(io.StringIO(self.read(self.client.get(self.url)))))
+
+        self.assertEqual(rows[0][:2], ["date", "total_calories"])
+        self.assertEqual([row[0] for row in rows[1:]], [f"2024-01-0{d}" for d in range(1, 6)])
+        self.assertEqual(rows[1][1], "116.00")
+
+    def test_ndjson_entries_are_read_in_batches(self):
+        import json
+        from unittest.mock import patch
+
+        self.log_days(7)
+        params = {"type": "ndjson", "level": "entries", "start_date": "2024-01-02"}
+
+        with patch("meal_planner.export.EXPORT_BATCH_SIZE", 3):
+            res = self.client.get(self.url, params)
+            # Days and their entries for each batch of 3, then the empty batch
+            with self.assertNumQueries(5):
+                body = self.read(res)
+
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[0]["date"], "2024-01-02")
+        self.assertEqual(lines[0]["food_name"], "Lentils")
+        self.assertEqual(lines[0]["calories"], "116.00")
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"type": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"level": "weeks"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(self.url, {"start_date": "01/02/2024"}).status_code, 400
+        )
+
+
+class EmptyDailyLogTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="browser", email="browser@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.food = create_food(name="Apple", caloriesPerServing=52.0)
+
+    def test_get_returns_unsaved_empty_log(self):
+        from .models import DailyNutritionLog
+
+        res = self.client.get(reverse("daily-nutrition-log"), {"date": "2026-03-01"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["date"], "2026-03-01")
+        self.assertEqual(float(res.data["total_calories"]), 0)
+        self.assertEqual(res.data["entries"], [])
+        self.assertFalse(DailyNutritionLog.objects.filter(user=self.user).exists())
+
+    def test_first_entry_creates_the_log(self):
+        from .models import DailyNutritionLog, FoodLogEntry
+
+        log = DailyNutritionLog.objects.create(user=self.user, date="2026-03-02")
+        FoodLogEntry.objects.create(
+            daily_log=log, food=self.food, serving_size=2, meal_type="snack"
+        )
+
+        res = self.client.get(reverse("daily-nutrition-log"), {"date": "2026-03-02"})
+
+        self.assertEqual(len(res.data["entries"]), 1)
+        self.assertEqual(res.data["entries"][0]["food_name"], "Apple")
+        self.assertEqual(float(res.data["total_calories"]), 104)
+
+    def test_cleanup_deletes_old_empty_logs_in_batches(self):
+        from datetime import date, timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import DailyNutritionLog, FoodLogEntry, LoggingStreak, NutritionRollup
+
+        today = date.today()
+        for offset in range(4):
+            DailyNutritionLog.objects.create(user=self.user, date=today - timedelta(days=offset))
+        kept = DailyNutritionLog.objects.get(user=self.user, date=today - timedelta(days=2))
+        FoodLogEntry.objects.create(
+            daily_log=kept, food=self.food, serving_size=1, meal_type="lunch"
+        )
+        DailyNutritionLog.objects.exclude(date=today).update(
+            updated_at=timezone.now() - timedelta(days=3)
+        )
+
+        out = StringIO()
+        call_command("delete_empty_daily_logs", "--dry-run", "--batch-size", "1", stdout=out)
+        self.assertIn("would have deleted 2 empty", out.getvalue())
+        self.assertEqual(DailyNutritionLog.objects.filter(user=self.user).count(), 4)
+
+        out = StringIO()
+        call_command("delete_empty_daily_logs", "--batch-size", "1", stdout=out)
+        self.assertIn("Deleted 2 empty", out.getvalue())
+
+        # Today's log is too recent; the one with an entry isn't empty
+        self.assertEqual(
+            set(DailyNutritionLog.objects.filter(user=self.user).values_list("date", flat=True)),
+            {today, today - timedelta(days=2)},
+        )
+        streak = LoggingStreak.objects.get(user=self.user)
+        self.assertEqual((streak.current, streak.best), (1, 1))
+        self.assertEqual(
+            sum(
+                NutritionRollup.objects.filter(user=self.user, period="month")
+                .values_list("days_logged", flat=True)
+            ),
+            2,
+        )
+
+
+class NutritionAdherenceTests(APITestCase):
+    def setUp(self):
+        from accounts.models import NutritionTargets
+
+        self.user = create_user(username="adherer", email="adherer@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        NutritionTargets.objects.create(
+            user=self.user, calories=2000, protein=100, carbohydrates=250, fat=0
+        )
+
+    def log_days(self, count, start=0):
+        from datetime import date, timedelta
+        from .models import DailyNutritionLog
+
+        for offset in range(start, start + count):
+            DailyNutritionLog.objects.create(
+                user=self.user,
+                date=date.today() - timedelta(days=offset),
+                total_calories=500 + 10 * offset,
+                total_protein=50,
+            )
+
+    def test_history_adherence_costs_no_queries_per_row(self):
+        url = reverse("daily-nutrition-history")
+        self.log_days(2)
+        # Targets, page count, logs
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        self.log_days(5, start=2)
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        today = res.data["results"][0]
+        self.assertEqual(
+            today["adherence"],
+            {"calories": 25.0, "protein": 50.0, "carbohydrates": 0.0, "fat": 0.0},
+        )
+        self.assertEqual(res.data["results"][1]["adherence"]["calories"], 25.5)
+
+    def test_history_adherence_is_null_without_targets(self):
+        from accounts.models import NutritionTargets
+
+        NutritionTargets.objects.filter(user=self.user).delete()
+        self.log_days(1)
+        res = self.client.get(reverse("daily-nutrition-history"))
+        self.assertIsNone(res.data["results"][0]["adherence"])
+
+    def test_detail_loads_targets_once(self):
+        self.log_days(1)
+        url = reverse("daily-nutrition-log")
+        # Log, its entries, targets
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.data["targets"]["calories"], 2000.0)
+        self.assertEqual(res.data["adherence"]["protein"], 50.0)
+
+
+class QuickFoodTests(APITestCase):
+    def setUp(self):
+        self.user = create_user(username="regular", email="regular@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("quick-foods")
+        self.oats = create_food(name="Oats", caloriesPerServing=150.0)
+        self.banana = create_food(name="Banana", caloriesPerServing=105.0)
+
+    def log(self, food, serving_size="1", meal_type="breakfast"):
+        res = self.client.post(
+            reverse("food-log-entry-list"),
+            {"food_id": food.id, "serving_size": serving_size, "meal_type": meal_type},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res.data["id"]
+
+    def test_position_counts_half_lives(self):
+        from datetime import timedelta
+        from .models import QuickFood
+
+        later = QuickFood.EPOCH + timedelta(days=QuickFood.HALF_LIFE_DAYS)
+        self.assertEqual(QuickFood.position(QuickFood.EPOCH), 0.0)
+        self.assertAlmostEqual(QuickFood.position(later), 1.0)
+
+    def test_scores_stay_exact_far_from_epoch(self):
+        from datetime import timedelta
+        from .models import FoodLogEntry, QuickFood
+
+        # A century of half-lives would overflow linear-space scores
+        now = QuickFood.EPOCH + timedelta(days=365 * 100)
+        entries = [
+            FoodLogEntry(food=self.oats, serving_size=1, meal_type="snack", logged_at=now)
+            for _ in range(3)
+        ]
+        QuickFood.record(self.user.id, entries[:2])
+        QuickFood.record(self.user.id, entries[2:])
+        QuickFood.forget(self.user.id, [{"food_id": self.oats.id, "logged_at": now}] * 2)
+
+        oats = QuickFood.objects.get(user=self.user, food=self.oats)
+        self.assertEqual(oats.log_count, 1)
+        self.assertAlmostEqual(oats.frequency(now), 1.0, places=9)
+
+    def test_concurrent_first_log_keeps_both_counts(self):
+        from unittest.mock import patch
+        from django.utils import timezone
+        from .models import FoodLogEntry, QuickFood
+
+        now = timezone.now()
+        create = QuickFood.objects.bulk_create
+
+        def first_log_elsewhere(*args, **kwargs):
+            # Another request logs the food between our read and our insert
+            QuickFood.objects.create(
+                user=self.user, food=self.oats, score=QuickFood.position(now),
+                log_count=1, last_logged_at=now, meal_type="lunch",
+            )
+            return create(*args, **kwargs)
+
+        entry = FoodLogEntry(food=self.oats, serving_size=2, meal_type="dinner", logged_at=now)
+        with patch.object(QuickFood.objects, "bulk_create", side_effect=first_log_elsewhere):
+            QuickFood.record(self.user.id, [entry])
+
+        oats = QuickFood.objects.get(user=self.user, food=self.oats)
+        self.assertEqual(oats.log_count, 2)
+        self.assertAlmostEqual(oats.frequency(now), 2.0, places=6)
+        self.assertEqual(oats.meal_type, "dinner")
+
+    def test_logging_ranks_foods_in_one_query(self):
+        self.log(self.banana)
+        self.log(self.oats, "0.5")
+        self.client.post(
+            reverse("food-log-entry-bulk"),
+            {"entries": [
+                {"food_id": self.oats.id, "serving_size": "2", "meal_type": "lunch"},
+                {"food_id": self.oats.id, "serving_size": "1.5", "meal_type": "dinner"},
+            ]},
+            format="json",
+        )
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([food["food_name"] for food in res.data], ["Oats", "Banana"])
+        oats = res.data[0]
+        self.assertEqual(oats["log_count"], 3)
+        self.assertAlmostEqual(oats["frequency"], 3.0, places=1)
+        self.assertEqual(oats["serving_size"], "1.50")
+        self.assertEqual(oats["meal_type"], "dinner")
+        self.assertEqual(oats["calories_per_serving"], 150.0)
+
+        res = self.client.get(self.url, {"sort": "recent", "limit": 1})
+        self.assertEqual([food["food_name"] for food in res.data], ["Oats"])
+
+    def test_older_logs_count_for_less(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import FoodLogEntry, QuickFood
+
+        now = timezone.now()
+        old = [
+            FoodLogEntry(food=self.banana, serving_size=1, meal_type="snack", logged_at=now - timedelta(days=56))
+            for _ in range(8)
+        ]
+        QuickFood.record(self.user.id, old)
+        self.log(self.oats)
+        self.log(self.oats)
+
+        res = self.client.get(self.url)
+        # Eight logs four half-lives ago weigh about half a log each today
+        self.assertEqual([food["food_name"] for food in res.data], ["Oats", "Banana"])
+        self.assertAlmostEqual(res.data[1]["frequency"], 0.5, places=2)
+
+    def test_deleting_entries_takes_them_back_out(self):
+        from .models import FoodLogEntry, QuickFood
+
+        first = self.log(self.oats)
+        self.log(self.oats)
+        self.log(self.banana)
+
+        self.client.delete(reverse("food-log-entry-detail", args=[first]))
+        oats = QuickFood.objects.get(user=self.user, food=self.oats)
+        self.assertEqual(oats.log_count, 1)
+        self.assertAlmostEqual(oats.frequency(), 1.0, places=2)
+
+        FoodLogEntry.objects.filter(daily_log__user=self.user).delete()
+        self.assertFalse(QuickFood.objects.filter(user=self.user).exists())
+
+    def test_deleting_latest_entry_restores_previous_serving(self):
+        from .models import FoodLogEntry, QuickFood
+
+        first = self.log(self.oats, "0.5", "breakfast")
+        latest = self.log(self.oats, "2", "lunch")
+
+        self.client.delete(reverse("food-log-entry-detail", args=[latest]))
+        oats = QuickFood.objects.get(user=self.user, food=self.oats)
+        self.assertEqual(str(oats.serving_size), "0.50")
+        self.assertEqual(oats.meal_type, "breakfast")
+        self.assertEqual(oats.last_logged_at, FoodLogEntry.objects.get(id=first).logged_at)
+
+    def test_deleting_daily_logs_forgets_their_entries(self):
+        from .models import DailyNutritionLog, QuickFood
+
+        self.log(self.oats)
+        self.log(self.banana)
+        DailyNutritionLog.objects.get(user=self.user).delete()
+        self.assertFalse(QuickFood.objects.filter(user=self.user).exists())
+
+        self.log(self.oats)
+        DailyNutritionLog.objects.filter(user=self.user).delete()
+        self.assertFalse(QuickFood.objects.filter(user=self.user).exists())
@@ -4,12 +4,15 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     MealPlanListCreateView,
     MealPlanDetailView,
+    MealPlanGenerateView,
     set_current_meal_plan,
     get_current_meal_plan,
     DailyNutritionLogView,
     DailyNutritionHistoryView,
+    NutritionLogExportView,
     FoodLogEntryViewSet,
     NutritionStatisticsView,
+    QuickFoodsView,
 )
 
 # Router for FoodLogEntryViewSet
@@ -20,13 +23,16 @@ urlpatterns = [
     # Meal plan endpoints
     path('', MealPlanListCreateView.as_view(), name='meal-plan-list-create'),
     path('current/', get_current_meal_plan, name='get-current-meal-plan'),
+    path('generate/', MealPlanGenerateView.as_view(), name='meal-plan-generate'),
     path('<int:pk>/', MealPlanDetailView.as_view(), name='meal-plan-detail'),
     path('<int:meal_plan_id>/set-current/', set_current_meal_plan, name='set-current-meal-plan'),
     
     # Daily nutrition logging endpoints
     path('daily-log/', DailyNutritionLogView.as_view(), name='daily-nutrition-log'),
     path('daily-log/history/', DailyNutritionHistoryView.as_view(), name='daily-nutrition-history'),
+    path('daily-log/export/', NutritionLogExportView.as_view(), name='daily-nutrition-export'),
     path('nutrition-statistics/', NutritionStatisticsView.as_view(), name='nutrition-statistics'),
+    path('quick-foods/', QuickFoodsView.as_view(), name='quick-foods'),
     
     # Include router URLs for food log entries
     path('', include(router.urls)),
@@ -1,19 +1,33 @@
 from rest_framework import generics, status, viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from datetime import datetime, timedelta, date
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Min, Prefetch, Sum
 
-from .models import MealPlan, DailyNutritionLog, FoodLogEntry
+from accounts.models import NutritionTargets
+from project.utils.nutrients import NutrientVector
+from .models import (
+    MealPlan, DailyNutritionLog, FoodLogEntry, LoggingStreak, NutritionRollup,
+    QuickFood, compute_streaks, period_start,
+)
+from . import export
+from .generator import GenerationError, generate_meal_plan
+from .services import bulk_log_entries
 from .serializers import (
+    BulkFoodLogSerializer,
     MealPlanSerializer, 
     MealPlanCreateSerializer,
+    MealPlanGenerateSerializer,
     DailyNutritionLogSerializer,
     DailyNutritionLogListSerializer,
     FoodLogEntrySerializer,
+    NutritionRollupSerializer,
+    QuickFoodSerializer,
 )
 
 
@@ -22,7 +36,7 @@ class MealPlanListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return MealPlan.objects.filter(user=self.request.user)
+        return MealPlan.objects.filter(user=self.request.user).with_items()
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -39,7 +53,7 @@ class MealPlanDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MealPlanSerializer
     
     def get_queryset(self):
-        return MealPlan.objects.filter(user=self.request.user)
+        return MealPlan.objects.filter(user=self.request.user).with_items()
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -47,13 +61,35 @@ class MealPlanDetailView(generics.RetrieveUpdateDestroyAPIView):
         return MealPlanSerializer
 
 
+class MealPlanGenerateView(APIView):
+    """
+    POST /api/meal-planner/generate/
+    Build a meal plan that meets the user's nutrition targets.
+    Body (all optional): name, categories, calories, tolerance
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = MealPlanGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            plan, report = generate_meal_plan(request.user, **serializer.validated_data)
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        plan = MealPlan.objects.with_items().get(pk=plan.pk)
+        data = MealPlanSerializer(plan).data
+        data['generation'] = report
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def set_current_meal_plan(request, meal_plan_id):
     """Set a meal plan as the user's current meal plan"""
     try:
         meal_plan = get_object_or_404(
-            MealPlan, 
+            MealPlan.objects.with_items(),
             id=meal_plan_id, 
             user=request.user
         )
@@ -89,7 +125,8 @@ def get_current_meal_plan(request):
             'message': 'No current meal plan set'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    serializer = MealPlanSerializer(request.user.current_meal_plan)
+    meal_plan = MealPlan.objects.with_items().get(pk=request.user.current_meal_plan_id)
+    serializer = MealPlanSerializer(meal_plan)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -97,7 +134,8 @@ class DailyNutritionLogView(APIView):
     """
     GET /api/meal-planner/daily-log/?date=YYYY-MM-DD
     Get nutrition log for a specific date (defaults to today).
-    Creates empty log if it doesn't exist.
+    Returns an empty log without saving it if none exists; the row is
+    created by the first entry logged for that date.
     """
     permission_classes = [IsAuthenticated]
 
@@ -115,11 +153,16 @@ class DailyNutritionLogView(APIView):
         else:
             log_date = date.today()
         
-        # Get or create daily log
-        daily_log, created = DailyNutritionLog.objects.get_or_create(
-            user=request.user,
-            date=log_date
+        daily_log = (
+            DailyNutritionLog.objects.filter(user=request.user, date=log_date)
+            .prefetch_related(
+                Prefetch('entries', queryset=FoodLogEntry.objects.select_related('food'))
+            )
+            .first()
         )
+        if daily_log is None:
+            # Browsing a day shouldn't write; unsaved, so it serializes as empty
+            daily_log = DailyNutritionLog(user=request.user, date=log_date)
         
         serializer = DailyNutritionLogSerializer(daily_log)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -130,12 +173,45 @@ class DailyNutritionHistoryView(generics.ListAPIView):
     GET /api/meal-planner/daily-log/history/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
     Get nutrition logs for a date range (max 90 days).
     Defaults: start_date = 7 days ago, end_date = today
+    Each day includes its macro adherence to the user's current targets.
+
+    With ?granularity=week|month, returns weekly or monthly rollups instead
+    (max 10 years). Defaults: start_date = 12 weeks / 12 months ago
     """
     permission_classes = [IsAuthenticated]
     serializer_class = DailyNutritionLogListSerializer
 
+    MAX_DAYS = 90
+    MAX_ROLLUP_DAYS = 3660
+    DEFAULT_ROLLUP_DAYS = {
+        NutritionRollup.WEEK: 7 * 12,
+        NutritionRollup.MONTH: 365,
+    }
+
+    def get_granularity(self):
+        granularity = self.request.query_params.get('granularity')
+        if granularity in self.DEFAULT_ROLLUP_DAYS:
+            return granularity
+        return None
+
+    def get_serializer_class(self):
+        if self.get_granularity():
+            return NutritionRollupSerializer
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        # Loaded once for the page; every row's adherence is computed from it
+        context = super().get_serializer_context()
+        context['targets'] = NutritionTargets.objects.filter(
+            user=self.request.user
+        ).first()
+        return context
+
     def get_queryset(self):
         user = self.request.user
+        granularity = self.get_granularity()
+        default_days = self.DEFAULT_ROLLUP_DAYS.get(granularity, 7)
+        max_days = self.MAX_ROLLUP_DAYS if granularity else self.MAX_DAYS
         
         # Parse dates from query params
         start_date_str = self.request.query_params.get('start_date')
@@ -151,16 +227,26 @@ class DailyNutritionHistoryView(generics.ListAPIView):
                 end_date = date.today()
         
         if not start_date_str:
-            start_date = end_date - timedelta(days=7)
+            start_date = end_date - timedelta(days=default_days)
         else:
             try:
                 start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             except ValueError:
-                start_date = end_date - timedelta(days=7)
+                start_date = end_date - timedelta(days=default_days)
+        
+        # Validate date range
+        if (end_date - start_date).days > max_days:
+            start_date = end_date - timedelta(days=max_days)
         
-        # Validate date range (max 90 days)
-        if (end_date - start_date).days > 90:
-            start_date = end_date - timedelta(days=90)
+        if granularity:
+            # Periods overlapping the range
+            return NutritionRollup.objects.filter(
+                user=user,
+                period=granularity,
+                period_start__gte=period_start(granularity, start_date),
+                period_start__lte=end_date,
+                days_logged__gt=0,
+            ).order_by('-period_start')
         
         return DailyNutritionLog.objects.filter(
             user=user,
@@ -169,11 +255,59 @@ class DailyNutritionHistoryView(generics.ListAPIView):
         ).order_by('-date')
 
 
+class NutritionLogExportView(APIView):
+    """
+    GET /api/meal-planner/daily-log/export/?type=csv|ndjson&level=days|entries
+        &start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    Stream the user's nutrition logs as a file download. Without dates the
+    whole history is exported; there is no range cap.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # "format" is reserved by DRF for renderer selection
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in export.FORMATS:
+            return Response(
+                {'error': "type must be 'csv' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        level = request.query_params.get('level', 'days')
+        if level not in export.LEVELS:
+            return Response(
+                {'error': "level must be 'days' or 'entries'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bounds = {}
+        for param in ('start_date', 'end_date'):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                bounds[param] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid date format. Use YYYY-MM-DD.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        response = StreamingHttpResponse(
+            export.export_lines(request.user, fmt, level, **bounds),
+            content_type=export.FORMATS[fmt],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="nutrition-{level}.{fmt}"'
+        )
+        return response
+
+
 class FoodLogEntryViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing food log entries.
     
     POST /api/meal-planner/daily-log/entries/
+    POST /api/meal-planner/daily-log/entries/bulk/
     PUT /api/meal-planner/daily-log/entries/{id}/
     DELETE /api/meal-planner/daily-log/entries/{id}/
     """
@@ -213,6 +347,33 @@ class FoodLogEntryViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Log many foods in one transaction. The body holds an optional "date"
+        (defaults to today) and exactly one of:
+        - "entries": [{food_id, serving_size, meal_type, serving_unit?, date?}]
+        - "meal_plan_id": log every item of one of the user's meal plans
+          ("meal_type" optionally overrides the plan's meal names)
+        - "recipe_id" with "meal_type" and "multiplier": log a forum recipe's
+          ingredients, scaled by how many whole recipes were eaten (default 1)
+        - "copy_from": repeat every entry of another day
+        """
+        serializer = BulkFoodLogSerializer(
+            data=request.data, context={'request': request}
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data['items']
+        logs = bulk_log_entries(request.user, items)
+        return Response({
+            'created': len(items),
+            'logs': DailyNutritionLogListSerializer(
+                [logs[day] for day in sorted(logs)], many=True
+            ).data,
+        }, status=status.HTTP_201_CREATED)
+
     def update(self, request, pk=None):
         """Update an existing food log entry."""
         try:
@@ -258,10 +419,58 @@ class FoodLogEntryViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class QuickFoodsView(generics.ListAPIView):
+    """
+    GET /api/meal-planner/quick-foods/?sort=frequent|recent&limit=N
+    Foods the user logs most often (decayed, so recent habits rank first)
+    or most recently, with the serving they last used. Default sort is
+    frequent; limit defaults to 20, max 50. Served from QuickFood in one
+    query on its (user, score) or (user, last_logged_at) index.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = QuickFoodSerializer
+    pagination_class = None
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+    ORDERING = {
+        'frequent': '-score',
+        'recent': '-last_logged_at',
+    }
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['now'] = timezone.now()
+        return context
+
+    def get_queryset(self):
+        ordering = self.ORDERING.get(
+            self.request.query_params.get('sort'), self.ORDERING['frequent']
+        )
+        try:
+            limit = int(self.request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        return (
+            QuickFood.objects.filter(user=self.request.user)
+            .select_related('food')
+            .only(
+                'food_id', 'score', 'log_count', 'last_logged_at', 'serving_size',
+                'serving_unit', 'meal_type', 'food__name', 'food__imageUrl',
+                'food__caloriesPerServing',
+            )
+            .order_by(ordering)[:limit]
+        )
+
+
 class NutritionStatisticsView(APIView):
     """
-    GET /api/meal-planner/nutrition-statistics/?period=week|month
+    GET /api/meal-planner/nutrition-statistics/?period=week|month|year|all
     Get nutrition statistics for a period.
+    week and month are rolling windows over the daily logs; year (the last
+    12 calendar months) and all are read from the monthly rollups.
     """
     permission_classes = [IsAuthenticated]
 
@@ -270,49 +479,56 @@ class NutritionStatisticsView(APIView):
         
         # Determine date range
         end_date = date.today()
-        if period == 'month':
-            start_date = end_date - timedelta(days=30)
-        else:  # default to week
-            start_date = end_date - timedelta(days=7)
-        
-        # Get logs for the period
-        logs = DailyNutritionLog.objects.filter(
-            user=request.user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # Calculate statistics
-        stats = logs.aggregate(
-            avg_calories=Avg('total_calories'),
-            avg_protein=Avg('total_protein'),
-            avg_carbohydrates=Avg('total_carbohydrates'),
-            avg_fat=Avg('total_fat'),
-            days_logged=Count('id')
-        )
+        if period in ('year', 'all'):
+            stats, start_date = self.rollup_statistics(request.user, period, end_date)
+        else:
+            if period == 'month':
+                start_date = end_date - timedelta(days=30)
+            else:  # default to week
+                start_date = end_date - timedelta(days=7)
+            
+            # Get logs for the period
+            logs = DailyNutritionLog.objects.filter(
+                user=request.user,
+                date__gte=start_date,
+                date__lte=end_date
+            )
+            
+            # Calculate statistics
+            stats = logs.aggregate(
+                avg_calories=Avg('total_calories'),
+                avg_protein=Avg('total_protein'),
+                avg_carbohydrates=Avg('total_carbohydrates'),
+                avg_fat=Avg('total_fat'),
+                days_logged=Count('id')
+            )
         
-        # Calculate streak (consecutive days logged)
-        streak = 0
-        check_date = end_date
-        while True:
-            if DailyNutritionLog.objects.filter(user=request.user, date=check_date).exists():
-                streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+        # Streak of consecutive logged days, kept on LoggingStreak
+        streak_row = LoggingStreak.objects.filter(user=request.user).first()
+        if streak_row is None:
+            streak_row = LoggingStreak.rebuild(request.user.id)
+        streak = streak_row.current_as_of(end_date)
+        if streak is None:
+            # Days after today are logged too; derive the streak ending today
+            dates = DailyNutritionLog.objects.filter(
+                user=request.user, date__lte=end_date
+            ).order_by('date').values_list('date', flat=True)
+            current, _, last_date = compute_streaks(dates)
+            streak = current if last_date == end_date else 0
         
         # Calculate adherence if user has targets
         adherence = None
         try:
-            targets = request.user.nutrition_targets
+            targets = NutrientVector.from_targets(request.user.nutrition_targets)
             if stats['avg_calories']:
-                adherence = {
-                    'calories': round((stats['avg_calories'] / float(targets.calories)) * 100, 1),
-                    'protein': round((stats['avg_protein'] / float(targets.protein)) * 100, 1) if stats['avg_protein'] else 0,
-                    'carbohydrates': round((stats['avg_carbohydrates'] / float(targets.carbohydrates)) * 100, 1) if stats['avg_carbohydrates'] else 0,
-                    'fat': round((stats['avg_fat'] / float(targets.fat)) * 100, 1) if stats['avg_fat'] else 0,
-                }
-        except:
+                averages = NutrientVector.from_values(
+                    calories=stats['avg_calories'],
+                    protein=stats['avg_protein'],
+                    carbohydrates=stats['avg_carbohydrates'],
+                    fat=stats['avg_fat'],
+                )
+                adherence = averages.percent_of(targets).macros()
+        except NutritionTargets.DoesNotExist:
             pass
         
         return Response({
@@ -326,6 +542,32 @@ class NutritionStatisticsView(APIView):
                 'avg_fat': round(stats['avg_fat'], 1) if stats['avg_fat'] else 0,
                 'days_logged': stats['days_logged'],
                 'streak_days': streak,
+                'best_streak_days': streak_row.best,
                 'adherence': adherence,
             }
         }, status=status.HTTP_200_OK)
+
+    def rollup_statistics(self, user, period, end_date):
+        """Average daily intake over the monthly rollups, and the first day covered."""
+        rollups = NutritionRollup.objects.filter(
+            user=user, period=NutritionRollup.MONTH, period_start__lte=end_date
+        )
+        if period == 'year':
+            first_month = period_start(NutritionRollup.MONTH, end_date - timedelta(days=334))
+            rollups = rollups.filter(period_start__gte=first_month)
+        totals = rollups.aggregate(
+            first_month=Min('period_start'),
+            days_logged=Sum('days_logged'),
+            calories=Sum('total_calories'),
+            protein=Sum('total_protein'),
+            carbohydrates=Sum('total_carbohydrates'),
+            fat=Sum('total_fat'),
+        )
+        days_logged = totals['days_logged'] or 0
+        stats = {'days_logged': days_logged}
+        for nutrient in ('calories', 'protein', 'carbohydrates', 'fat'):
+            stats[f'avg_{nutrient}'] = (
+                float(totals[nutrient]) / days_logged if days_logged else None
+            )
+        start_date = totals['first_month'] or period_start(NutritionRollup.MONTH, end_date)
+        return stats, start_date
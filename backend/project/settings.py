@@ -224,6 +224,31 @@ CRON_STATS_TOKEN = os.environ.get("CRON_STATS_TOKEN", "")
 GCP_PROJECT_ID = os.environ.get("GCP_PROJECT_ID", "")
 GCS_MEDIA_BUCKET = os.environ.get("GCS_MEDIA_BUCKET", "")  # For profile/certificate pictures
 GCS_IMAGE_CACHE_BUCKET = os.environ.get("GCS_IMAGE_CACHE_BUCKET", "")  # For food image caching
+# Food import uploads waiting for the run_import_jobs runner; MEDIA_ROOT when unset
+FOOD_IMPORT_BUCKET = os.environ.get("FOOD_IMPORT_BUCKET", GCS_MEDIA_BUCKET)
 PUBSUB_IMAGE_CACHE_TOPIC = os.environ.get("PUBSUB_IMAGE_CACHE_TOPIC", "image-cache-requests")
 PUBSUB_BADGE_CALC_TOPIC = os.environ.get("PUBSUB_BADGE_CALC_TOPIC", "badge-calculation-requests")
 PUBSUB_LOGIN_EMAIL_TOPIC = os.environ.get("PUBSUB_LOGIN_EMAIL_TOPIC", "login-email-notifications")
+
+# Cache backend; also holds third-party API responses and the fill/refresh
+# locks that coalesce upstream calls (project/utils/response_cache.py). Those
+# are only shared between gunicorn workers and pods through Redis, so set
+# REDIS_URL wherever more than one process serves traffic. Without it each
+# process gets a private in-memory cache (local development and tests).
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "nutrihub",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "nutrihub-default",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
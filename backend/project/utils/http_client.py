@@ -0,0 +1,196 @@
+"""
+Shared outbound HTTP client for third-party integrations.
+
+Every call to an external API (FatSecret, DeepL, Wikidata, TheMealDB,
+Open Food Facts, Foodish) goes through this module so that:
+- connections are reused through one keep-alive pool per host,
+- every request has a connect/read timeout,
+- idempotent requests are retried a bounded number of times with
+  jittered exponential backoff,
+- latency and error counts are recorded per integration,
+- calls run under the integration's bulkhead and circuit breaker
+  (see project/utils/resilience.py).
+
+This module doesn't depend on Django, so the offline scripts under
+api/db_initialization can use it as well.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from project.utils import resilience
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Retries after the first attempt, only for idempotent methods
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.2  # seconds, doubled on every attempt
+BACKOFF_MAX = 2.0
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Keep-alive connections kept per host
+POOL_MAXSIZE = 10
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = defaultdict(
+    lambda: {
+        "requests": 0,
+        "errors": 0,
+        "retries": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    }
+)
+
+
+def _get_session(url):
+    """Return the pooled session for the URL's scheme and host."""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _record(integration, elapsed_ms, error=False, retry=False):
+    with _metrics_lock:
+        metrics = _metrics[integration]
+        metrics["requests"] += 1
+        metrics["total_ms"] += elapsed_ms
+        metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+        if error:
+            metrics["errors"] += 1
+        if retry:
+            metrics["retries"] += 1
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, upper in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                bucket = i
+                break
+        metrics["latency_buckets"][bucket] += 1
+
+
+def get_metrics():
+    """
+    Return a snapshot of per-integration request metrics.
+
+    Returns:
+        dict: {integration: {"requests", "errors", "retries", "avg_ms",
+            "max_ms", "latency_buckets": {"<=50ms": n, ..., ">5000ms": n}}}
+    """
+    labels = [f"<={upper}ms" for upper in LATENCY_BUCKETS_MS]
+    labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+    with _metrics_lock:
+        snapshot = {}
+        for integration, metrics in _metrics.items():
+            requests_count = metrics["requests"]
+            snapshot[integration] = {
+                "requests": requests_count,
+                "errors": metrics["errors"],
+                "retries": metrics["retries"],
+                "avg_ms": (
+                    round(metrics["total_ms"] / requests_count, 1)
+                    if requests_count
+                    else 0.0
+                ),
+                "max_ms": round(metrics["max_ms"], 1),
+                "latency_buckets": dict(zip(labels, metrics["latency_buckets"])),
+            }
+        return snapshot
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _backoff(attempt):
+    """Sleep with full jitter before the next attempt."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2**attempt))
+    time.sleep(random.uniform(0, delay))
+
+
+def request(integration, method, url, timeout=DEFAULT_TIMEOUT, retries=None, **kwargs):
+    """
+    Send an HTTP request to a third-party API.
+
+    Args:
+        integration (str): Integration name used for metrics (e.g. "wikidata")
+        method (str): HTTP method
+        url (str): Request URL
+        timeout: Timeout passed to requests, (connect, read) by default
+        retries (int): Retries after the first attempt. Defaults to
+            DEFAULT_RETRIES for idempotent methods and 0 otherwise.
+        **kwargs: Passed through to requests (params, json, data, headers...)
+
+    Returns:
+        requests.Response: The last response received
+
+    Raises:
+        resilience.UpstreamUnavailable: If the integration's circuit is open
+            or its bulkhead is full
+        requests.RequestException: If the last attempt failed to connect or
+            timed out
+    """
+    method = method.upper()
+    if retries is None:
+        retries = DEFAULT_RETRIES if method in IDEMPOTENT_METHODS else 0
+    session = _get_session(url)
+
+    with resilience.guard(integration) as report:
+        call_started = time.perf_counter()
+        for attempt in range(retries + 1):
+            is_last = attempt == retries
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                _record(integration, elapsed_ms, error=True, retry=not is_last)
+                if is_last:
+                    raise
+                logger.warning(f"{integration} {method} failed ({e}), retrying")
+                _backoff(attempt)
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            error = response.status_code >= 500 or response.status_code == 429
+            retry = response.status_code in RETRY_STATUSES and not is_last
+            _record(integration, elapsed_ms, error=error, retry=retry)
+            if retry:
+                _backoff(attempt)
+                continue
+            report(error, (time.perf_counter() - call_started) * 1000)
+            return response
+
+
+def get(integration, url, **kwargs):
+    return request(integration, "GET", url, **kwargs)
+
+
+def post(integration, url, **kwargs):
+    return request(integration, "POST", url, **kwargs)
@@ -0,0 +1,284 @@
+"""
+Canonical nutrient registry and a fixed-layout nutrient vector.
+
+Every nutrient the app aggregates has a fixed index in NUTRIENTS (macros
+first, then micronutrients), so totals are summed, scaled and compared as
+NumPy arrays instead of being merged key by key. Micronutrients keep the
+display names used in the stored JSON; known aliases (e.g. the scraper's
+"vitamin_c") map onto them. Names outside the registry are carried along in
+a small dict so no logged value is lost.
+"""
+
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+
+MACROS = ("calories", "protein", "carbohydrates", "fat")
+MICRONUTRIENTS = (
+    "Vitamin A",
+    "Vitamin C",
+    "Vitamin D",
+    "Vitamin E",
+    "Vitamin K",
+    "Thiamin (B1)",
+    "Riboflavin (B2)",
+    "Niacin (B3)",
+    "Vitamin B6",
+    "Folate (B9)",
+    "Vitamin B12",
+    "Calcium",
+    "Iron",
+    "Magnesium",
+    "Phosphorus",
+    "Potassium",
+    "Sodium",
+    "Zinc",
+    "Copper",
+    "Selenium",
+    "Fiber",
+    "Sugar",
+    "Cholesterol",
+)
+NUTRIENTS = MACROS + MICRONUTRIENTS
+INDEX = {name: index for index, name in enumerate(NUTRIENTS)}
+MICRO_OFFSET = len(MACROS)
+SIZE = len(NUTRIENTS)
+
+
+def _alias_key(name):
+    return re.sub(r"[^a-z0-9]+", "", name.lower())
+
+
+ALIASES = {_alias_key(name): name for name in MICRONUTRIENTS}
+ALIASES.update(
+    {
+        "thiamin": "Thiamin (B1)",
+        "thiamine": "Thiamin (B1)",
+        "vitaminb1": "Thiamin (B1)",
+        "riboflavin": "Riboflavin (B2)",
+        "vitaminb2": "Riboflavin (B2)",
+        "niacin": "Niacin (B3)",
+        "vitaminb3": "Niacin (B3)",
+        "folate": "Folate (B9)",
+        "folicacid": "Folate (B9)",
+        "vitaminb9": "Folate (B9)",
+        "sugars": "Sugar",
+        "dietaryfiber": "Fiber",
+        "fibre": "Fiber",
+    }
+)
+
+
+@lru_cache(maxsize=1024)
+def micronutrient_index(name):
+    """Vector index of a micronutrient name or alias, None if unregistered."""
+    canonical = ALIASES.get(_alias_key(name))
+    return INDEX[canonical] if canonical else None
+
+
+def macro_percentages(rows, targets, ndigits=1):
+    """
+    Macro amounts of many rows as percentages of one set of targets.
+
+    Args:
+        rows: Sequence of (calories, protein, carbohydrates, fat) amounts
+        targets: NutrientVector of daily targets
+        ndigits (int): Rounding of the percentages
+
+    Returns:
+        list: One {macro: percent} dict per row; 0 where there is no
+            positive target, as in NutrientVector.percent_of
+    """
+    amounts = np.array(rows, dtype=float).reshape(-1, MICRO_OFFSET)
+    goals = targets.values[:MICRO_OFFSET]
+    percent = np.zeros_like(amounts)
+    np.divide(amounts * 100, goals, out=percent, where=goals > 0)
+    return [dict(zip(MACROS, row)) for row in percent.round(ndigits).tolist()]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _merge_extra(a, b, sign=1):
+    if not b:
+        return dict(a)
+    merged = dict(a)
+    for name, value in b.items():
+        merged[name] = merged.get(name, 0) + sign * value
+    return merged
+
+
+class NutrientVector:
+    """
+    Amounts of every registered nutrient as one float64 array.
+
+    ``present`` marks the micronutrients that any contributing value
+    mentioned, so converting back to JSON keeps the same keys as merging the
+    dicts would; ``extra`` holds unregistered micronutrient names.
+    """
+
+    __slots__ = ("values", "present", "extra")
+
+    def __init__(self, values=None, present=None, extra=None):
+        self.values = np.zeros(SIZE) if values is None else values
+        self.present = np.zeros(SIZE, dtype=bool) if present is None else present
+        self.extra = {} if extra is None else extra
+
+    @classmethod
+    def from_values(
+        cls, calories=0, protein=0, carbohydrates=0, fat=0, micronutrients=None
+    ):
+        """Build a vector from macro amounts and a micronutrient dict.
+        Non-numeric micronutrient values are skipped."""
+        vector = cls()
+        vector.values[:MICRO_OFFSET] = (
+            float(calories or 0),
+            float(protein or 0),
+            float(carbohydrates or 0),
+            float(fat or 0),
+        )
+        vector.present[:MICRO_OFFSET] = True
+        for name, value in (micronutrients or {}).items():
+            if not _is_number(value):
+                continue
+            index = micronutrient_index(name)
+            if index is None:
+                vector.extra[name] = vector.extra.get(name, 0) + float(value)
+            else:
+                vector.values[index] += float(value)
+                vector.present[index] = True
+        return vector
+
+    @classmethod
+    def from_food(cls, food):
+        """Nutrients of one serving of a FoodEntry or FoodProposal."""
+        return cls.from_values(
+            calories=food.caloriesPerServing,
+            protein=food.proteinContent,
+            carbohydrates=food.carbohydrateContent,
+            fat=food.fatContent,
+            micronutrients=food.micronutrients,
+        )
+
+    @classmethod
+    def from_targets(cls, targets):
+        """Daily targets from NutritionTargets; micronutrient targets may be
+        plain amounts or {"target": amount, ...} objects."""
+        micronutrients = {
+            name: value.get("target") if isinstance(value, dict) else value
+            for name, value in (targets.micronutrients or {}).items()
+        }
+        return cls.from_values(
+            calories=targets.calories,
+            protein=targets.protein,
+            carbohydrates=targets.carbohydrates,
+            fat=targets.fat,
+            micronutrients=micronutrients,
+        )
+
+    @classmethod
+    def sum(cls, vectors):
+        """Sum many vectors with one array reduction."""
+        vectors = list(vectors)
+        if not vectors:
+            return cls()
+        extra = {}
+        for vector in vectors:
+            if vector.extra:
+                extra = _merge_extra(extra, vector.extra)
+        return cls(
+            np.array([vector.values for vector in vectors]).sum(axis=0),
+            np.logical_or.reduce([vector.present for vector in vectors]),
+            extra,
+        )
+
+    def __add__(self, other):
+        return NutrientVector(
+            self.values + other.values,
+            self.present | other.present,
+            _merge_extra(self.extra, other.extra),
+        )
+
+    def __iadd__(self, other):
+        self.values += other.values
+        self.present |= other.present
+        if other.extra:
+            self.extra = _merge_extra(self.extra, other.extra)
+        return self
+
+    def __sub__(self, other):
+        return NutrientVector(
+            self.values - other.values,
+            self.present | other.present,
+            _merge_extra(self.extra, other.extra, sign=-1),
+        )
+
+    def __mul__(self, factor):
+        factor = float(factor)
+        return NutrientVector(
+            self.values * factor,
+            self.present.copy(),
+            {name: value * factor for name, value in self.extra.items()},
+        )
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return self * -1
+
+    def __bool__(self):
+        return bool(self.values.any() or any(self.extra.values()))
+
+    def __getitem__(self, name):
+        index = INDEX.get(name)
+        if index is None:
+            index = micronutrient_index(name)
+        if index is None:
+            return self.extra.get(name, 0.0)
+        return float(self.values[index])
+
+    def macros(self, ndigits=None):
+        """{macro: amount} for calories, protein, carbohydrates and fat."""
+        values = self.values[:MICRO_OFFSET]
+        if ndigits is not None:
+            values = values.round(ndigits)
+        return dict(zip(MACROS, values.tolist()))
+
+    def to_micronutrients(self, ndigits=2):
+        """The micronutrient part as a JSON-ready dict."""
+        micros = self.values[MICRO_OFFSET:]
+        if ndigits is not None:
+            micros = micros.round(ndigits)
+        result = {
+            MICRONUTRIENTS[offset]: float(micros[offset])
+            for offset in np.flatnonzero(self.present[MICRO_OFFSET:])
+        }
+        for name, value in self.extra.items():
+            result[name] = round(value, ndigits) if ndigits is not None else value
+        return result
+
+    def percent_of(self, targets, ndigits=1):
+        """Each nutrient as a percentage of targets (a NutrientVector);
+        0 where there is no positive target."""
+        percent = np.zeros(SIZE)
+        np.divide(
+            self.values * 100, targets.values, out=percent, where=targets.values > 0
+        )
+        return NutrientVector(percent.round(ndigits), targets.present.copy())
+
+    def isclose(self, other, tolerance):
+        """Whether both vectors mention the same nutrients with amounts
+        within tolerance of each other."""
+        if not np.array_equal(self.present, other.present):
+            return False
+        if set(self.extra) != set(other.extra):
+            return False
+        if np.any(np.abs(self.values - other.values) > tolerance):
+            return False
+        return all(
+            abs(value - other.extra[name]) <= tolerance
+            for name, value in self.extra.items()
+        )
@@ -3,6 +3,10 @@ Nutrition calculation utilities for BMR, TDEE, and macro distribution.
 Uses the Mifflin-St Jeor Equation for BMR calculation.
 """
 
+import numpy as np
+
+from .nutrients import NutrientVector
+
 # Activity level multipliers for TDEE calculation
 ACTIVITY_MULTIPLIERS = {
     'sedentary': 1.2,      # Little or no exercise
@@ -17,6 +21,11 @@ PROTEIN_KCAL_PER_G = 4
 CARBS_KCAL_PER_G = 4
 FAT_KCAL_PER_G = 9
 
+# Default share of calories from each macronutrient
+DEFAULT_CARB_RATIO = 0.40
+DEFAULT_PROTEIN_RATIO = 0.30
+DEFAULT_FAT_RATIO = 0.30
+
 
 def calculate_bmr(weight_kg, height_cm, age, gender):
     """
@@ -87,7 +96,12 @@ def calculate_tdee(bmr, activity_level):
     return round(tdee, 2)
 
 
-def calculate_macro_targets(tdee, carb_ratio=0.40, protein_ratio=0.30, fat_ratio=0.30):
+def calculate_macro_targets(
+    tdee,
+    carb_ratio=DEFAULT_CARB_RATIO,
+    protein_ratio=DEFAULT_PROTEIN_RATIO,
+    fat_ratio=DEFAULT_FAT_RATIO,
+):
     """
     Calculate macronutrient targets from TDEE using specified ratios.
     
@@ -138,6 +152,75 @@ def calculate_macro_targets(tdee, carb_ratio=0.40, protein_ratio=0.30, fat_ratio
     }
 
 
+def _round(values):
+    # Python's round() rather than np.round(), which rounds some halves
+    # differently, so results match the scalar functions exactly
+    return np.array([round(value, 2) for value in values.tolist()])
+
+
+def calculate_targets_batch(
+    weight_kg,
+    height_cm,
+    age,
+    gender,
+    activity_level,
+    carb_ratio=DEFAULT_CARB_RATIO,
+    protein_ratio=DEFAULT_PROTEIN_RATIO,
+    fat_ratio=DEFAULT_FAT_RATIO,
+):
+    """
+    Vectorized calculate_bmr() -> calculate_tdee() -> calculate_macro_targets()
+    for many people at once.
+
+    Follows the same arithmetic (and intermediate rounding) on float64
+    arrays, so each result is identical to the scalar chain.
+
+    Args:
+        weight_kg, height_cm, age, gender, activity_level: Equal-length
+            sequences, one item per person
+        carb_ratio, protein_ratio, fat_ratio: As in calculate_macro_targets
+
+    Returns:
+        dict: Arrays under the keys of calculate_macro_targets
+
+    Raises:
+        ValueError: On an unknown gender or activity level, or ratios that
+            don't sum to 1.0
+    """
+    total_ratio = carb_ratio + protein_ratio + fat_ratio
+    if not (0.99 <= total_ratio <= 1.01):
+        raise ValueError(
+            f"Macro ratios must sum to 1.0, got {total_ratio}"
+        )
+
+    gender = np.asarray(gender, dtype=str)
+    if not np.isin(gender, ['M', 'F']).all():
+        raise ValueError("Gender must be 'M' or 'F'")
+    levels, level_index = np.unique(
+        np.asarray(activity_level, dtype=str), return_inverse=True
+    )
+    levels = levels.tolist()
+    if set(levels) - ACTIVITY_MULTIPLIERS.keys():
+        valid = ', '.join(ACTIVITY_MULTIPLIERS.keys())
+        raise ValueError(f"Invalid activity level. Must be one of: {valid}")
+    multipliers = np.array([ACTIVITY_MULTIPLIERS[level] for level in levels])
+    multiplier = multipliers[level_index]
+
+    weight_kg = np.asarray(weight_kg, dtype=float)
+    height_cm = np.asarray(height_cm, dtype=float)
+    age = np.asarray(age, dtype=float)
+    base = (10 * weight_kg) + (6.25 * height_cm) - (5 * age)
+    bmr = _round(np.where(gender == 'M', base + 5, base - 161))
+    tdee = _round(bmr * multiplier)
+
+    return {
+        'calories': _round(tdee),
+        'protein_g': _round(tdee * protein_ratio / PROTEIN_KCAL_PER_G),
+        'carbohydrates_g': _round(tdee * carb_ratio / CARBS_KCAL_PER_G),
+        'fat_g': _round(tdee * fat_ratio / FAT_KCAL_PER_G),
+    }
+
+
 def aggregate_micronutrients(micronutrient_list):
     """
     Aggregate micronutrients from multiple food entries.
@@ -155,21 +238,19 @@ def aggregate_micronutrients(micronutrient_list):
     Returns:
         dict: Dictionary with summed micronutrient values
             Example: {"Vitamin A": 200, "Vitamin C": 45, "Calcium": 250}
+
+    Values are summed as NutrientVectors, so unlike a plain key-by-key merge:
+    - known aliases are merged under their canonical name
+      ({"vitamin_c": 10} and {"Vitamin C": 5} give {"Vitamin C": 15}),
+    - non-numeric values are skipped instead of raising,
+    - sums are rounded to 2 decimal places.
+    Names outside the registry keep their input key.
     """
-    aggregated = {}
-    
-    for micronutrients in micronutrient_list:
-        if not micronutrients:
-            continue
-            
-        for nutrient, value in micronutrients.items():
-            if nutrient in aggregated:
-                aggregated[nutrient] += value
-            else:
-                aggregated[nutrient] = value
-    
-    # Round all values to 2 decimal places
-    return {k: round(v, 2) for k, v in aggregated.items()}
+    return NutrientVector.sum(
+        NutrientVector.from_values(micronutrients=micronutrients)
+        for micronutrients in micronutrient_list
+        if micronutrients
+    ).to_micronutrients()
 
 
 def calculate_macro_calories(protein_g, carbohydrates_g, fat_g):
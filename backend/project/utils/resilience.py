@@ -0,0 +1,337 @@
+"""
+Bulkheads and circuit breakers for third-party integrations.
+
+Gunicorn pods run a handful of sync workers, so one slow upstream can pin
+all of them. Two guards sit in front of every outbound call made through
+project/utils/http_client.py:
+
+- Bulkhead: caps how many calls to one integration may be in flight at once
+  on a host. Slots are file locks, so the cap holds across worker processes
+  and is released automatically if a worker dies mid-call.
+- CircuitBreaker: tracks recent outcomes per integration and, once the
+  error or slow-call rate crosses a threshold, rejects calls immediately
+  for a cool-down period before letting a single probe call through.
+
+Both raise UpstreamUnavailable (a requests.RequestException) instead of
+waiting on the upstream, so callers can fall back to a cached or default
+response. A bulkhead only waits BULKHEAD_ACQUIRE_TIMEOUT for a slot, which
+smooths over calls finishing a moment later without queueing requests.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX development machines
+    fcntl = None
+
+# Max concurrent calls per integration on one host. Pods run 4 sync
+# workers, so a limit of 2 always leaves half of them for other endpoints.
+# ASGI pods don't tie up a worker per call and raise it via BULKHEAD_LIMIT.
+DEFAULT_BULKHEAD_LIMIT = int(os.environ.get("BULKHEAD_LIMIT", "2"))
+BULKHEAD_LIMITS = {}
+BULKHEAD_LOCK_DIR = os.path.join(tempfile.gettempdir(), "nutrihub-bulkheads")
+# How long a call waits for a slot before being rejected, and how often the
+# slots are retried meanwhile
+BULKHEAD_ACQUIRE_TIMEOUT = 0.1
+BULKHEAD_RETRY_INTERVAL = 0.01
+# Held flock()s on Linux, read by Bulkhead.busy_slots() without locking
+PROC_LOCKS = "/proc/locks"
+
+# Circuit breaker thresholds
+BREAKER_WINDOW_SECONDS = 60
+BREAKER_MIN_CALLS = 10
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_SLOW_CALL_RATE = 0.5
+BREAKER_SLOW_CALL_MS = 5000
+BREAKER_OPEN_SECONDS = 30
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Raised when a call is rejected without contacting the upstream."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class BulkheadFullError(UpstreamUnavailable):
+    pass
+
+
+class Bulkhead:
+    """Limits concurrent calls to one integration across processes."""
+
+    def __init__(
+        self, name, limit, lock_dir=BULKHEAD_LOCK_DIR, timeout=BULKHEAD_ACQUIRE_TIMEOUT
+    ):
+        self.name = name
+        self.limit = limit
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self.rejected = 0
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._held = 0
+        self._held_lock = threading.Lock()
+
+    def _slot_path(self, slot):
+        return os.path.join(self.lock_dir, f"{self.name}.{slot}.lock")
+
+    def _acquire(self):
+        if fcntl is None:
+            acquired = self._semaphore.acquire(timeout=self.timeout)
+            return self._semaphore if acquired else None
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            handle = self._try_slots()
+            if handle is not None or time.monotonic() >= deadline:
+                return handle
+            time.sleep(BULKHEAD_RETRY_INTERVAL)
+
+    def _try_slots(self):
+        for slot in range(self.limit):
+            handle = open(self._slot_path(slot), "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+
+    def _release(self, handle):
+        if fcntl is None:
+            self._semaphore.release()
+            return
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block, or fail after timeout."""
+        handle = self._acquire()
+        if handle is None:
+            self.rejected += 1
+            raise BulkheadFullError(
+                f"{self.name}: all {self.limit} concurrent call slots are busy"
+            )
+        with self._held_lock:
+            self._held += 1
+        try:
+            yield
+        finally:
+            with self._held_lock:
+                self._held -= 1
+            self._release(handle)
+
+    def busy_slots(self):
+        """
+        Count slots currently held by any process on this host.
+
+        Reads the held locks from /proc/locks rather than probing the slots,
+        so checking never takes a slot from a call. Without /proc/locks only
+        this process's slots are counted.
+        """
+        if fcntl is None or not os.path.exists(PROC_LOCKS):
+            return self._held
+        slots = set()
+        for slot in range(self.limit):
+            try:
+                stat = os.stat(self._slot_path(slot))
+            except OSError:
+                continue
+            slots.add(
+                f"{os.major(stat.st_dev):02x}:{os.minor(stat.st_dev):02x}:{stat.st_ino}"
+            )
+        if not slots:
+            return 0
+        # e.g. "1: FLOCK  ADVISORY  WRITE 4394 fe:00:13533474 0 EOF"; lines
+        # of waiters have a "->" after the number
+        busy = 0
+        with open(PROC_LOCKS) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 5 and fields[1] == "FLOCK" and fields[5] in slots:
+                    busy += 1
+        return busy
+
+    def snapshot(self):
+        return {
+            "limit": self.limit,
+            "busy": self.busy_slots(),
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one integration.
+
+    Closed: calls pass and outcomes are recorded.
+    Open: calls are rejected until BREAKER_OPEN_SECONDS have passed.
+    Half-open: a single probe call is let through; its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = None
+        self.rejected = 0
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > BREAKER_WINDOW_SECONDS:
+            self._calls.popleft()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go upstream."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < BREAKER_OPEN_SECONDS:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name}: circuit is open")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name}: circuit is half-open")
+                self._probe_in_flight = True
+
+    def record(self, failed, elapsed_ms):
+        now = time.time()
+        slow = elapsed_ms > BREAKER_SLOW_CALL_MS
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append((now, failed, slow))
+            self._trim(now)
+            total = len(self._calls)
+            if total < BREAKER_MIN_CALLS:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slow_calls = sum(1 for _, _, s in self._calls if s)
+            if (
+                failures / total >= BREAKER_FAILURE_RATE
+                or slow_calls / total >= BREAKER_SLOW_CALL_RATE
+            ):
+                self._open(now)
+
+    def cancel_probe(self):
+        """Forget a half-open probe that never reached the upstream."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self._calls.clear()
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            total = len(self._calls)
+            return {
+                "state": self.state,
+                "opened_at": self.opened_at,
+                "retry_in_seconds": (
+                    max(0, round(BREAKER_OPEN_SECONDS - (now - self.opened_at), 1))
+                    if self.state == OPEN
+                    else 0
+                ),
+                "window_calls": total,
+                "window_failures": sum(1 for _, f, _ in self._calls if f),
+                "window_slow_calls": sum(1 for _, _, s in self._calls if s),
+                "rejected": self.rejected,
+            }
+
+
+_registry_lock = threading.Lock()
+_breakers = {}
+_bulkheads = {}
+
+
+def get_breaker(integration):
+    with _registry_lock:
+        if integration not in _breakers:
+            _breakers[integration] = CircuitBreaker(integration)
+        return _breakers[integration]
+
+
+def get_bulkhead(integration):
+    with _registry_lock:
+        if integration not in _bulkheads:
+            limit = BULKHEAD_LIMITS.get(integration, DEFAULT_BULKHEAD_LIMIT)
+            _bulkheads[integration] = Bulkhead(integration, limit)
+        return _bulkheads[integration]
+
+
+@contextmanager
+def guard(integration):
+    """
+    Run an outbound call under the integration's breaker and bulkhead.
+
+    Yields a callback taking (failed, elapsed_ms) that the caller uses to
+    report the call's outcome to the circuit breaker.
+    """
+    breaker = get_breaker(integration)
+    breaker.before_call()
+    reported = False
+
+    def report(failed, elapsed_ms):
+        nonlocal reported
+        reported = True
+        breaker.record(failed, elapsed_ms)
+
+    started = time.perf_counter()
+    try:
+        with get_bulkhead(integration).slot():
+            yield report
+    except BulkheadFullError:
+        # Rejected locally; the upstream itself is not at fault
+        if not reported:
+            breaker.cancel_probe()
+        raise
+    except Exception:
+        if not reported:
+            breaker.record(True, (time.perf_counter() - started) * 1000)
+        raise
+
+
+def snapshot():
+    """Return breaker and bulkhead state for every known integration."""
+    with _registry_lock:
+        breakers = dict(_breakers)
+        bulkheads = dict(_bulkheads)
+    return {
+        "circuit_breakers": {name: b.snapshot() for name, b in breakers.items()},
+        "bulkheads": {name: b.snapshot() for name, b in bulkheads.items()},
+    }
+
+
+def reset():
+    with _registry_lock:
+        _breakers.clear()
+        _bulkheads.clear()
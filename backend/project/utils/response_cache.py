@@ -0,0 +1,285 @@
+"""
+Shared response cache for third-party lookups (TheMealDB, Open Food Facts,
+Wikidata, Foodish, FatSecret).
+
+Entries live in the Django cache and are keyed by integration name plus a
+normalized query. An entry is fresh for its integration's TTL; after that it
+is still served for a grace window while a background thread refreshes it
+(stale-while-revalidate). Empty upstream results are cached for a shorter
+negative TTL so repeated misses don't hit the upstream either. Concurrent
+misses for the same key are coalesced into a single upstream call.
+
+Entries, locks and the hit/miss counters are shared between processes only
+when the cache backend is (Redis in deployment, see CACHES in settings);
+with the local-memory fallback each process caches, coalesces and counts on
+its own.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "default"
+
+# Lock held while a background refresh for a key is in flight
+REFRESH_LOCK_TIMEOUT = 30
+
+# How long a miss waits for another process already filling the same key
+FILL_LOCK_TIMEOUT = 30
+FILL_WAIT_SECONDS = 10
+FILL_POLL_INTERVAL = 0.1
+
+# Number of cached slots for "random" endpoints, so they keep returning
+# varied results while still being served from cache
+RANDOM_POOL_SIZE = 8
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: int  # seconds an entry is served as fresh
+    stale_ttl: int  # extra seconds a stale entry may be served while refreshing
+    negative_ttl: int  # seconds an empty result is cached
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+DEFAULT_POLICY = CachePolicy(ttl=HOUR, stale_ttl=HOUR, negative_ttl=5 * 60)
+
+POLICIES = {
+    "themealdb.search": CachePolicy(ttl=DAY, stale_ttl=DAY, negative_ttl=HOUR),
+    "themealdb.random": CachePolicy(ttl=10 * 60, stale_ttl=HOUR, negative_ttl=60),
+    "openfoodfacts.search": CachePolicy(ttl=DAY, stale_ttl=DAY, negative_ttl=HOUR),
+    "wikidata.entity": CachePolicy(ttl=7 * DAY, stale_ttl=7 * DAY, negative_ttl=DAY),
+    "wikidata.search": CachePolicy(ttl=DAY, stale_ttl=DAY, negative_ttl=HOUR),
+    "foodish.random": CachePolicy(ttl=10 * 60, stale_ttl=HOUR, negative_ttl=60),
+    "fatsecret.food": CachePolicy(ttl=DAY, stale_ttl=DAY, negative_ttl=HOUR),
+}
+
+COUNTERS = (
+    "hits",
+    "negative_hits",
+    "stale_hits",
+    "misses",
+    "coalesced",
+    "refreshes",
+    "refresh_errors",
+)
+
+# Integrations counted by this process, on top of those in POLICIES
+_seen_integrations = set()
+
+
+def _stats_key(integration, counter):
+    return f"response_cache:stats:{integration}:{counter}"
+
+
+def _record(integration, counter):
+    """Count one event in the shared cache, so every worker adds to it."""
+    _seen_integrations.add(integration)
+    cache = caches[CACHE_ALIAS]
+    key = _stats_key(integration, counter)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event: add() keeps a concurrent first increment
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def _stats_keys():
+    return {
+        _stats_key(integration, counter): (integration, counter)
+        for integration in set(POLICIES) | _seen_integrations
+        for counter in COUNTERS
+    }
+
+
+def get_stats():
+    """Return the hit/miss counters for each integration that has any."""
+    keys = _stats_keys()
+    stats = {}
+    for key, value in caches[CACHE_ALIAS].get_many(list(keys)).items():
+        integration, counter = keys[key]
+        stats.setdefault(integration, dict.fromkeys(COUNTERS, 0))[counter] = value
+    return stats
+
+
+def reset_stats():
+    caches[CACHE_ALIAS].delete_many(list(_stats_keys()))
+
+
+def normalize_query(*parts):
+    """
+    Build a cache query from free-text parts: case-insensitive and
+    whitespace-insensitive, so "Chicken  Breast" and "chicken breast" share
+    an entry.
+    """
+    return "|".join(" ".join(str(part).lower().split()) for part in parts)
+
+
+def _cache_key(integration, query):
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+    return f"integration:{integration}:{digest}"
+
+
+def _is_empty(value):
+    return not value
+
+
+def _store(cache, key, policy, value, empty):
+    ttl = policy.negative_ttl if empty else policy.ttl
+    entry = {"value": value, "empty": empty, "fresh_until": time.time() + ttl}
+    cache.set(key, entry, timeout=ttl + policy.stale_ttl)
+
+
+# Deletes KEYS[1] only while it still holds ARGV[1], in one atomic step
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _acquire(cache, lock_key, timeout):
+    """Take a cache lock; returns this holder's token, or None if it's held."""
+    # An int, which Django's Redis serializer stores as is rather than
+    # pickled, so _RELEASE_SCRIPT can compare it
+    token = uuid.uuid4().int
+    return token if cache.add(lock_key, token, timeout=timeout) else None
+
+
+def _release(cache, lock_key, token):
+    """
+    Drop a lock only if this holder still owns it. A lock that timed out
+    may since have been taken by another process, whose lock must survive.
+    """
+    if token is None:
+        return
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(lock_key)
+        client = cache._cache.get_client(key, write=True)
+        client.eval(_RELEASE_SCRIPT, 1, key, str(token))
+    elif cache.get(lock_key) == token:
+        # The local-memory fallback only serves development and tests
+        cache.delete(lock_key)
+
+
+def _refresh_in_background(integration, key, policy, fetch, is_empty):
+    cache = caches[CACHE_ALIAS]
+    lock_key = f"{key}:refresh"
+    token = _acquire(cache, lock_key, REFRESH_LOCK_TIMEOUT)
+    if token is None:
+        # Another request is already refreshing this entry
+        return
+
+    def refresh():
+        try:
+            value = fetch()
+            _store(cache, key, policy, value, is_empty(value))
+            _record(integration, "refreshes")
+        except Exception as e:
+            # Keep serving the stale entry until it expires
+            _record(integration, "refresh_errors")
+            logger.warning(f"Background refresh failed for {integration}: {e}")
+        finally:
+            _release(cache, lock_key, token)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+_in_flight_lock = threading.Lock()
+_in_flight = {}
+
+
+def _fill(integration, key, policy, fetch, is_empty):
+    """
+    Fetch and store a missing entry, coalescing concurrent misses.
+
+    Threads of this process share one Future per key. Other processes are
+    held off with a fill lock in the cache and wait for the entry to appear
+    before falling back to fetching themselves.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _in_flight[key] = future
+    if not leader:
+        _record(integration, "coalesced")
+        return future.result()
+
+    cache = caches[CACHE_ALIAS]
+    lock_key = f"{key}:fill"
+    try:
+        token = _acquire(cache, lock_key, FILL_LOCK_TIMEOUT)
+        if token is None:
+            deadline = time.time() + FILL_WAIT_SECONDS
+            while time.time() < deadline:
+                time.sleep(FILL_POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    _record(integration, "coalesced")
+                    future.set_result(entry["value"])
+                    return entry["value"]
+
+        _record(integration, "misses")
+        try:
+            value = fetch()
+            _store(cache, key, policy, value, is_empty(value))
+        finally:
+            # Never another process's lock: only the holder may release it
+            _release(cache, lock_key, token)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+def get_or_fetch(integration, query, fetch, is_empty=_is_empty):
+    """
+    Return the cached value for (integration, query), calling ``fetch`` on a
+    miss.
+
+    Args:
+        integration (str): Integration name, selects the CachePolicy
+        query (str): Cache query, usually built with normalize_query()
+        fetch (callable): Zero-argument callable performing the upstream call.
+            Exceptions raised on a miss propagate to the caller and nothing
+            is cached.
+        is_empty (callable): Decides whether a value is an empty result and
+            should be cached with the negative TTL
+
+    Returns:
+        The cached or freshly fetched value
+    """
+    policy = POLICIES.get(integration, DEFAULT_POLICY)
+    cache = caches[CACHE_ALIAS]
+    key = _cache_key(integration, query)
+
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() < entry["fresh_until"]:
+            _record(integration, "negative_hits" if entry["empty"] else "hits")
+        else:
+            _record(integration, "stale_hits")
+            _refresh_in_background(integration, key, policy, fetch, is_empty)
+        return entry["value"]
+
+    return _fill(integration, key, policy, fetch, is_empty)